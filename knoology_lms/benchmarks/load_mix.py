@@ -0,0 +1,225 @@
+"""
+Replay a realistic traffic mix against a running server.
+
+Each virtual user is a seeded student (see ``manage.py seed_lms``) who, in a
+loop, picks one of these scenarios by weight:
+
+- browse:   course catalog page, a course, categories, search, testimonials
+- chapters: a course's chapter list, one chapter, mark it complete, progress
+- quiz:     available quizzes, start one, submit answers
+- chat:     inbox, one conversation, send a message
+
+Requests are grouped by endpoint (the URL name in main/urls.py) and the
+script reports throughput plus p50/p95/p99 latency per endpoint. Only the
+standard library is used; every virtual user is a thread with its own
+keep-alive connection.
+
+    python manage.py seed_lms --students 5000 --courses 300
+    python benchmarks/load_mix.py --student-ids 1-5000 --users 50 --duration 60
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+SCENARIOS = {
+    'browse': 40,
+    'chapters': 30,
+    'chat': 20,
+    'quiz': 10,
+}
+SEARCH_TERMS = ['python', 'django', 'react', 'sql', 'docker', 'machine learning', 'go', 'rust']
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if status >= 400:
+                self.errors[endpoint] += 1
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, args, results, student_id, stop_at):
+        super().__init__(daemon=True)
+        url = urlsplit(args.url)
+        self.host, self.port, self.prefix = url.hostname, url.port or 80, url.path.rstrip('/')
+        self.args, self.results = args, results
+        self.student_id = student_id
+        self.stop_at = stop_at
+        self.connection = None
+        self.courses = []
+
+    def request(self, endpoint, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.args.timeout)
+            start = time.perf_counter()
+            try:
+                self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                # Server closed the keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    self.results.record(endpoint, time.perf_counter() - start, 599)
+                    return None
+                continue
+            self.results.record(endpoint, time.perf_counter() - start, response.status)
+            try:
+                return json.loads(data) if data else None
+            except ValueError:
+                return None
+
+    def run(self):
+        sid = self.student_id
+        enrolled = self.request('enrolled-courses', 'GET', f'/enrolled-courses/{sid}/') or {}
+        self.courses = [course['id'] for course in enrolled.get('data', [])]
+        names, weights = zip(*SCENARIOS.items())
+        while time.monotonic() < self.stop_at:
+            getattr(self, random.choices(names, weights)[0])()
+            if self.args.think_time:
+                time.sleep(random.uniform(0, self.args.think_time))
+        if self.connection is not None:
+            self.connection.close()
+
+    def browse(self):
+        page = self.request('course-list', 'GET', '/course/?page_size=20') or {}
+        results = page.get('results') or []
+        if results:
+            self.request('course-detail', 'GET', f'/course/{random.choice(results)["id"]}/')
+        self.request('category-list', 'GET', '/category/')
+        term = random.choice(SEARCH_TERMS).replace(' ', '+')
+        self.request('search-courses', 'GET', f'/search-courses/?q={term}&page_size=20')
+        self.request('get_top_course_ratings', 'GET', '/get-top-course-ratings/')
+
+    def chapters(self):
+        if not self.courses:
+            return self.browse()
+        course_id = random.choice(self.courses)
+        listing = self.request('course_chapter_list', 'GET', f'/course-chapters/{course_id}/') or {}
+        chapters = listing.get('chapters') or []
+        if chapters:
+            chapter_id = random.choice(chapters)['id']
+            self.request('chapter-detail', 'GET', f'/chapter/{chapter_id}/')
+            self.request('mark-chapter-complete', 'POST', '/mark-chapter-complete/', {
+                'student_id': self.student_id, 'course_id': course_id, 'chapter_id': chapter_id
+            })
+        self.request('get-completed-chapters', 'GET', f'/get-completed-chapters/{self.student_id}/{course_id}/')
+
+    def quiz(self):
+        sid = self.student_id
+        available = self.request('student-available-quizzes', 'GET', f'/student-available-quizzes/{sid}/') or {}
+        open_quizzes = [q for q in available.get('data', []) if not q['already_attempted']]
+        if not open_quizzes:
+            return
+        quiz = random.choice(open_quizzes)
+        started = self.request(
+            'get-quiz-for-attempt', 'GET', f'/get-quiz-for-attempt/{quiz["quiz_id"]}/{sid}/{quiz["course_id"]}/'
+        ) or {}
+        if 'attempt_id' not in started:
+            return
+        answers = [
+            {'question_id': q['id'], 'selected_answer': q[random.choice(['ans1', 'ans2', 'ans3', 'ans4'])]}
+            for q in started.get('questions', [])
+        ]
+        self.request('submit-quiz-attempt', 'POST', f'/submit-quiz-attempt/{started["attempt_id"]}/', {
+            'answers': answers
+        })
+
+    def chat(self):
+        sid = self.student_id
+        inbox = self.request('chat-users', 'GET', f'/chat-users/student/{sid}/') or {}
+        teachers = inbox.get('data') or []
+        if not teachers:
+            return
+        teacher_id = random.choice(teachers)['id']
+        self.request('chat-messages', 'GET', f'/chat-messages/student/{sid}/{teacher_id}/?limit=20')
+        self.request('send-message', 'POST', '/send-message/', {
+            'teacher_id': teacher_id, 'student_id': sid, 'message': 'Load test message', 'message_from': 'student'
+        })
+
+
+def percentile(sorted_values, pct):
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def report(results, elapsed):
+    total = sum(len(values) for values in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f'\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, {errors} errors (HTTP >= 400)\n')
+    header = f'{"endpoint":<28}{"count":>8}{"req/s":>9}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}'
+    print(header)
+    print('-' * len(header))
+    everything = []
+    for endpoint, values in sorted(results.latencies.items(), key=lambda item: -len(item[1])):
+        values = sorted(values)
+        everything.extend(values)
+        print(
+            f'{endpoint:<28}{len(values):>8}{len(values) / elapsed:>9.1f}{results.errors[endpoint]:>8}'
+            f'{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}'
+            f'{percentile(values, 99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}'
+        )
+    if everything:
+        everything.sort()
+        print('-' * len(header))
+        print(
+            f'{"all":<28}{len(everything):>8}{len(everything) / elapsed:>9.1f}{errors:>8}'
+            f'{percentile(everything, 50) * 1000:>10.1f}{percentile(everything, 95) * 1000:>10.1f}'
+            f'{percentile(everything, 99) * 1000:>10.1f}{everything[-1] * 1000:>10.1f}'
+        )
+        print(f'mean latency {statistics.fmean(everything) * 1000:.1f} ms')
+
+
+def parse_id_range(value):
+    first, _, last = value.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000/api')
+    parser.add_argument('--student-ids', type=parse_id_range, required=True,
+                        help='seeded student ids to log in as, e.g. 1-5000 (printed by seed_lms)')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--think-time', type=float, default=0, help='max random pause between scenarios (s)')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, help='random seed for the scenario mix')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    results = Results()
+    started = time.monotonic()
+    stop_at = started + args.duration
+    # Distinct students where possible, so two users never race on one quiz attempt
+    if args.users <= len(args.student_ids):
+        student_ids = random.sample(args.student_ids, args.users)
+    else:
+        student_ids = random.choices(args.student_ids, k=args.users)
+    users = [VirtualUser(args, results, student_id, stop_at) for student_id in student_ids]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    report(results, time.monotonic() - started)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+How many idle event streams can one ASGI process hold?
+
+Opens N concurrent ``/api/events/<user_type>/<user_id>/`` streams against a
+running server, holds them open, then optionally sends one chat message and
+measures how many streams receive it and how fast. Only the standard library
+is used, so the client itself stays cheap enough not to be the bottleneck.
+
+Start the server with a single worker, e.g.
+
+    uvicorn knoology_lms.asgi:application --workers 1 --port 8000
+
+and run
+
+    python benchmarks/sse_idle_connections.py --connections 5000 --user-id 1 \\
+        --send-from-teacher 1 --server-pid <uvicorn pid>
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def server_rss(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return f'{int(line.split()[1]) / 1024:.1f} MB'
+    except OSError:
+        pass
+    return 'unavailable'
+
+
+class Stream:
+    def __init__(self, host, port, path):
+        self.host, self.port, self.path = host, port, path
+        self.reader = self.writer = None
+        self.received_at = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f'GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\n'
+            'Accept: text/event-stream\r\n\r\n'.encode()
+        )
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if b' 200 ' not in status_line:
+            raise RuntimeError(status_line.decode(errors='replace').strip())
+        await self.reader.readuntil(b'\r\n\r\n')
+
+    async def wait_for(self, event_name):
+        marker = f'event: {event_name}'.encode()
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            if marker in line:
+                self.received_at = time.perf_counter()
+                return
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def post_json(host, port, path, body):
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = json.dumps(body).encode()
+    writer.write(
+        f'POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+        f'Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode() + payload
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    return status_line.decode().strip()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    path = f'{url.path.rstrip("/")}/events/{args.user_type}/{args.user_id}/'
+
+    streams = [Stream(host, port, path) for _ in range(args.connections)]
+    started = time.perf_counter()
+    opened, failures = [], {}
+    for i in range(0, len(streams), args.ramp):
+        batch = streams[i:i + args.ramp]
+        results = await asyncio.gather(*(s.open() for s in batch), return_exceptions=True)
+        for stream, result in zip(batch, results):
+            if isinstance(result, Exception):
+                key = type(result).__name__ + ': ' + str(result)[:80]
+                failures[key] = failures.get(key, 0) + 1
+                stream.close()
+            else:
+                opened.append(stream)
+    open_seconds = time.perf_counter() - started
+
+    print(f'open streams:   {len(opened)}/{args.connections} in {open_seconds:.1f}s')
+    for reason, count in failures.items():
+        print(f'  failed ({count}): {reason}')
+    if args.server_pid:
+        print(f'server RSS:     {server_rss(args.server_pid)}')
+
+    print(f'holding for {args.hold}s ...')
+    await asyncio.sleep(args.hold)
+    alive = sum(1 for s in opened if not s.reader.at_eof())
+    print(f'still open:     {alive}')
+    if args.server_pid:
+        print(f'server RSS:     {server_rss(args.server_pid)}')
+
+    if args.send_from_teacher and opened:
+        if args.user_type != 'student':
+            raise SystemExit('--send-from-teacher needs --user-type student')
+        waiters = [asyncio.create_task(s.wait_for('chat_message')) for s in opened]
+        sent_at = time.perf_counter()
+        status_line = await post_json(host, port, f'{url.path.rstrip("/")}/send-message/', {
+            'teacher_id': args.send_from_teacher,
+            'student_id': args.user_id,
+            'message': 'benchmark ping',
+            'message_from': 'teacher',
+        })
+        print(f'send-message:   {status_line}')
+        await asyncio.wait(waiters, timeout=args.delivery_timeout)
+        latencies = sorted((s.received_at - sent_at) * 1000 for s in opened if s.received_at)
+        print(f'delivered:      {len(latencies)}/{len(opened)}')
+        if latencies:
+            print(
+                f'latency ms:     p50 {statistics.median(latencies):.1f}  '
+                f'p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}  max {latencies[-1]:.1f}'
+            )
+
+    for stream in opened:
+        stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000/api')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--ramp', type=int, default=200, help='streams opened concurrently per step')
+    parser.add_argument('--hold', type=float, default=20, help='seconds to hold the streams idle')
+    parser.add_argument('--user-type', default='student', choices=['student', 'teacher'])
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--send-from-teacher', type=int, help='teacher id that sends one message at the end')
+    parser.add_argument('--delivery-timeout', type=float, default=10)
+    parser.add_argument('--server-pid', type=int, help='report the server process RSS (Linux only)')
+    args = parser.parse_args()
+
+    print(f'file descriptor limit: {raise_fd_limit()}')
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,11 @@ ASGI config for knoology_lms project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The server-sent events endpoint (/api/events/<user_type>/<user_id>/, see
+main/realtime.py) must be served through this application, e.g. with
+``uvicorn knoology_lms.asgi:application``; under WSGI every open stream would
+tie up a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'main',
     'corsheaders',
@@ -49,14 +51,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.authentication.TokenAuthMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'knoology_lms.urls'
@@ -90,9 +95,83 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # The app is served by ASGI (the event stream needs it), where every
+        # request gets its own connection object, so CONN_MAX_AGE cannot keep
+        # connections open usefully. They are reused through psycopg 3's pool
+        # instead: each process keeps DB_POOL_MIN_SIZE connections open, opens
+        # up to DB_POOL_MAX_SIZE, and a request waits at most DB_POOL_TIMEOUT
+        # seconds for a free one. Django requires CONN_MAX_AGE = 0 with a pool.
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            },
+        },
     }
 }
 
+# Caches. ``default`` is local to each server process; ``shared`` is a file
+# cache every process on the host reads. Point CACHE_DIR at a directory on
+# shared storage, or swap the backend for Redis/Memcached, to share it further.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'knoology-lms',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', 5000))},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'knoology_lms_cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('SHARED_CACHE_MAX_ENTRIES', 20000))},
+    },
+}
+# Seconds a cached catalog response (main/response_cache.py) is kept; 0 turns it off
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Query budget (main/middleware.py): requests that run more queries than the
+# budget for their URL name (or the default) are logged, or raise when
+# QUERY_BUDGET_RAISE is on.
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 30))
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'false').lower() in ('1', 'true', 'yes')
+QUERY_BUDGETS = {
+    'check-enrollment': 1,
+    'check-favorite': 1,
+    'check-rating': 1,
+    'unread-notification-count': 1,
+    'chat-users': 1,
+    'teacher_dashboard_stats': 2,
+    'submit-quiz-attempt': 8,
+}
+
+# Request metrics (main/metrics.py), served to staff users at /api/metrics/.
+# When disabled the middleware is not loaded at all. Requests slower than
+# METRICS_SLOW_REQUEST_SECONDS are logged with their slowest SQL statements,
+# to METRICS_SLOW_REQUEST_LOG if set, otherwise to stderr.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_SLOW_REQUEST_SECONDS = float(os.getenv('METRICS_SLOW_REQUEST_SECONDS') or 0) or None
+METRICS_SLOW_REQUEST_LOG = os.getenv('METRICS_SLOW_REQUEST_LOG')
+if METRICS_SLOW_REQUEST_LOG:
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'slow_requests': {
+                'class': 'logging.FileHandler',
+                'filename': METRICS_SLOW_REQUEST_LOG,
+            },
+        },
+        'loggers': {
+            'main.slow_requests': {
+                'handlers': ['slow_requests'],
+                'level': 'WARNING',
+                'propagate': False,
+            },
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,12 +191,69 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
-#REST_FRAMEWORK = {
- #   'DEFAULT_AUTHENTICATION_CLASSES': [
- #       'rest_framework.authentication.TokenAuthentication',
- #   ],
-   
-#}
+# Keyset pagination (main/pagination.py). Page sizes are per endpoint, keyed
+# by URL name; clients may ask for less or more with ?page_size= up to the max.
+API_PAGE_SIZES = {
+    'course-list': 20,
+    'search-courses': 20,
+    'student-quiz-attempts': 50,
+    'all-quiz-attempts': 50,
+    'teacher-all-quiz-attempts': 50,
+    'teacher-student-quiz-attempts': 50,
+}
+API_MAX_PAGE_SIZE = 100
+# Rows fetched per round trip when a list is streamed with ?stream=1
+API_STREAM_CHUNK_SIZE = 500
+
+# Notification fan-out (main/notifications.py). Courses with more enrolled
+# students than the sync limit are notified by a background job.
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 1000))
+NOTIFICATION_SYNC_LIMIT = int(os.getenv('NOTIFICATION_SYNC_LIMIT', 1000))
+NOTIFICATION_WORKERS = int(os.getenv('NOTIFICATION_WORKERS', 2))
+
+# Course certificates (main/certificates.py) are rendered once, by a
+# background thread, and stored under MEDIA_ROOT/certificates/.
+CERTIFICATE_LOGO = os.getenv('CERTIFICATE_LOGO', str(BASE_DIR / 'lms_frontend' / 'public' / 'knoologo1.png'))
+CERTIFICATE_WORKERS = int(os.getenv('CERTIFICATE_WORKERS', 1))
+
+# Outbound email queue (main/outbox.py). Mail is stored with the request's
+# transaction and sent by a background thread, or by
+# `manage.py send_queued_email --loop` when OUTBOX_IN_PROCESS is off.
+OUTBOX_IN_PROCESS = os.getenv('OUTBOX_IN_PROCESS', 'true').lower() in ('1', 'true', 'yes')
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+# Seconds before the first retry, doubled after every further failure
+OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', 30))
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv('OUTBOX_CLAIM_TIMEOUT', 300))
+
+# Student password hashing (main/passwords.py) runs on a bounded thread pool;
+# requests beyond the queue get a 503 instead of waiting for CPU.
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_HASHING_QUEUE = int(os.getenv('PASSWORD_HASHING_QUEUE', 32))
+# Login attempt limits (main/ratelimit.py): (attempts, window in seconds).
+# Counted in the ``shared`` cache, so the limits hold across server processes.
+LOGIN_RATE_LIMITS = {
+    'account': (int(os.getenv('LOGIN_ACCOUNT_ATTEMPTS', 5)), 300),
+    'ip': (int(os.getenv('LOGIN_IP_ATTEMPTS', 30)), 300),
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        # Signed access tokens from teacher_login / student_login (main/authentication.py)
+        'main.authentication.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
+# Access tokens. Views with a teacher/student id in the URL only serve the
+# token's own account; with AUTH_TOKEN_REQUIRED they also refuse requests
+# without a token.
+AUTH_TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', 12 * 60 * 60))
+AUTH_TOKEN_REQUIRED = os.getenv('AUTH_TOKEN_REQUIRED', 'false').lower() in ('1', 'true', 'yes')
+# In-process LRU cache of teacher/student profile data; 0 disables it
+AUTH_PROFILE_CACHE_SIZE = int(os.getenv('AUTH_PROFILE_CACHE_SIZE', 1024))
+AUTH_PROFILE_CACHE_TTL = int(os.getenv('AUTH_PROFILE_CACHE_TTL', 300))
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -40,6 +40,9 @@ const Loader = ({ size = "medium", color = "#08AEEA" }) => {
     );
 };
 
+// How often the open conversation is checked for new messages
+const POLL_INTERVAL = 5000;
+
 const StudentChatPanel = () => {
     const navigate = useNavigate();
     const studentId = localStorage.getItem('studentId') || (localStorage.getItem('studentInfo') ? JSON.parse(localStorage.getItem('studentInfo')).studentId : null);
@@ -50,6 +53,9 @@ const StudentChatPanel = () => {
     const [loading, setLoading] = useState(true);
     const [loadingMessages, setLoadingMessages] = useState(false);
     const messagesEndRef = useRef(null);
+    // The conversation on screen and the id of its newest message; polls only ask for what came after it
+    const conversationRef = useRef(null);
+    const lastMessageIdRef = useRef(null);
 
     // Check if a specific teacher ID was passed from another page
     const selectedTeacherId = localStorage.getItem('selectedTeacherId');
@@ -81,6 +87,13 @@ const StudentChatPanel = () => {
         }
     }, [messages]);
 
+    // Poll the open conversation for new messages only
+    useEffect(() => {
+        if (!selectedTeacher) return;
+        const interval = setInterval(() => fetchNewMessages(selectedTeacher.id), POLL_INTERVAL);
+        return () => clearInterval(interval);
+    }, [selectedTeacher]);
+
     // Fetch teachers who have chatted with this student
     const fetchChatUsers = async () => {
         setLoading(true);
@@ -120,10 +133,14 @@ const StudentChatPanel = () => {
     // Fetch messages for selected teacher
     const fetchMessages = async (teacherId) => {
         setLoadingMessages(true);
+        conversationRef.current = String(teacherId);
+        lastMessageIdRef.current = null;
         try {
             const response = await axios.get(`${apiUrl}/chat-messages/student/${studentId}/${teacherId}/`);
             if (response.data.status === 'success') {
-                setMessages(response.data.data.messages);
+                const history = response.data.data.messages;
+                setMessages(history);
+                lastMessageIdRef.current = history.length > 0 ? history[history.length - 1].id : 0;
                 const teacher = response.data.data.other_user;
                 setSelectedTeacher(teacher);
             } else {
@@ -136,6 +153,36 @@ const StudentChatPanel = () => {
         }
     };
 
+    // Fetch only the messages newer than the last one shown
+    const fetchNewMessages = async (teacherId) => {
+        if (lastMessageIdRef.current === null) return;
+        try {
+            const response = await axios.get(`${apiUrl}/chat-messages/student/${studentId}/${teacherId}/`, {
+                params: { after_id: lastMessageIdRef.current }
+            });
+            // Drop the answer if another conversation was opened meanwhile
+            if (response.data.status === 'success' && conversationRef.current === String(teacherId)) {
+                appendMessages(response.data.data.messages);
+            }
+        } catch (error) {
+            console.error('Error fetching new messages:', error);
+        }
+    };
+
+    // Add messages not shown yet, in id order. Only polls move the cursor:
+    // a sent message may have a higher id than replies the next poll still has to fetch
+    const appendMessages = (newMessages, fromPoll = true) => {
+        if (newMessages.length === 0) return;
+        if (fromPoll) {
+            lastMessageIdRef.current = Math.max(lastMessageIdRef.current || 0, newMessages[newMessages.length - 1].id);
+        }
+        setMessages(previous => {
+            const shown = new Set(previous.map(message => message.id));
+            const fresh = newMessages.filter(message => !shown.has(message.id));
+            return fresh.length > 0 ? [...previous, ...fresh].sort((a, b) => a.id - b.id) : previous;
+        });
+    };
+
     // Send a new message
     const sendMessage = async (e) => {
         e.preventDefault();
@@ -153,7 +200,7 @@ const StudentChatPanel = () => {
 
             if (response.data.status === 'success') {
                 // Add new message to the conversation
-                setMessages([...messages, response.data.data]);
+                appendMessages([response.data.data], false);
                 setNewMessage(''); // Clear the input
 
                 // Update chat users list to reflect the latest message
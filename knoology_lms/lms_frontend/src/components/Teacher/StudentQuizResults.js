@@ -111,7 +111,7 @@ function StudentQuizResults() {
         // If student_id is provided, fetch results for that student
         // Otherwise fetch all results for teacher's students
         const endpoint = student_id
-          ? `${apiUrl}/teacher-student-quiz-attempts/${teacherId}/${student_id}/`
+          ? `${apiUrl}/teacher-student-quiz-attempts/${teacherId}/${student_id}/?include=responses`
           : `${apiUrl}/teacher-all-quiz-attempts/${teacherId}/`;
 
         const response = await axios.get(endpoint);
@@ -177,7 +177,7 @@ function StudentQuizResults() {
     if (!student.questions_data) {
       try {
         // Make sure to include teacher ID in the request to verify permissions
-        const response = await axios.get(`${apiUrl}/teacher-student-quiz-attempts/${teacherId}/${student.student}/`);
+        const response = await axios.get(`${apiUrl}/teacher-student-quiz-attempts/${teacherId}/${student.student}/?include=responses`);
         if (response.data.status === 'success') {
           // Find the matching attempt for this student and quiz
           const matchingAttempt = response.data.data.find(
@@ -38,6 +38,9 @@ const Loader = ({ size = "medium", color = "#8e44ad" }) => {
     );
 };
 
+// How often the open conversation is checked for new messages
+const POLL_INTERVAL = 5000;
+
 const TeacherChatPanel = () => {
     const navigate = useNavigate();
     const teacherId = localStorage.getItem('teacherId') || (localStorage.getItem('teacherData') ? JSON.parse(localStorage.getItem('teacherData')).teacherId : null);
@@ -48,6 +51,9 @@ const TeacherChatPanel = () => {
     const [loading, setLoading] = useState(true);
     const [loadingMessages, setLoadingMessages] = useState(false);
     const messagesEndRef = useRef(null);
+    // The conversation on screen and the id of its newest message; polls only ask for what came after it
+    const conversationRef = useRef(null);
+    const lastMessageIdRef = useRef(null);
 
     // Check if a specific student ID was passed from another page
     const selectedStudentId = localStorage.getItem('selectedStudentId');
@@ -80,6 +86,13 @@ const TeacherChatPanel = () => {
         }
     }, [messages]);
 
+    // Poll the open conversation for new messages only
+    useEffect(() => {
+        if (!selectedStudent) return;
+        const interval = setInterval(() => fetchNewMessages(selectedStudent.id), POLL_INTERVAL);
+        return () => clearInterval(interval);
+    }, [selectedStudent]);
+
     // Fetch students who have chatted with this teacher
     const fetchChatUsers = async () => {
         setLoading(true);
@@ -119,10 +132,14 @@ const TeacherChatPanel = () => {
     // Fetch messages for selected student
     const fetchMessages = async (studentId) => {
         setLoadingMessages(true);
+        conversationRef.current = String(studentId);
+        lastMessageIdRef.current = null;
         try {
             const response = await axios.get(`${apiUrl}/chat-messages/teacher/${teacherId}/${studentId}/`);
             if (response.data.status === 'success') {
-                setMessages(response.data.data.messages);
+                const history = response.data.data.messages;
+                setMessages(history);
+                lastMessageIdRef.current = history.length > 0 ? history[history.length - 1].id : 0;
                 const student = response.data.data.other_user;
                 setSelectedStudent(student);
             } else {
@@ -135,6 +152,36 @@ const TeacherChatPanel = () => {
         }
     };
 
+    // Fetch only the messages newer than the last one shown
+    const fetchNewMessages = async (studentId) => {
+        if (lastMessageIdRef.current === null) return;
+        try {
+            const response = await axios.get(`${apiUrl}/chat-messages/teacher/${teacherId}/${studentId}/`, {
+                params: { after_id: lastMessageIdRef.current }
+            });
+            // Drop the answer if another conversation was opened meanwhile
+            if (response.data.status === 'success' && conversationRef.current === String(studentId)) {
+                appendMessages(response.data.data.messages);
+            }
+        } catch (error) {
+            console.error('Error fetching new messages:', error);
+        }
+    };
+
+    // Add messages not shown yet, in id order. Only polls move the cursor:
+    // a sent message may have a higher id than replies the next poll still has to fetch
+    const appendMessages = (newMessages, fromPoll = true) => {
+        if (newMessages.length === 0) return;
+        if (fromPoll) {
+            lastMessageIdRef.current = Math.max(lastMessageIdRef.current || 0, newMessages[newMessages.length - 1].id);
+        }
+        setMessages(previous => {
+            const shown = new Set(previous.map(message => message.id));
+            const fresh = newMessages.filter(message => !shown.has(message.id));
+            return fresh.length > 0 ? [...previous, ...fresh].sort((a, b) => a.id - b.id) : previous;
+        });
+    };
+
     // Send a new message
     const sendMessage = async (e) => {
         e.preventDefault();
@@ -152,7 +199,7 @@ const TeacherChatPanel = () => {
 
             if (response.data.status === 'success') {
                 // Add new message to the conversation
-                setMessages([...messages, response.data.data]);
+                appendMessages([response.data.data], false);
                 setNewMessage(''); // Clear the input
 
                 // Update chat users list to reflect the latest message
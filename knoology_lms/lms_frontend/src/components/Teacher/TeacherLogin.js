@@ -46,7 +46,8 @@ function TeacherLogin() {
                 localStorage.setItem('teacherData', JSON.stringify({
                     teacherId: response.data.teacher_id,
                     fullName: response.data.full_name,
-                    email: response.data.email
+                    email: response.data.email,
+                    accessToken: response.data.access_token
                 }));
 
                 // Dispatch event to notify Header component
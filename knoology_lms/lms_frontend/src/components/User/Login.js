@@ -47,7 +47,8 @@ function Login() {
                     studentId: response.data.student_id,
                     username: response.data.username,
                     fullname: response.data.fullname,
-                    email: response.data.email
+                    email: response.data.email,
+                    accessToken: response.data.access_token
                 }));
                 // Dispatch event to notify Header component
                 window.dispatchEvent(new Event('studentLoginChange'));
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { apiUrl } from '../../config';
 import axios from 'axios';
+import { withAccessToken } from '../../utils/auth';
 
 const ChatNotification = ({ userType, userId }) => {
     const [unreadCount, setUnreadCount] = useState(0);
@@ -10,11 +11,19 @@ const ChatNotification = ({ userType, userId }) => {
             // Fetch unread messages on component mount
             fetchUnreadCount();
             
-            // Set up interval to check for new messages
-            const interval = setInterval(fetchUnreadCount, 30000); // Check every 30 seconds
+            // Refresh as soon as the server pushes a new message or notification
+            const events = new EventSource(withAccessToken(`${apiUrl}/events/${userType}/${userId}/`));
+            events.addEventListener('chat_message', fetchUnreadCount);
+            events.addEventListener('notification', fetchUnreadCount);
+
+            // Slow fallback poll in case the event stream is unavailable
+            const interval = setInterval(fetchUnreadCount, 300000); // Check every 5 minutes
             
-            // Clean up interval on unmount
-            return () => clearInterval(interval);
+            // Close the stream and clear the interval on unmount
+            return () => {
+                events.close();
+                clearInterval(interval);
+            };
         }
     }, [userId]);
     
@@ -6,6 +6,9 @@ import App from './App';
 import reportWebVitals from './reportWebVitals';
 import 'bootstrap/dist/css/bootstrap.min.css';
 import 'bootstrap/dist/js/bootstrap.bundle.min';
+import { installAuthInterceptor } from './utils/auth';
+
+installAuthInterceptor();
 
 
 const root = ReactDOM.createRoot(document.getElementById('root'));
@@ -0,0 +1,77 @@
+/**
+ * Access tokens returned by the login endpoints
+ */
+import axios from 'axios';
+import { apiUrl } from '../config';
+
+const readToken = (key) => {
+  try {
+    return JSON.parse(localStorage.getItem(key) || '{}').accessToken || null;
+  } catch (e) {
+    return null;
+  }
+};
+
+/**
+ * Token of the signed-in account. Teacher pages use the teacher's token and
+ * every other page the student's, falling back to whichever one is stored.
+ * @returns {string|null}
+ */
+export const getAccessToken = () => {
+  const teacherToken = readToken('teacherData');
+  const studentToken = readToken('studentInfo');
+  if (window.location.pathname.startsWith('/teacher')) {
+    return teacherToken || studentToken;
+  }
+  return studentToken || teacherToken;
+};
+
+/**
+ * Appends the access token to a URL, for requests that cannot send headers (EventSource)
+ * @param {string} url
+ * @returns {string}
+ */
+export const withAccessToken = (url) => {
+  const token = getAccessToken();
+  if (!token) return url;
+  return `${url}${url.includes('?') ? '&' : '?'}access_token=${encodeURIComponent(token)}`;
+};
+
+/**
+ * Forgets a stored token the API refused, so later requests go out without it
+ * @param {string} token
+ */
+export const dropAccessToken = (token) => {
+  ['teacherData', 'studentInfo'].forEach((key) => {
+    try {
+      const data = JSON.parse(localStorage.getItem(key) || 'null');
+      if (data && data.accessToken === token) {
+        delete data.accessToken;
+        localStorage.setItem(key, JSON.stringify(data));
+      }
+    } catch (e) {
+      // Not JSON, nothing stored by the login pages
+    }
+  });
+};
+
+/**
+ * Sends the access token with every axios request to the API, and drops it
+ * once the API answers 401 (expired or malformed token)
+ */
+export const installAuthInterceptor = () => {
+  axios.interceptors.request.use((config) => {
+    const token = getAccessToken();
+    if (token && config.url && config.url.startsWith(apiUrl) && !config.headers.Authorization) {
+      config.headers.Authorization = `Bearer ${token}`;
+    }
+    return config;
+  });
+  axios.interceptors.response.use(undefined, (error) => {
+    const sent = error.config && error.config.headers && error.config.headers.Authorization;
+    if (error.response && error.response.status === 401 && sent && sent.startsWith('Bearer ')) {
+      dropAccessToken(sent.slice('Bearer '.length));
+    }
+    return Promise.reject(error);
+  });
+};
@@ -0,0 +1,202 @@
+"""
+Account OTP mail and bulk account import.
+
+Saving a Teacher or Student has no side effects, so accounts can be created
+with bulk_create. The registration views set the OTP with generate_otp() and
+queue the mail with queue_otp_email() themselves.
+
+import_accounts() creates students or teachers from CSV rows: rows are
+validated against each other and the database, student passwords are hashed
+in a process pool (hashing is CPU bound and dominates the import), and the
+accounts are written with bulk_create in one transaction. Sending OTPs is an
+optional stage that queues one outbox mail per account; without it imported
+accounts are marked verified.
+"""
+import csv
+import io
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import Student, Teacher
+from .outbox import queue_email, queue_emails
+
+OTP_FROM_EMAIL = 'knoologylms@gmail.com'
+
+ACCOUNT_MODELS = {'student': Student, 'teacher': Teacher}
+REQUIRED_COLUMNS = {
+    'student': ['fullname', 'username', 'email', 'password', 'interested_categories'],
+    'teacher': ['full_name', 'email', 'mobile_number', 'password', 'qualification', 'skills'],
+}
+OPTIONAL_COLUMNS = {
+    'student': [],
+    'teacher': ['bio'],
+}
+UNIQUE_COLUMNS = {
+    'student': ['username', 'email'],
+    'teacher': ['email', 'mobile_number'],
+}
+# Values per IN (...) lookup when checking for existing accounts
+LOOKUP_CHUNK_SIZE = 500
+# Passwords handed to a hashing process at a time
+HASH_CHUNK_SIZE = 64
+
+
+def generate_otp():
+    return str(random.randint(100000, 999999))
+
+
+def _otp_email(user, resend=False):
+    user_type = 'teacher' if isinstance(user, Teacher) else 'student'
+    return {
+        'subject': f'Verify Your Knoology LMS {user_type.capitalize()} Account',
+        'body': 'Please verify your account',
+        'recipients': [user.email],
+        'from_email': OTP_FROM_EMAIL,
+        'html_message': f'<p>Your {"new " if resend else ""}OTP is </p><p>{user.otp_digit}</p>',
+    }
+
+
+def queue_otp_email(user, resend=False):
+    """Queue the verification mail carrying ``user.otp_digit``."""
+    return queue_email(**_otp_email(user, resend))
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    otp_queued: int = 0
+    # (CSV line number, message) for every row that was skipped
+    errors: list = field(default_factory=list)
+
+
+def read_csv(file):
+    """Rows of a CSV file or its content (bytes or str) as dicts keyed by lower-case column name, with line numbers."""
+    if isinstance(file, bytes):
+        file = file.decode('utf-8-sig')
+    if isinstance(file, str):
+        file = io.StringIO(file)
+    reader = csv.DictReader(file)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    return [(reader.line_num, row) for row in reader]
+
+
+def _is_hashed(password):
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def _hash_passwords(passwords, workers):
+    """make_password over a process pool. Values that already are hashes are kept."""
+    pending = [i for i, password in enumerate(passwords) if not _is_hashed(password)]
+    hashed = list(passwords)
+    if not pending:
+        return hashed
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pending) < HASH_CHUNK_SIZE:
+        results = map(make_password, (passwords[i] for i in pending))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_process) as executor:
+            results = list(executor.map(
+                make_password, [passwords[i] for i in pending], chunksize=HASH_CHUNK_SIZE
+            ))
+    for i, value in zip(pending, results):
+        hashed[i] = value
+    return hashed
+
+
+def _init_hash_process():
+    # Needed where workers are spawned rather than forked (macOS, Windows)
+    import django
+    django.setup()
+
+
+def _existing_values(model, column, values):
+    existing = set()
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(model.objects.filter(**{f'{column}__in': chunk}).values_list(column, flat=True))
+    return existing
+
+
+def validate_rows(user_type, rows):
+    """Split ``(line, row)`` pairs into clean field dicts and ``(line, message)`` errors."""
+    required = REQUIRED_COLUMNS[user_type]
+    columns = required + OPTIONAL_COLUMNS[user_type]
+    unique = UNIQUE_COLUMNS[user_type]
+    valid, errors = [], []
+    seen = {column: set() for column in unique}
+
+    for line, row in rows:
+        values = {column: (row.get(column) or '').strip() for column in columns}
+        missing = [column for column in required if not values[column]]
+        if missing:
+            errors.append((line, f'missing {", ".join(missing)}'))
+            continue
+        values['email'] = values['email'].lower()
+        try:
+            validate_email(values['email'])
+        except ValidationError:
+            errors.append((line, f'invalid email {values["email"]}'))
+            continue
+        duplicate = next((column for column in unique if values[column] in seen[column]), None)
+        if duplicate:
+            errors.append((line, f'{duplicate} {values[duplicate]} appears earlier in the file'))
+            continue
+        for column in unique:
+            seen[column].add(values[column])
+        valid.append((line, values))
+
+    model = ACCOUNT_MODELS[user_type]
+    existing = {column: _existing_values(model, column, seen[column]) for column in unique}
+    clean = []
+    for line, values in valid:
+        taken = next((column for column in unique if values[column] in existing[column]), None)
+        if taken:
+            errors.append((line, f'{taken} {values[taken]} is already registered'))
+        else:
+            clean.append(values)
+    return clean, errors
+
+
+def import_accounts(user_type, rows, send_otp=False, workers=None, chunk_size=1000):
+    """
+    Create ``user_type`` ('student' or 'teacher') accounts from ``(line, row)``
+    pairs as returned by read_csv(). Invalid or already registered rows are
+    skipped and reported. With ``send_otp`` the accounts are created
+    unverified and an OTP mail is queued for each; otherwise they are created
+    verified.
+    """
+    model = ACCOUNT_MODELS[user_type]
+    clean, errors = validate_rows(user_type, rows)
+    result = ImportResult(errors=errors)
+    if not clean:
+        return result
+
+    if user_type == 'student':
+        # Teacher passwords are stored as plaintext, see teacher_login
+        passwords = _hash_passwords([values['password'] for values in clean], workers)
+        for values, password in zip(clean, passwords):
+            values['password'] = password
+
+    accounts = [
+        model(**values, verify_status=not send_otp, otp_digit=generate_otp() if send_otp else None)
+        for values in clean
+    ]
+    with transaction.atomic():
+        model.objects.bulk_create(accounts, batch_size=chunk_size)
+        if send_otp:
+            queue_emails([_otp_email(account) for account in accounts], batch_size=chunk_size)
+            result.otp_queued = len(accounts)
+    result.created = len(accounts)
+    return result
@@ -1,11 +1,87 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
 from . import models
+from .accounts import REQUIRED_COLUMNS, import_accounts, read_csv
+
+# Skipped rows listed after an import; the rest are only counted
+IMPORT_ERRORS_SHOWN = 20
+
+
+class AccountImportForm(forms.Form):
+    csv_file = forms.FileField(label='CSV file')
+    send_otp = forms.BooleanField(
+        required=False,
+        label='Send OTP emails',
+        help_text='Create the accounts unverified and queue an OTP email for each. '
+                  'Otherwise they are created verified.'
+    )
+
+
+class AccountImportAdmin(admin.ModelAdmin):
+    """Adds an "Import CSV" page that bulk-creates accounts with main.accounts.import_accounts."""
+    user_type = None
+    change_list_template = 'admin/main/account_change_list.html'
+
+    def get_urls(self):
+        return [
+            path(
+                'import-csv/',
+                self.admin_site.admin_view(self.import_csv_view),
+                name=f'main_{self.user_type}_import_csv',
+            ),
+        ] + super().get_urls()
+
+    def import_csv_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = AccountImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                rows = read_csv(form.cleaned_data['csv_file'].read())
+            except (UnicodeDecodeError, ValueError) as e:
+                form.add_error('csv_file', f'Could not read the file: {e}')
+            else:
+                result = import_accounts(self.user_type, rows, send_otp=form.cleaned_data['send_otp'])
+                self.message_user(request, (
+                    f'Created {result.created} account(s), skipped {len(result.errors)} row(s), '
+                    f'queued {result.otp_queued} OTP email(s).'
+                ), messages.SUCCESS)
+                for line, message in result.errors[:IMPORT_ERRORS_SHOWN]:
+                    self.message_user(request, f'Line {line}: {message}', messages.WARNING)
+                if len(result.errors) > IMPORT_ERRORS_SHOWN:
+                    self.message_user(
+                        request, f'... and {len(result.errors) - IMPORT_ERRORS_SHOWN} more', messages.WARNING
+                    )
+                return redirect(f'admin:main_{self.user_type}_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Import {self.model._meta.verbose_name_plural.split(". ")[-1].lower()}',
+            'form': form,
+            'columns': REQUIRED_COLUMNS[self.user_type],
+        }
+        return TemplateResponse(request, 'admin/main/import_accounts.html', context)
+
+
+class TeacherAdmin(AccountImportAdmin):
+    user_type = 'teacher'
+
+
+class StudentAdmin(AccountImportAdmin):
+    user_type = 'student'
+
 
 # Register your models here.
-admin.site.register(models.Teacher)
+admin.site.register(models.Teacher, TeacherAdmin)
 admin.site.register(models.Course)
 admin.site.register(models.CourseCategory)
-admin.site.register(models.Student)
+admin.site.register(models.Student, StudentAdmin)
 admin.site.register(models.Chapter)
 admin.site.register(models.StudentCourseEnrollment)
 admin.site.register(models.CourseRating)
@@ -21,3 +97,6 @@ admin.site.register(models.Notification)
 admin.site.register(models.StudyMaterial)
 admin.site.register(models.ContactUs)
 admin.site.register(models.PasswordResetToken)
+admin.site.register(models.NotificationJob)
+admin.site.register(models.OutboundEmail)
+admin.site.register(models.Conversation)
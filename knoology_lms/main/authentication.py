@@ -0,0 +1,285 @@
+"""
+Stateless access tokens for teachers and students.
+
+teacher_login and student_login return an access token: the principal's type
+and id, timestamped and HMAC-signed with SECRET_KEY (django.core.signing, so
+SECRET_KEY_FALLBACKS keeps tokens valid across a key rotation). A token is
+valid for AUTH_TOKEN_TTL seconds and cannot be revoked earlier.
+
+Clients send it as ``Authorization: Bearer <token>``, or as an
+``access_token`` query parameter on GET requests where headers cannot be set
+(EventSource). TokenAuthMiddleware verifies it without touching the database
+and then makes every view with a ``teacher_id``/``student_id`` (or
+``user_type``/``user_id``) in its URL act for the token's principal: an id of
+the principal's own type must be the principal's, and a URL that names only
+accounts of the other type is refused unless the view is marked with
+``allow_cross_type`` (a teacher reading a student's courses). Requests without
+a token are let through unless AUTH_TOKEN_REQUIRED is on. An expired or
+malformed token is answered with 401 only where the URL names an account and
+the view is not AllowAny, or tokens are required; elsewhere the request is
+treated as anonymous, so a stale token stored by the frontend cannot lock out
+public pages or the login forms. Views that take the account from the request
+body check it with body_account(). TokenAuthentication exposes the principal
+to DRF as ``request.user``.
+
+Profile data (name, email) is loaded on demand through a small in-process LRU
+cache (AUTH_PROFILE_CACHE_SIZE entries, 0 turns it off), cleared for an
+account when it is saved or deleted (see main/signals.py).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.models import F
+from django.core import signing
+from django.http import JsonResponse
+from rest_framework import authentication, exceptions
+from rest_framework.permissions import AllowAny
+
+from .models import Student, Teacher
+
+TOKEN_SALT = 'main.authentication.access-token'
+DEFAULT_TOKEN_TTL = 12 * 60 * 60
+DEFAULT_PROFILE_CACHE_SIZE = 1024
+DEFAULT_PROFILE_CACHE_TTL = 300
+
+USER_TYPES = {'teacher': Teacher, 'student': Student}
+# URL kwarg holding the id of each type of principal
+URL_ID_KWARGS = {'teacher': 'teacher_id', 'student': 'student_id'}
+# Account views that take the id as ``pk``
+ACCOUNT_URL_NAMES = {'teacher-detail': 'teacher', 'student-detail': 'student'}
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class Principal:
+    """The teacher or student a token was issued to. Loading it needs no query."""
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, user_type, user_id):
+        self.user_type = user_type
+        self.id = user_id
+
+    def __repr__(self):
+        return f'<Principal {self.user_type} {self.id}>'
+
+    def __eq__(self, other):
+        return isinstance(other, Principal) and (self.user_type, self.id) == (other.user_type, other.id)
+
+    def __hash__(self):
+        return hash((self.user_type, self.id))
+
+    @property
+    def is_teacher(self):
+        return self.user_type == 'teacher'
+
+    @property
+    def is_student(self):
+        return self.user_type == 'student'
+
+    @property
+    def profile(self):
+        """Name and email of the account, or None if it no longer exists."""
+        return get_profile(self.user_type, self.id)
+
+
+def issue_token(user):
+    user_type = 'teacher' if isinstance(user, Teacher) else 'student'
+    return signing.dumps({'type': user_type, 'id': user.id}, salt=TOKEN_SALT)
+
+
+def read_token(token):
+    """Return the Principal for ``token``; raises InvalidToken if it is forged, malformed or expired."""
+    max_age = getattr(settings, 'AUTH_TOKEN_TTL', DEFAULT_TOKEN_TTL)
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        raise InvalidToken('Token has expired')
+    except signing.BadSignature:
+        raise InvalidToken('Invalid token')
+    if not isinstance(payload, dict) or payload.get('type') not in USER_TYPES or not isinstance(payload.get('id'), int):
+        raise InvalidToken('Invalid token')
+    return Principal(payload['type'], payload['id'])
+
+
+def token_from_request(request):
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header:
+        scheme, _, token = header.partition(' ')
+        return token.strip() if scheme.lower() == 'bearer' else None
+    if request.method == 'GET':
+        return request.GET.get('access_token')
+    return None
+
+
+def _profile_cache_size():
+    return getattr(settings, 'AUTH_PROFILE_CACHE_SIZE', DEFAULT_PROFILE_CACHE_SIZE)
+
+
+def get_profile(user_type, user_id):
+    key = (user_type, user_id)
+    size = _profile_cache_size()
+    if size:
+        with _profiles_lock:
+            entry = _profiles.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                _profiles.move_to_end(key)
+                return entry[1]
+
+    name_field = 'full_name' if user_type == 'teacher' else 'fullname'
+    profile = USER_TYPES[user_type].objects.filter(id=user_id).values('id', 'email', name=F(name_field)).first()
+    if size:
+        expires = time.monotonic() + getattr(settings, 'AUTH_PROFILE_CACHE_TTL', DEFAULT_PROFILE_CACHE_TTL)
+        with _profiles_lock:
+            _profiles[key] = (expires, profile)
+            _profiles.move_to_end(key)
+            while len(_profiles) > size:
+                _profiles.popitem(last=False)
+    return profile
+
+
+def invalidate_profile(user_type, user_id):
+    with _profiles_lock:
+        _profiles.pop((user_type, user_id), None)
+
+
+def clear_profile_cache():
+    with _profiles_lock:
+        _profiles.clear()
+
+
+def allow_cross_type(*methods):
+    """
+    Let a principal of the other type call a view whose URL names only one
+    account, for the given HTTP methods. Decorates a view function or class.
+    """
+    def decorator(view):
+        view.cross_type_methods = frozenset(methods)
+        return view
+    return decorator
+
+
+def _view_attr(view_func, name, default=None):
+    value = getattr(view_func, name, None)
+    if value is None:
+        value = getattr(getattr(view_func, 'view_class', None), name, None)
+    return default if value is None else value
+
+
+def _allows_any(view_func):
+    permission_classes = _view_attr(view_func, 'permission_classes', ())
+    return bool(permission_classes) and all(permission is AllowAny for permission in permission_classes)
+
+
+def _error(message, status):
+    response = JsonResponse({'status': 'error', 'message': message}, status=status)
+    if status == 401:
+        response['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def body_account(request, user_type, account_id):
+    """
+    Check an account id sent in a request body, as process_view checks ids in
+    URLs. With a token, the token's account is used and a body id must be
+    missing or the same account. Without one, the body id is used unless the
+    token was bad or AUTH_TOKEN_REQUIRED is on. Returns ``(account_id, None)``
+    or ``(None, error response)``.
+    """
+    principal = getattr(request, 'principal', None)
+    if principal is None:
+        token_error = getattr(request, 'token_error', None)
+        if token_error or getattr(settings, 'AUTH_TOKEN_REQUIRED', False):
+            return None, _error(token_error or 'Authentication required', 401)
+        return account_id, None
+    if principal.user_type != user_type or account_id not in (None, principal.id, str(principal.id)):
+        return None, _error('You do not have access to this account', 403)
+    return principal.id, None
+
+
+class TokenAuthMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.authenticate(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.authenticate(request) or await self.get_response(request)
+
+    def authenticate(self, request):
+        """Set request.principal, and request.token_error for a bad token (see process_view)."""
+        request.principal = None
+        request.token_error = None
+        token = token_from_request(request)
+        if token:
+            try:
+                request.principal = read_token(token)
+            except InvalidToken as e:
+                request.token_error = str(e)
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Ids of the principal's own type in the URL must be the principal's
+        claimed = {
+            user_type: view_kwargs[kwarg] for user_type, kwarg in URL_ID_KWARGS.items() if kwarg in view_kwargs
+        }
+        if view_kwargs.get('user_type') in USER_TYPES and 'user_id' in view_kwargs:
+            claimed[view_kwargs['user_type']] = view_kwargs['user_id']
+        match = request.resolver_match
+        if match and match.url_name in ACCOUNT_URL_NAMES:
+            claimed[ACCOUNT_URL_NAMES[match.url_name]] = view_kwargs['pk']
+        if not claimed:
+            return None
+
+        principal = request.principal
+        if principal is None:
+            if request.token_error and not _allows_any(view_func):
+                return _error(request.token_error, 401)
+            if getattr(settings, 'AUTH_TOKEN_REQUIRED', False):
+                return _error(request.token_error or 'Authentication required', 401)
+            return None
+        if principal.user_type in claimed:
+            if claimed[principal.user_type] != principal.id:
+                return _error('You do not have access to this account', 403)
+        elif request.method not in _view_attr(view_func, 'cross_type_methods', ()):
+            return _error('You do not have access to this account', 403)
+        return None
+
+
+class TokenAuthentication(authentication.BaseAuthentication):
+    """DRF authentication from the access token; reuses TokenAuthMiddleware's result when it ran."""
+
+    def authenticate(self, request):
+        if hasattr(request._request, 'principal'):
+            # TokenAuthMiddleware already decided, including whether a bad token is anonymous
+            principal = request._request.principal
+            return (principal, None) if principal is not None else None
+        token = token_from_request(request._request)
+        if not token:
+            return None
+        try:
+            return read_token(token), None
+        except InvalidToken as e:
+            raise exceptions.AuthenticationFailed(str(e))
+
+    def authenticate_header(self, request):
+        return 'Bearer'
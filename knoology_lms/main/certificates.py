@@ -0,0 +1,241 @@
+"""
+Course completion certificates.
+
+A certificate never changes once its enrollment has a completed_at, so each
+one is rendered a single time and kept in default storage (MEDIA_ROOT) under
+a name built from the student, the course and completed_at. Later downloads
+serve the stored PDF. The first render normally happens on a background
+thread, started when mark_chapter_complete or sync_chapter_progress completes
+the course. A download that arrives first renders the certificate itself.
+On the filesystem the PDF is written under a temporary name and renamed into
+place, so a download racing a render never reads a partly written file.
+
+The logo (CERTIFICATE_LOGO) and the fonts are loaded once per process, from
+MainConfig.ready().
+"""
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+from .models import StudentCourseEnrollment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 1
+FONTS = ('Times-Bold', 'Times-Italic', 'Helvetica', 'Helvetica-Bold')
+
+_executor = None
+_executor_lock = threading.Lock()
+_logo = None
+_preload_lock = threading.Lock()
+_preloaded = False
+
+
+def preload():
+    """Load the logo and the font metrics, once per process."""
+    global _logo, _preloaded
+    with _preload_lock:
+        if _preloaded:
+            return
+        for font in FONTS:
+            pdfmetrics.getFont(font)
+        logo_path = getattr(settings, 'CERTIFICATE_LOGO', '')
+        if logo_path and os.path.exists(logo_path):
+            try:
+                _logo = ImageReader(str(logo_path))
+            except Exception:
+                logger.exception('Could not load the certificate logo %s', logo_path)
+        _preloaded = True
+
+
+def certificate_name(enrollment):
+    completed_at = enrollment.completed_at.astimezone(dt_timezone.utc)
+    return (
+        f'certificates/{enrollment.student_id}/'
+        f'{enrollment.course_id}-{completed_at:%Y%m%d%H%M%S%f}.pdf'
+    )
+
+
+def verification_url(request, student_id, course_id):
+    return request.build_absolute_uri(f"/verify-certificate/{student_id}/{course_id}/")
+
+
+def download_name(enrollment):
+    return f"Certificate_{enrollment.student.fullname.replace(' ', '_')}.pdf"
+
+
+def render_certificate(enrollment, verify_url):
+    """The certificate of a completed ``enrollment`` (with student and course loaded), as PDF bytes."""
+    preload()
+    student, course = enrollment.student, enrollment.course
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=landscape(A4))
+    width, height = landscape(A4)
+
+    # Double border
+    c.setStrokeColor(colors.HexColor('#2c3e50'))  # Navy
+    c.setLineWidth(10)
+    c.rect(1*cm, 1*cm, width - 2*cm, height - 2*cm)
+
+    c.setStrokeColor(colors.HexColor('#deb887'))  # Gold
+    c.setLineWidth(3)
+    c.rect(1.3*cm, 1.3*cm, width - 2.6*cm, height - 2.6*cm)
+
+    # Header
+    c.setFillColor(colors.HexColor('#2c3e50'))
+    c.setFont("Times-Bold", 40)
+    c.drawCentredString(width / 2, height - 4*cm, "CERTIFICATE")
+
+    c.setFillColor(colors.HexColor('#deb887'))
+    c.setFont("Helvetica-Bold", 14)
+    c.drawCentredString(width / 2, height - 5*cm, "OF COMPLETION")
+
+    # Logo
+    if _logo is not None:
+        logo_width, logo_height = 5*cm, 3*cm
+        c.drawImage(
+            _logo, (width - logo_width) / 2, height - 8.5*cm, width=logo_width, height=logo_height,
+            mask='auto', preserveAspectRatio=True
+        )
+    else:
+        c.setFont("Helvetica", 12)
+        c.drawCentredString(width / 2, height - 7*cm, "[Knoology Logo]")
+
+    # Content text
+    c.setFillColor(colors.HexColor('#7f8c8d'))  # Grey
+    c.setFont("Times-Italic", 14)
+    c.drawCentredString(width / 2, height - 10*cm, "This is to certify that")
+
+    c.setFillColor(colors.HexColor('#d35400'))  # Burnt Orange
+    c.setFont("Times-Bold", 36)
+    c.drawCentredString(width / 2, height - 12*cm, student.fullname)
+
+    c.setStrokeColor(colors.HexColor('#ddd'))
+    c.setLineWidth(1)
+    c.line((width/2) - 5*cm, height - 12.2*cm, (width/2) + 5*cm, height - 12.2*cm)
+
+    c.setFillColor(colors.HexColor('#7f8c8d'))
+    c.setFont("Helvetica", 12)
+    c.drawCentredString(width / 2, height - 13.5*cm, "has successfully completed the course")
+
+    c.setFillColor(colors.HexColor('#2c3e50'))
+    c.setFont("Times-Bold", 24)
+    c.drawCentredString(width / 2, height - 15*cm, course.title)
+
+    # Footer: date on the left, seal in the middle, signature on the right
+    footer_y = 3*cm
+
+    c.setFillColor(colors.HexColor('#2c3e50'))
+    c.setFont("Helvetica", 10)
+    c.drawCentredString(width/4, footer_y + 0.5*cm, enrollment.completed_at.strftime('%B %d, %Y'))
+    c.setStrokeColor(colors.HexColor('#2c3e50'))
+    c.line(width/4 - 2*cm, footer_y + 0.3*cm, width/4 + 2*cm, footer_y + 0.3*cm)
+    c.drawCentredString(width/4, footer_y - 0.2*cm, "Date Issued")
+
+    c.setStrokeColor(colors.HexColor('#deb887'))
+    c.setLineWidth(2)
+    c.circle(width/2, footer_y + 0.5*cm, 1.2*cm)
+    c.setFillColor(colors.HexColor('#deb887'))
+    c.setFont("Helvetica-Bold", 8)
+    c.drawCentredString(width/2, footer_y + 0.7*cm, "VERIFIED")
+    c.drawCentredString(width/2, footer_y + 0.3*cm, "SECURE")
+
+    c.setFillColor(colors.HexColor('#2c3e50'))
+    c.setFont("Helvetica", 10)
+    c.drawCentredString(3*width/4, footer_y + 0.5*cm, "Knoology LMS")
+    c.setStrokeColor(colors.HexColor('#2c3e50'))
+    c.line(3*width/4 - 2*cm, footer_y + 0.3*cm, 3*width/4 + 2*cm, footer_y + 0.3*cm)
+    c.drawCentredString(3*width/4, footer_y - 0.2*cm, "Authorized Signature")
+
+    # Validation ID
+    valid_id = f"CERT-{student.id}-{course.id}-{int(enrollment.completed_at.timestamp())}"
+    c.setFillColor(colors.HexColor('#95a5a6'))
+    c.setFont("Helvetica", 7)
+    c.drawString(2*cm, 1*cm, f"ID: {valid_id}")
+    c.drawRightString(width - 2*cm, 1*cm, f"Verify: {verify_url}")
+
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _store(name, content):
+    """Store ``content`` under ``name`` so that readers see either nothing or the whole file."""
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        # Remote storages publish an object only once it is fully uploaded
+        saved = default_storage.save(name, ContentFile(content))
+        if saved != name:
+            # Another worker stored the same certificate first; storage kept both
+            default_storage.delete(saved)
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(temp_path, getattr(default_storage, 'file_permissions_mode', None) or 0o644)
+        # Atomic within one filesystem; a concurrent render of the same certificate is just as valid
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def ensure_certificate(enrollment, verify_url):
+    """Render and store the certificate unless it is stored already; returns its storage name."""
+    name = certificate_name(enrollment)
+    if not default_storage.exists(name):
+        _store(name, render_certificate(enrollment, verify_url))
+    return name
+
+
+def schedule_render(enrollment_id, verify_url):
+    """Render the certificate on a background thread once the current transaction commits."""
+    transaction.on_commit(lambda: submit_render(enrollment_id, verify_url))
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CERTIFICATE_WORKERS', DEFAULT_WORKERS),
+                thread_name_prefix='certificates'
+            )
+    return _executor
+
+
+def submit_render(enrollment_id, verify_url):
+    return _pool().submit(run_render, enrollment_id, verify_url)
+
+
+def run_render(enrollment_id, verify_url):
+    try:
+        enrollment = StudentCourseEnrollment.objects.select_related('student', 'course').filter(
+            id=enrollment_id, completed_at__isnull=False
+        ).first()
+        if enrollment is not None:
+            ensure_certificate(enrollment, verify_url)
+    except Exception:
+        logger.exception('Certificate for enrollment %s failed to render', enrollment_id)
+    finally:
+        # Connections are per thread; do not leave the worker's one open
+        connections.close_all()
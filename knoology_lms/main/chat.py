@@ -0,0 +1,191 @@
+"""
+Teacher-student chat state.
+
+Every (teacher, student) pair that has exchanged messages has a Conversation
+row with the latest message and an unread counter per side. Sending a message
+bumps the recipient's counter, opening the conversation resets it, and the
+chat inbox is a single indexed query over Conversation.
+"""
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, DateTimeField, F, Q, TextField, Value, When
+from django.utils import timezone
+
+from .models import Conversation, Notification, TeacherStudentChat
+
+# Messages per page when scrolling back with before_id and no limit
+DEFAULT_HISTORY_LIMIT = 50
+
+# SQLSTATEs worth retrying the whole write for: serialization_failure and
+# deadlock_detected. PostgreSQL rolled the transaction back, so a retry is safe.
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+MAX_WRITE_ATTEMPTS = 3
+
+# Which side of the conversation receives a message sent by message_from
+UNREAD_FIELD = {
+    'teacher': 'student_unread',
+    'student': 'teacher_unread',
+}
+
+
+def record_message(chat):
+    """
+    Update the conversation for a just-saved TeacherStudentChat.
+
+    Call inside the transaction that saved ``chat``. The counter is bumped
+    with a single UPDATE, so concurrent senders never lose an increment.
+    Returns the conversation id.
+    """
+    conversation, _ = Conversation.objects.get_or_create(
+        teacher_id=chat.teacher_id,
+        student_id=chat.student_id
+    )
+    unread_field = UNREAD_FIELD[chat.message_from]
+    # Concurrent senders may commit out of order; only a newer message replaces the preview
+    is_newer = Q(last_message_at__isnull=True) | Q(last_message_at__lte=chat.timestamp)
+    Conversation.objects.filter(pk=conversation.pk).update(
+        last_message=Case(
+            When(is_newer, then=Value(chat.message)), default=F('last_message'), output_field=TextField()
+        ),
+        last_message_at=Case(
+            When(is_newer, then=Value(chat.timestamp)), default=F('last_message_at'), output_field=DateTimeField()
+        ),
+        **{unread_field: F(unread_field) + 1}
+    )
+    return conversation.pk
+
+
+def _is_retryable(error):
+    return getattr(error.__cause__, 'pgcode', None) in RETRYABLE_SQLSTATES
+
+
+def send_chat_message(teacher, student, message, message_from):
+    """
+    Save a chat message, update the conversation and notify the recipient in
+    one transaction, so either all three land or none do.
+
+    A serialization failure or deadlock rolls everything back and the write
+    is retried straight away, up to MAX_WRITE_ATTEMPTS times. There is no
+    sleep between attempts: the competing transaction has already finished
+    by the time the database reports the conflict.
+    """
+    # A retry only makes sense when this call owns the transaction
+    retries = 1 if transaction.get_connection().in_atomic_block else MAX_WRITE_ATTEMPTS
+
+    for attempt in range(1, retries + 1):
+        try:
+            with transaction.atomic():
+                chat = TeacherStudentChat.objects.create(
+                    teacher=teacher,
+                    student=student,
+                    message=message,
+                    message_from=message_from
+                )
+                conversation_id = record_message(chat)
+
+                if message_from == 'teacher':
+                    recipient = {'recipient_student': student}
+                    sender_name = teacher.full_name
+                else:
+                    recipient = {'recipient_teacher': teacher}
+                    sender_name = student.fullname
+                Notification.objects.create(
+                    notification_type='general',
+                    title='New Message',
+                    message=f'You have a new message from {sender_name}',
+                    related_conversation_id=conversation_id,
+                    is_read=False,
+                    **recipient
+                )
+            return chat
+        except DatabaseError as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+
+
+def mark_conversation_read(teacher_id, student_id, reader):
+    """
+    Reset ``reader``'s ('teacher' or 'student') unread counter and mark the
+    matching 'New Message' notifications as read. Writes nothing when there
+    is nothing unread, which is the common case for a polling client.
+    """
+    unread_field = f'{reader}_unread'
+    updated = Conversation.objects.filter(
+        teacher_id=teacher_id, student_id=student_id, **{f'{unread_field}__gt': 0}
+    ).update(**{unread_field: 0})
+    if not updated:
+        return
+
+    recipient = {'recipient_teacher_id': teacher_id} if reader == 'teacher' else {'recipient_student_id': student_id}
+    Notification.objects.filter(
+        related_conversation__teacher_id=teacher_id,
+        related_conversation__student_id=student_id,
+        is_read=False,
+        **recipient
+    ).update(is_read=True, updated_at=timezone.now())
+
+
+def inbox(user_type, user_id):
+    """Conversations of a teacher or student, most recent first, with the other side joined in."""
+    if user_type == 'teacher':
+        conversations = Conversation.objects.filter(teacher_id=user_id).select_related('student')
+    else:
+        conversations = Conversation.objects.filter(student_id=user_id).select_related('teacher')
+    return conversations.filter(last_message_at__isnull=False).order_by('-last_message_at')
+
+
+class HistoryParamError(ValueError):
+    """Raised for a malformed after_id / before_id / limit."""
+
+
+def _int_param(request, name):
+    raw = request.GET.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HistoryParamError(f'{name} must be an integer')
+    if value < 0:
+        raise HistoryParamError(f'{name} must not be negative')
+    return value
+
+
+def chat_history(request, teacher_id, student_id):
+    """
+    Messages of one conversation in chronological order, read through the
+    (teacher, student, id) index.
+
+    - ``?after_id=N``: only messages newer than N (for polling), up to ``limit``.
+    - ``?before_id=N&limit=L``: the L messages just before N (scrolling back).
+    - ``?limit=L`` alone: the latest L messages.
+    - no parameters: the whole history.
+
+    Returns ``(messages, has_more)``; ``has_more`` is None when no limit applied.
+    """
+    after_id = _int_param(request, 'after_id')
+    before_id = _int_param(request, 'before_id')
+    limit = _int_param(request, 'limit')
+    if limit is not None:
+        limit = min(max(limit, 1), getattr(settings, 'API_MAX_PAGE_SIZE', 100))
+
+    messages = TeacherStudentChat.objects.filter(
+        teacher_id=teacher_id, student_id=student_id
+    ).select_related('teacher', 'student')
+
+    if after_id is not None:
+        messages = messages.filter(id__gt=after_id).order_by('id')
+        if limit is None:
+            return list(messages), None
+        rows = list(messages[:limit + 1])
+        return rows[:limit], len(rows) > limit
+
+    if before_id is not None:
+        messages = messages.filter(id__lt=before_id)
+    elif limit is None:
+        return list(messages.order_by('id')), None
+
+    # Newest first to take the page, then back to chronological order
+    limit = limit or DEFAULT_HISTORY_LIMIT
+    rows = list(messages.order_by('-id')[:limit + 1])
+    return rows[:limit][::-1], len(rows) > limit
@@ -0,0 +1,117 @@
+"""
+Conditional GET for detail and list endpoints.
+
+A view wrapped with conditional_get(validator) answers If-None-Match (and,
+for single objects, If-Modified-Since) with a 304 before it runs. ``validator(**view_kwargs)``
+returns the newest ``updated_at`` and the row count of what the view would
+serialize, computed in one aggregate query; the count catches deletions,
+which leave no timestamp behind. The timestamp is None for an empty list. The
+validator returns None when the requested object does not exist, and the view
+then runs as usual.
+
+Successful GET responses carry the matching ETag, and Last-Modified when the
+view serves one object: in a list, deleting the newest row moves the
+timestamp back, which only the ETag's count notices.
+Writes that bypass save() must set ``updated_at`` themselves.
+"""
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Course, Notification, Quiz, StudyMaterial
+
+
+def make_etag(last_modified, count):
+    stamp = last_modified.isoformat() if last_modified else ''
+    digest = hashlib.md5(f'{stamp}:{count}'.encode(), usedforsecurity=False).hexdigest()
+    # Weak: equal validators mean equal data, not byte-identical bodies
+    return f'W/"{digest}"'
+
+
+def conditional_get(validator, last_modified=False):
+    """
+    Wrap a view function, or a class-based view's ``dispatch`` through
+    method_decorator. Pass ``last_modified=True`` for single-object views.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            state = validator(**kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+
+            newest, count = state
+            etag = make_etag(newest, count)
+            timestamp = int(newest.timestamp()) if last_modified and newest else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.headers.setdefault('ETag', etag)
+            if timestamp is not None:
+                response.headers.setdefault('Last-Modified', http_date(timestamp))
+            return response
+        return wrapper
+    return decorator
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def course_state(pk):
+    # CourseSerializer embeds the teacher and the category
+    state = Course.objects.filter(pk=pk).aggregate(
+        last_modified=Max(Greatest('updated_at', 'teacher__updated_at', 'category__updated_at')),
+    )
+    if state['last_modified'] is None:
+        return None
+    return state['last_modified'], 1
+
+
+def course_chapters_state(course_id):
+    state = Course.objects.filter(pk=course_id).aggregate(
+        course_modified=Max('updated_at'), chapters_modified=Max('chapters__updated_at'), count=Count('chapters'),
+    )
+    if state['course_modified'] is None:
+        return None
+    return _latest(state['course_modified'], state['chapters_modified']), state['count']
+
+
+def study_materials_state(course_id=None):
+    materials = StudyMaterial.objects.all()
+    if course_id:
+        materials = materials.filter(course=course_id)
+    # GET responses nest the teacher and the course (depth=1)
+    state = materials.aggregate(
+        last_modified=Max(Greatest('updated_at', 'teacher__updated_at', 'course__updated_at')),
+        count=Count('id'),
+    )
+    return state['last_modified'], state['count']
+
+
+def quiz_questions_state(quiz_id):
+    state = Quiz.objects.filter(pk=quiz_id).aggregate(
+        quiz_modified=Max('updated_at'), questions_modified=Max('questions__updated_at'), count=Count('questions'),
+    )
+    if state['quiz_modified'] is None:
+        return None
+    return _latest(state['quiz_modified'], state['questions_modified']), state['count']
+
+
+def notifications_state(user_type, user_id):
+    recipient = {'teacher': 'recipient_teacher_id', 'student': 'recipient_student_id'}.get(user_type)
+    if recipient is None:
+        return None
+    state = Notification.objects.filter(**{recipient: user_id}).aggregate(
+        last_modified=Max('updated_at'), count=Count('id'),
+    )
+    return state['last_modified'], state['count']
@@ -0,0 +1,60 @@
+"""
+Cached dashboard statistics.
+
+Stats are computed with grouped aggregates (a constant number of queries no
+matter how many courses a teacher has) and cached per teacher in the
+``shared`` cache, so an invalidation made by one server process is seen by all
+of them. The cache entry is dropped by the signal handlers in main/signals.py
+whenever an enrollment or one of the teacher's courses changes, including a
+course moving to another teacher.
+"""
+from django.core.cache import caches
+from django.db.models import Count
+
+from .models import Course, StudentCourseEnrollment
+
+TEACHER_STATS_CACHE_TIMEOUT = 60 * 15
+# Must be shared by every server process (see CACHES in settings)
+SHARED_CACHE = 'shared'
+
+
+def teacher_stats_cache_key(teacher_id):
+    return f'teacher_dashboard_stats:{teacher_id}'
+
+
+def invalidate_teacher_stats(teacher_id):
+    caches[SHARED_CACHE].delete(teacher_stats_cache_key(teacher_id))
+
+
+def compute_teacher_stats(teacher_id):
+    """Course count, distinct enrolled students and per-course enrollments in two queries."""
+    courses = list(
+        Course.objects.filter(teacher_id=teacher_id)
+        .annotate(enrollments=Count('enrolled_students'))
+        .order_by('id')
+        .values('title', 'enrollments')
+    )
+
+    total_students = StudentCourseEnrollment.objects.filter(
+        course__teacher_id=teacher_id
+    ).aggregate(total=Count('student', distinct=True))['total']
+
+    return {
+        'total_courses': len(courses),
+        'total_students': total_students,
+        'course_data': [
+            {'title': course['title'], 'enrollments': course['enrollments']}
+            for course in courses
+            if course['enrollments'] > 0
+        ],
+    }
+
+
+def get_teacher_stats(teacher_id):
+    shared = caches[SHARED_CACHE]
+    key = teacher_stats_cache_key(teacher_id)
+    stats = shared.get(key)
+    if stats is None:
+        stats = compute_teacher_stats(teacher_id)
+        shared.set(key, stats, TEACHER_STATS_CACHE_TIMEOUT)
+    return stats
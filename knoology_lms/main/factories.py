@@ -0,0 +1,358 @@
+"""
+Synthetic LMS data for benchmarks and load tests.
+
+Each ``*_factory`` builds unsaved model instances with unique, deterministic
+field values. ``seed_dataset`` writes a whole interlinked dataset with
+bulk_create, so Teacher.save / Student.save (which e-mail an OTP) are never
+called. Every seeded teacher and student is verified and can log in with
+SEED_PASSWORD.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from . import search
+from .models import (
+    Assignment, Chapter, ContactUs, Conversation, Course, CourseCategory, CoursePayment, CourseQuiz,
+    CourseRating, FAQ, Notification, Quiz, QuizQuestion, Student, StudentChapterProgress, StudentCourseEnrollment,
+    StudentFavoriteCourse, StudentQuizAttempt, StudentQuizResponse, StudyMaterial, Teacher,
+    TeacherStudentChat
+)
+
+SEED_PASSWORD = 'password'
+SKILLS = ['Python', 'Django', 'React', 'SQL', 'Docker', 'Machine Learning', 'Go', 'Rust']
+
+
+class Sequence:
+    """Monotonic counter shared by the factories so unique fields never collide."""
+
+    def __init__(self, start=1):
+        self.value = start - 1
+
+    def __next__(self):
+        self.value += 1
+        return self.value
+
+    def skip_past(self, value):
+        self.value = max(self.value, value)
+
+
+sequence = Sequence()
+
+
+def teacher_factory(**fields):
+    n = next(sequence)
+    defaults = {
+        'full_name': f'Teacher {n}',
+        'email': f'teacher{n}@example.com',
+        'mobile_number': f'9{n:09d}',
+        # teacher_login compares passwords as stored
+        'password': SEED_PASSWORD,
+        'qualification': 'MSc Computer Science',
+        'skills': ', '.join(random.sample(SKILLS, 3)),
+        'verify_status': True,
+    }
+    return Teacher(**{**defaults, **fields})
+
+
+def student_factory(password_hash, **fields):
+    n = next(sequence)
+    defaults = {
+        'fullname': f'Student {n}',
+        'username': f'student{n}',
+        'email': f'student{n}@example.com',
+        'password': password_hash,
+        'interested_categories': ', '.join(random.sample(SKILLS, 2)),
+        'verify_status': True,
+    }
+    return Student(**{**defaults, **fields})
+
+
+def category_factory(**fields):
+    n = next(sequence)
+    return CourseCategory(**{'title': f'Category {n}', 'description': f'Courses about topic {n}', **fields})
+
+
+def course_factory(teacher, category, **fields):
+    n = next(sequence)
+    technologies = random.sample(SKILLS, 3)
+    defaults = {
+        'teacher': teacher,
+        'category': category,
+        'title': f'{technologies[0]} course {n}',
+        'description': f'Learn {", ".join(technologies)} from scratch. Course number {n}.',
+        'technologies': ', '.join(technologies),
+        'price': random.choice([0, 0, 499, 999, 1999]),
+    }
+    return Course(**{**defaults, **fields})
+
+
+def chapter_factory(course, **fields):
+    n = next(sequence)
+    defaults = {
+        'course': course,
+        'title': f'Chapter {n}',
+        'description': f'Chapter {n} of {course.title}',
+        'text_content': 'Lorem ipsum dolor sit amet. ' * 20,
+    }
+    return Chapter(**{**defaults, **fields})
+
+
+def quiz_factory(teacher, **fields):
+    n = next(sequence)
+    return Quiz(**{
+        'teacher': teacher, 'title': f'Quiz {n}', 'description': f'Quiz number {n}', 'total_marks': 100, **fields
+    })
+
+
+def question_factory(quiz, **fields):
+    n = next(sequence)
+    defaults = {
+        'quiz': quiz,
+        'question_text': f'Question {n}?',
+        'ans1': f'Answer {n}a', 'ans2': f'Answer {n}b', 'ans3': f'Answer {n}c', 'ans4': f'Answer {n}d',
+        'right_ans': f'Answer {n}a',
+    }
+    return QuizQuestion(**{**defaults, **fields})
+
+
+@dataclass
+class SeedConfig:
+    """Dataset size at scale 1.0; every count is multiplied by ``scale``."""
+    scale: float = 1.0
+    teachers: int = 50
+    categories: int = 10
+    courses: int = 200
+    students: int = 3000
+    chapters_per_course: int = 8
+    enrollments_per_student: int = 4
+    quizzes_per_teacher: int = 2
+    questions_per_quiz: int = 10
+    attempts_per_student: int = 1
+    chats_per_student: int = 3
+    notifications_per_student: int = 3
+    chunk_size: int = 1000
+
+    def count(self, name):
+        return max(1, int(getattr(self, name) * self.scale))
+
+
+@dataclass
+class SeededDataset:
+    """Ids the benchmarks and load scripts build their requests from."""
+    counts: dict = field(default_factory=dict)
+    teacher_ids: list = field(default_factory=list)
+    student_ids: list = field(default_factory=list)
+    course_ids: list = field(default_factory=list)
+    quiz_ids: list = field(default_factory=list)
+
+
+def _continue_sequence():
+    """
+    Move the sequence past every number an earlier seeding run can have used.
+    Each factory call made one row and primary keys are never reused, so the
+    sum of the highest keys is an upper bound.
+    """
+    models = [Teacher, Student, CourseCategory, Course, Chapter, Quiz, QuizQuestion]
+    sequence.skip_past(sum(model.objects.aggregate(top=Max('pk'))['top'] or 0 for model in models))
+
+
+def _bulk(model, objects, chunk_size, counts):
+    """bulk_create in chunks, returning the saved objects with their primary keys."""
+    saved = []
+    for start in range(0, len(objects), chunk_size):
+        saved.extend(model.objects.bulk_create(objects[start:start + chunk_size]))
+    counts[model.__name__] = counts.get(model.__name__, 0) + len(saved)
+    return saved
+
+
+@transaction.atomic
+def seed_dataset(config=None, rng_seed=0):
+    """
+    Create teachers, students, courses with chapters, enrollments with their
+    payments, ratings, favorites, quizzes with questions and attempts,
+    assignments, study materials, chats, notifications, FAQs and contact
+    messages. Can be run again on a seeded database. Returns a SeededDataset.
+    """
+    config = config or SeedConfig()
+    random.seed(rng_seed)
+    _continue_sequence()
+    counts = {}
+    size = config.chunk_size
+    now = timezone.now()
+    password_hash = make_password(SEED_PASSWORD)
+
+    teachers = _bulk(Teacher, [teacher_factory() for _ in range(config.count('teachers'))], size, counts)
+    categories = _bulk(
+        CourseCategory, [category_factory() for _ in range(config.count('categories'))], size, counts
+    )
+    courses = _bulk(Course, [
+        course_factory(random.choice(teachers), random.choice(categories)) for _ in range(config.count('courses'))
+    ], size, counts)
+    chapters = _bulk(Chapter, [
+        chapter_factory(course) for course in courses for _ in range(config.chapters_per_course)
+    ], size, counts)
+    students = _bulk(
+        Student, [student_factory(password_hash) for _ in range(config.count('students'))], size, counts
+    )
+
+    chapters_by_course = {}
+    for chapter in chapters:
+        chapters_by_course.setdefault(chapter.course_id, []).append(chapter)
+
+    enrollments, progress, ratings, favorites, assignments = [], [], [], [], []
+    enrolled = {}
+    per_student = min(config.enrollments_per_student, len(courses))
+    for student in students:
+        picked = random.sample(courses, per_student)
+        enrolled[student.id] = picked
+        for course in picked:
+            completed = random.random() < 0.2
+            course_chapters = chapters_by_course.get(course.id, [])
+            done = course_chapters if completed else course_chapters[:random.randint(0, len(course_chapters))]
+            enrollments.append(StudentCourseEnrollment(
+                student=student, course=course, completed_at=now if completed else None,
+                completed_chapters=len(done)
+            ))
+            progress.extend(StudentChapterProgress(student=student, course=course, chapter=c) for c in done)
+        ratings.append(CourseRating(
+            student=student, course=picked[0], rating=random.randint(1, 5),
+            review=random.choice(['', 'Great course', 'Very clear explanations'])
+        ))
+        favorites.append(StudentFavoriteCourse(student=student, course=random.choice(picked)))
+        if random.random() < 0.3:
+            assignments.append(Assignment(
+                student=student, course=picked[0], title='Assignment', description='Solve the exercises',
+                due_date=(now + timedelta(days=7)).date()
+            ))
+    _bulk(StudentCourseEnrollment, enrollments, size, counts)
+    _bulk(CoursePayment, [
+        CoursePayment(
+            student=e.student, course=e.course, order_id=f'order_seed_{e.student.id}_{e.course.id}',
+            payment_id=f'pay_seed_{e.student.id}_{e.course.id}', amount=e.course.price, status=True
+        )
+        for e in enrollments if e.course.price
+    ], size, counts)
+    _bulk(StudentChapterProgress, progress, size, counts)
+    _bulk(CourseRating, ratings, size, counts)
+    _bulk(StudentFavoriteCourse, favorites, size, counts)
+    _bulk(Assignment, assignments, size, counts)
+
+    # bulk_create skips the save() hooks and view code that keep these in step
+    course_ids = [course.id for course in courses]
+    for course_id, totals in _course_totals(course_ids):
+        Course.objects.filter(id=course_id).update(**totals)
+    if search.is_supported():
+        Course.objects.filter(id__in=course_ids).update(search_vector=search.course_search_vector())
+
+    _bulk(StudyMaterial, [
+        StudyMaterial(teacher_id=course.teacher_id, course=course, title=f'Notes for {course.title}',
+                      file='study_materials/notes.pdf')
+        for course in courses[:max(1, len(courses) // 2)]
+    ], size, counts)
+
+    quizzes = _bulk(Quiz, [
+        quiz_factory(teacher) for teacher in teachers for _ in range(config.quizzes_per_teacher)
+    ], size, counts)
+    questions = _bulk(QuizQuestion, [
+        question_factory(quiz) for quiz in quizzes for _ in range(config.questions_per_quiz)
+    ], size, counts)
+    questions_by_quiz = {}
+    for question in questions:
+        questions_by_quiz.setdefault(question.quiz_id, []).append(question)
+
+    quizzes_by_teacher = {}
+    for quiz in quizzes:
+        quizzes_by_teacher.setdefault(quiz.teacher_id, []).append(quiz)
+    course_quizzes = []
+    for course in courses:
+        for quiz in quizzes_by_teacher.get(course.teacher_id, [])[:1]:
+            course_quizzes.append(CourseQuiz(course=course, quiz=quiz))
+    _bulk(CourseQuiz, course_quizzes, size, counts)
+    quiz_for_course = {cq.course_id: cq.quiz for cq in course_quizzes}
+
+    attempts = []
+    for student in students:
+        for course in enrolled[student.id][:config.attempts_per_student]:
+            quiz = quiz_for_course.get(course.id)
+            if quiz is None:
+                continue
+            total = len(questions_by_quiz[quiz.id])
+            correct = random.randint(0, total)
+            attempts.append(StudentQuizAttempt(
+                student=student, quiz=quiz, course=course, total_questions=total,
+                correct_answers=correct, obtained_marks=quiz.total_marks * correct / total, is_completed=True
+            ))
+    attempts = _bulk(StudentQuizAttempt, attempts, size, counts)
+    responses = []
+    for attempt in attempts:
+        for i, question in enumerate(questions_by_quiz[attempt.quiz_id]):
+            is_correct = i < attempt.correct_answers
+            responses.append(StudentQuizResponse(
+                attempt=attempt, question=question, is_correct=is_correct,
+                selected_answer=question.right_ans if is_correct else question.ans2
+            ))
+    _bulk(StudentQuizResponse, responses, size, counts)
+
+    chats, conversations, notifications = [], {}, []
+    for student in students:
+        teacher_id = enrolled[student.id][0].teacher_id
+        for i in range(config.chats_per_student):
+            sender = 'student' if i % 2 == 0 else 'teacher'
+            chats.append(TeacherStudentChat(
+                teacher_id=teacher_id, student=student, message=f'Message {i}', message_from=sender
+            ))
+        conversations[(teacher_id, student.id)] = Conversation(
+            teacher_id=teacher_id, student=student, last_message=f'Message {config.chats_per_student - 1}',
+            last_message_at=now, teacher_unread=1, student_unread=1
+        )
+        for i in range(config.notifications_per_student):
+            notifications.append(Notification(
+                recipient_student=student, notification_type='general', title=f'Notice {i}',
+                message='Something happened in one of your courses', related_course=enrolled[student.id][0],
+                is_read=i > 0
+            ))
+    _bulk(TeacherStudentChat, chats, size, counts)
+    _bulk(Conversation, list(conversations.values()), size, counts)
+    _bulk(Notification, notifications, size, counts)
+    _bulk(FAQ, [FAQ(question=f'Question {i}?', answer='Answer.') for i in range(10)], size, counts)
+    _bulk(ContactUs, [
+        ContactUs(name=student.fullname, email=student.email, subject='Question', message='How do I start?')
+        for student in students[::50]
+    ], size, counts)
+
+    return SeededDataset(
+        counts=counts,
+        teacher_ids=[t.id for t in teachers],
+        student_ids=[s.id for s in students],
+        course_ids=course_ids,
+        quiz_ids=[q.id for q in quizzes],
+    )
+
+
+def _course_totals(course_ids):
+    enrolled = dict(
+        StudentCourseEnrollment.objects.filter(course_id__in=course_ids)
+        .values('course').annotate(n=Count('id')).values_list('course', 'n')
+    )
+    chapters = dict(
+        Chapter.objects.filter(course_id__in=course_ids)
+        .values('course').annotate(n=Count('id')).values_list('course', 'n')
+    )
+    rated = {
+        row['course']: row for row in
+        CourseRating.objects.filter(course_id__in=course_ids).values('course').annotate(n=Count('id'), avg=Avg('rating'))
+    }
+    for course_id in course_ids:
+        rating = rated.get(course_id)
+        yield course_id, {
+            'total_enrolled': enrolled.get(course_id, 0),
+            'total_chapters': chapters.get(course_id, 0),
+            'total_ratings': rating['n'] if rating else 0,
+            'average_rating': round(rating['avg'], 2) if rating else 0,
+        }
@@ -0,0 +1,54 @@
+"""
+Quiz grading.
+
+A submission is graded against an in-memory answer key ({question_id:
+right_ans}) taken from the quiz snapshot (main/quiz_store.py), so grading
+costs the same number of queries whether the quiz has 5 questions or 500.
+"""
+from decimal import Decimal
+
+from .models import StudentQuizResponse
+
+
+def grade_answers(attempt, answers, answer_key):
+    """
+    Grade submitted ``answers`` against ``answer_key`` in a single pass.
+
+    Returns ``(responses, correct_count)`` where ``responses`` are unsaved
+    StudentQuizResponse objects ready for bulk_create. Answers to questions
+    that are not part of the quiz are skipped, and only the first answer to a
+    question counts.
+    """
+    responses = []
+    answered = set()
+    correct_count = 0
+
+    for ans in answers:
+        try:
+            question_id = int(ans.get('question_id'))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if question_id not in answer_key or question_id in answered:
+            continue
+        answered.add(question_id)
+
+        selected_answer = ans.get('selected_answer')
+        is_correct = answer_key[question_id] == selected_answer
+        if is_correct:
+            correct_count += 1
+
+        responses.append(StudentQuizResponse(
+            attempt=attempt,
+            question_id=question_id,
+            selected_answer=selected_answer,
+            is_correct=is_correct
+        ))
+
+    return responses, correct_count
+
+
+def calculate_marks(correct_count, total_marks, total_questions):
+    if total_questions <= 0:
+        return Decimal('0.00')
+    marks = Decimal(correct_count) * Decimal(total_marks) / Decimal(total_questions)
+    return marks.quantize(Decimal('0.01'))
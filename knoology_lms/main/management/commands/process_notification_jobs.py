@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from main.models import NotificationJob
+from main.notifications import run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued notification fan-out jobs, e.g. ones left behind by a restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Also pick up running and failed jobs. Only use this when no web process is working on them',
+        )
+
+    def handle(self, *args, **options):
+        statuses = ('pending', 'running', 'failed') if options['resume'] else ('pending',)
+        job_ids = list(
+            NotificationJob.objects.filter(status__in=statuses).order_by('id').values_list('id', flat=True)
+        )
+
+        for job_id in job_ids:
+            if not run_job(job_id, claim_statuses=statuses):
+                continue
+            job = NotificationJob.objects.get(id=job_id)
+            self.stdout.write(f'Job {job.id}: {job.status}, {job.processed}/{job.total} notified')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(job_ids)} job(s)'))
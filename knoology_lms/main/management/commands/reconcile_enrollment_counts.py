@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from main.models import Course, StudentCourseEnrollment
+from main.progress import chapter_count, completed_count
+
+# Enrollments recounted per UPDATE
+UPDATE_CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute Course.total_enrolled, Course.total_chapters and '
+        'StudentCourseEnrollment.completed_chapters from the rows they count'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report counters that have drifted, do not fix them',
+        )
+
+    def handle(self, *args, **options):
+        # Only rows whose stored counter disagrees with the real count
+        drifted_courses = list(
+            Course.objects.annotate(actual=Count('enrolled_students'), actual_chapters=chapter_count())
+            .exclude(total_enrolled=F('actual'), total_chapters=F('actual_chapters'))
+            .only('id', 'title', 'total_enrolled', 'total_chapters')
+        )
+        for course in drifted_courses:
+            self.stdout.write(
+                f'Course {course.id} "{course.title}": stored {course.total_enrolled} enrolled / '
+                f'{course.total_chapters} chapters, actual {course.actual} / {course.actual_chapters}'
+            )
+        drifted_enrollments = list(
+            StudentCourseEnrollment.objects.annotate(actual=completed_count())
+            .exclude(completed_chapters=F('actual'))
+            .values_list('id', flat=True)
+        )
+        if drifted_enrollments:
+            self.stdout.write(f'{len(drifted_enrollments)} enrollment(s) with a drifted completed chapter count')
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'{len(drifted_courses)} course(s) and {len(drifted_enrollments)} enrollment(s) out of sync '
+                '(dry run, nothing changed)'
+            )
+            return
+
+        # Recount inside the UPDATE so rows written since the scan are included
+        actual_count = StudentCourseEnrollment.objects.filter(
+            course=OuterRef('pk')
+        ).order_by().values('course').annotate(c=Count('id')).values('c')
+        Course.objects.filter(id__in=[course.id for course in drifted_courses]).update(
+            total_enrolled=Coalesce(Subquery(actual_count), 0), total_chapters=chapter_count(),
+            updated_at=timezone.now()
+        )
+        for start in range(0, len(drifted_enrollments), UPDATE_CHUNK_SIZE):
+            StudentCourseEnrollment.objects.filter(
+                id__in=drifted_enrollments[start:start + UPDATE_CHUNK_SIZE]
+            ).update(completed_chapters=completed_count())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {len(drifted_courses)} course(s) and {len(drifted_enrollments)} enrollment(s)'
+        ))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main.models import Course
+from main.search import course_search_vector, is_supported
+
+SEARCH_INDEXES = [
+    'course_search_vector_idx',
+    'course_title_trgm_idx',
+    'course_technologies_trgm_idx',
+]
+
+
+class Command(BaseCommand):
+    help = 'Recompute Course.search_vector for every course and rebuild the search indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of courses updated per statement',
+        )
+        parser.add_argument(
+            '--skip-reindex',
+            action='store_true',
+            help='Only recompute the search vectors, do not REINDEX the GIN indexes',
+        )
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError('Full-text search requires the PostgreSQL database backend')
+
+        batch_size = options['batch_size']
+        ids = list(Course.objects.order_by('id').values_list('id', flat=True))
+
+        # Batches keep each UPDATE (and the row locks it holds) short
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            Course.objects.filter(id__in=batch).update(search_vector=course_search_vector())
+            self.stdout.write(f'Indexed {min(start + batch_size, len(ids))}/{len(ids)} courses')
+
+        if not options['skip_reindex']:
+            with connection.cursor() as cursor:
+                for index in SEARCH_INDEXES:
+                    cursor.execute(f'REINDEX INDEX {index}')
+
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {len(ids)} course(s)'))
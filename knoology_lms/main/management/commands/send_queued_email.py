@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.outbox import deliver_due
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound email. Run with --loop as a worker when OUTBOX_IN_PROCESS is off'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new mail instead of exiting')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_due()
+            if sent or failed or not options['loop']:
+                self.stdout.write(f'Sent {sent} email(s), {failed} failed attempt(s)')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,121 @@
+"""
+Request metrics per URL name, rendered in the Prometheus text format.
+
+MetricsMiddleware (main/middleware.py) calls ``registry.observe`` once per
+request. Metrics are kept in memory per process, so with several workers
+each one reports its own numbers; scrape every worker or sum them upstream.
+"""
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+UNMATCHED = '<unmatched>'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class ViewMetrics:
+    __slots__ = ('latency', 'queries', 'db_seconds', 'response_bytes', 'statuses')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class Registry:
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def observe(self, url_name, method, status_code, seconds, queries, db_seconds, response_bytes):
+        key = (url_name or UNMATCHED, method)
+        with self._lock:
+            metrics = self._views.get(key)
+            if metrics is None:
+                metrics = self._views[key] = ViewMetrics()
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(queries)
+            metrics.db_seconds += db_seconds
+            metrics.response_bytes += response_bytes
+            metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+            _histogram(lines, 'lms_request_duration_seconds', 'Request latency by URL name.',
+                       [(key, metrics.latency) for key, metrics in views])
+            _histogram(lines, 'lms_request_db_queries', 'Database queries per request by URL name.',
+                       [(key, metrics.queries) for key, metrics in views])
+            _counter(lines, 'lms_request_db_seconds_total', 'Time spent in database queries.',
+                     [(_labels(key), metrics.db_seconds) for key, metrics in views])
+            _counter(lines, 'lms_response_bytes_total', 'Response body bytes (streamed bodies excluded).',
+                     [(_labels(key), metrics.response_bytes) for key, metrics in views])
+            _counter(lines, 'lms_requests_total', 'Requests by URL name and status code.',
+                     [(_labels(key, status=code), count)
+                      for key, metrics in views for code, count in sorted(metrics.statuses.items())])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key, **extra):
+    url_name, method = key
+    pairs = [('view', url_name), ('method', method)] + list(extra.items())
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _counter(lines, name, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for labels, value in samples:
+        lines.append(f'{name}{{{labels}}} {_number(value)}')
+
+
+def _histogram(lines, name, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for key, histogram in samples:
+        for bound, total in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{_labels(key, le=bound)}}} {total}')
+        lines.append(f'{name}_bucket{{{_labels(key, le="+Inf")}}} {histogram.count}')
+        lines.append(f'{name}_sum{{{_labels(key)}}} {_number(histogram.sum)}')
+        lines.append(f'{name}_count{{{_labels(key)}}} {histogram.count}')
+
+
+registry = Registry()
@@ -0,0 +1,187 @@
+"""
+Per-request query budget and request metrics.
+
+QueryBudgetMiddleware counts the SQL statements every request runs, through an
+execute wrapper installed on each database connection, so it works with DEBUG
+off. The current request's counter lives in a context variable, which also
+reaches the thread a sync view runs in under ASGI. The count is checked
+against the budget for the view's URL name in QUERY_BUDGETS, falling back to
+QUERY_BUDGET_DEFAULT. A request over budget is logged, or raises
+QueryBudgetExceeded when QUERY_BUDGET_RAISE is on (local development, tests).
+
+MetricsMiddleware records latency, query count, database time and response
+size per URL name into main.metrics.registry (served at /api/metrics/), and
+logs requests slower than METRICS_SLOW_REQUEST_SECONDS with their slowest SQL.
+It is not loaded at all unless METRICS_ENABLED is on.
+
+Queries run while a StreamingHttpResponse is being consumed happen after the
+middleware has returned and are not counted.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+slow_request_logger = logging.getLogger('main.slow_requests')
+
+# Statements quoted in a slow-request log entry
+SLOW_REQUEST_SQL_LIMIT = 5
+
+_current_counter = ContextVar('query_counter', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self, collect_sql=False):
+        self.count = 0
+        self.duration = 0.0
+        # (seconds, sql) of every statement, only when asked for
+        self.statements = [] if collect_sql else None
+
+    def slowest(self, limit):
+        return sorted(self.statements or (), key=lambda item: item[0], reverse=True)[:limit]
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        counter.count += 1
+        counter.duration += elapsed
+        if counter.statements is not None:
+            counter.statements.append((elapsed, sql))
+
+
+def install_counter(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_counters():
+    """Add the counting wrapper to connections opened from now on and to those already open here."""
+    connection_created.connect(install_counter, dispatch_uid='main.middleware.install_counter')
+    for connection in connections.all(initialized_only=True):
+        install_counter(connection)
+
+
+@contextmanager
+def count_queries(collect_sql=False):
+    """
+    Count the queries run in the current context (and threads it hands work
+    to). Nested calls share the outermost counter.
+    """
+    counter = _current_counter.get()
+    if counter is not None:
+        yield counter
+        return
+    counter = QueryCounter(collect_sql)
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        if not self.budgets and self.default_budget is None:
+            raise MiddlewareNotUsed
+        self.raise_on_exceed = getattr(settings, 'QUERY_BUDGET_RAISE', False)
+        self.get_response = get_response
+        install_counters()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with count_queries() as counter:
+            response = self.get_response(request)
+        self.check(request, counter.count)
+        return response
+
+    async def __acall__(self, request):
+        with count_queries() as counter:
+            response = await self.get_response(request)
+        self.check(request, counter.count)
+        return response
+
+    def check(self, request, count):
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        budget = self.budgets.get(url_name, self.default_budget)
+        if budget is None or count <= budget:
+            return
+        message = f'{request.method} {request.path} ({url_name}) ran {count} queries, budget is {budget}'
+        if self.raise_on_exceed:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', None)
+        self.get_response = get_response
+        install_counters()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with count_queries(collect_sql=self.slow_seconds is not None) as counter:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, counter)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with count_queries(collect_sql=self.slow_seconds is not None) as counter:
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, counter)
+        return response
+
+    def record(self, request, response, seconds, counter):
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(
+            url_name, request.method, response.status_code, seconds, counter.count, counter.duration, size
+        )
+        if self.slow_seconds is not None and seconds >= self.slow_seconds:
+            statements = '\n'.join(
+                f'  {elapsed * 1000:.1f} ms  {sql}' for elapsed, sql in counter.slowest(SLOW_REQUEST_SQL_LIMIT)
+            )
+            slow_request_logger.warning(
+                '%s %s (%s) took %.0f ms, %d queries in %.0f ms%s',
+                request.method, request.get_full_path(), url_name, seconds * 1000,
+                counter.count, counter.duration * 1000, '\n' + statements if statements else ''
+            )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-17 19:01
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_enrolled(apps, schema_editor):
+    Course = apps.get_model('main', 'Course')
+    StudentCourseEnrollment = apps.get_model('main', 'StudentCourseEnrollment')
+    actual_count = StudentCourseEnrollment.objects.filter(
+        course=OuterRef('pk')
+    ).order_by().values('course').annotate(c=Count('id')).values('c')
+    Course.objects.update(total_enrolled=Coalesce(Subquery(actual_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0034_chapter_video_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='total_enrolled',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_total_enrolled, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0035_course_total_enrolled'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['average_rating', 'id'], name='course_rating_id_idx'),
+        ),
+    ]
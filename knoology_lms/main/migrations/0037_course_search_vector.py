@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-17 19:04
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# GIN indexes only exist on PostgreSQL, so they are created here rather than
+# in Course.Meta.indexes; other backends (local SQLite runs) skip them.
+SEARCH_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS course_search_vector_idx ON main_course USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS course_title_trgm_idx ON main_course USING gin (title gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS course_technologies_trgm_idx ON main_course USING gin (technologies gin_trgm_ops)',
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Course = apps.get_model('main', 'Course')
+    Course.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('technologies', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    ))
+    for sql in SEARCH_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in ('course_search_vector_idx', 'course_title_trgm_idx', 'course_technologies_trgm_idx'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0036_course_rating_id_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2 on 2026-10-17 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    """
+    One Conversation per (teacher, student) pair that has chatted. Unread
+    'New Message' notifications are matched to their conversation the way the
+    chat views used to find them (by sender name) one last time.
+    """
+    TeacherStudentChat = apps.get_model('main', 'TeacherStudentChat')
+    Conversation = apps.get_model('main', 'Conversation')
+    Notification = apps.get_model('main', 'Notification')
+
+    pairs = TeacherStudentChat.objects.values_list('teacher_id', 'student_id').distinct()
+    for teacher_id, student_id in pairs:
+        latest = TeacherStudentChat.objects.filter(
+            teacher_id=teacher_id, student_id=student_id
+        ).select_related('teacher', 'student').order_by('-timestamp', '-id').first()
+        conversation = Conversation.objects.create(
+            teacher_id=teacher_id,
+            student_id=student_id,
+            last_message=latest.message,
+            last_message_at=latest.timestamp
+        )
+
+        to_teacher = Notification.objects.filter(
+            recipient_teacher_id=teacher_id,
+            notification_type='general',
+            message__contains=f'from {latest.student.fullname}'
+        )
+        to_student = Notification.objects.filter(
+            recipient_student_id=student_id,
+            notification_type='general',
+            message__contains=f'from {latest.teacher.full_name}'
+        )
+        to_teacher.update(related_conversation=conversation)
+        to_student.update(related_conversation=conversation)
+        conversation.teacher_unread = to_teacher.filter(is_read=False).count()
+        conversation.student_unread = to_student.filter(is_read=False).count()
+        conversation.save(update_fields=['teacher_unread', 'student_unread'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0038_notificationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message', models.TextField(blank=True, default='')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('teacher_unread', models.IntegerField(default=0)),
+                ('student_unread', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='main.student')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='main.teacher')),
+            ],
+            options={
+                'verbose_name_plural': '23. Conversations',
+            },
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='related_conversation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['teacher', '-last_message_at'], name='conversation_teacher_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['student', '-last_message_at'], name='conversation_student_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='conversation',
+            unique_together={('teacher', 'student')},
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0039_conversation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teacherstudentchat',
+            index=models.Index(fields=['teacher', 'student', 'id'], name='chat_conversation_id_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 20:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress_counters(apps, schema_editor):
+    Chapter = apps.get_model('main', 'Chapter')
+    Course = apps.get_model('main', 'Course')
+    StudentChapterProgress = apps.get_model('main', 'StudentChapterProgress')
+    StudentCourseEnrollment = apps.get_model('main', 'StudentCourseEnrollment')
+    chapter_count = Chapter.objects.filter(
+        course=OuterRef('pk')
+    ).order_by().values('course').annotate(c=Count('id')).values('c')
+    Course.objects.update(total_chapters=Coalesce(Subquery(chapter_count), 0))
+    completed_count = StudentChapterProgress.objects.filter(
+        student=OuterRef('student'), chapter__course=OuterRef('course')
+    ).order_by().values('student').annotate(c=Count('id')).values('c')
+    StudentCourseEnrollment.objects.update(completed_chapters=Coalesce(Subquery(completed_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0042_updated_at_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='total_chapters',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='studentcourseenrollment',
+            name='completed_chapters',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_progress_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 20:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0043_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentchapterprogress',
+            name='completed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.db.models import Avg
 from django.utils import timezone
@@ -18,6 +19,7 @@ class Teacher(models.Model):
     profile_img = models.ImageField(upload_to='teacher_images/', null=True, blank=True)
     verify_status = models.BooleanField(default=False)
     otp_digit = models.CharField(max_length=10, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
      return self.full_name
@@ -25,28 +27,11 @@ class Teacher(models.Model):
         verbose_name_plural = "1. Teachers"
         ordering = ['full_name']
     
-    def save(self, *args, **kwargs):
-        # Generate OTP for new users
-        import random
-        if self.pk is None:
-            self.otp_digit = str(random.randint(100000, 999999))
-            
-            # Send email with OTP
-            from django.core.mail import send_mail
-            send_mail(
-                'Verify Your Knoology LMS Teacher Account',
-                'Please verify your account',
-                'knoologylms@gmail.com',
-                [self.email],
-                fail_silently=False,
-                html_message=f'<p>Your OTP is </p><p>{self.otp_digit}</p>'
-            )
-        return super().save(*args, **kwargs)
-    
 #Course Category Model
 class CourseCategory(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "2. Course Categories"
@@ -63,14 +48,39 @@ class Course(models.Model):
     technologies = models.TextField(default='')  # Adding default empty string
     price = models.IntegerField(default=0)
     #created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     class Meta:
         verbose_name_plural = "3. Courses"
+        indexes = [
+            # Serves keyset pagination ordered by rating (see main/pagination.py)
+            models.Index(fields=['average_rating', 'id'], name='course_rating_id_idx'),
+        ]
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     total_ratings = models.IntegerField(default=0)
+    # Denormalized enrollment counter, kept in step by the enrollment views
+    # and repaired by the reconcile_enrollment_counts management command
+    total_enrolled = models.IntegerField(default=0)
+    # Denormalized chapter counter, kept in step by ChapterList/ChapterDetail
+    total_chapters = models.IntegerField(default=0)
+    # Weighted full-text document (see main/search.py), refreshed on save and
+    # by the reindex_course_search management command
+    search_vector = SearchVectorField(null=True, editable=False)
     
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # Refresh the search document unless only non-text fields were saved
+        update_fields = kwargs.get('update_fields')
+        text_fields = {'title', 'description', 'technologies'}
+        if update_fields is not None and not text_fields.intersection(update_fields):
+            return
+        from .search import course_search_vector, is_supported
+        if is_supported():
+            Course.objects.filter(pk=self.pk).update(search_vector=course_search_vector())
+
 #Chapter Model
 class Chapter(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='chapters')
@@ -80,6 +90,7 @@ class Chapter(models.Model):
     video_url = models.URLField(null=True, blank=True)
     text_content = models.TextField(null=True, blank=True)
     remarks = models.TextField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "4. Chapters"
@@ -104,30 +115,15 @@ class Student(models.Model):
     class Meta: 
         verbose_name_plural = "5. Students"
         ordering = ['fullname']
-        
-    def save(self, *args, **kwargs):
-        # Generate OTP for new users
-        import random
-        if self.pk is None:
-            self.otp_digit = str(random.randint(100000, 999999))
-            
-            # Send email with OTP
-            from django.core.mail import send_mail
-            send_mail(
-                'Verify Your Knoology LMS Student Account',
-                'Please verify your account',
-                'knoologylms@gmail.com',
-                [self.email],
-                fail_silently=False,
-                html_message=f'<p>Your OTP is </p><p>{self.otp_digit}</p>'
-            )
-        return super().save(*args, **kwargs)
 
 class StudentCourseEnrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrolled_courses')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrolled_students')
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Chapters of the course the student has completed, kept in step with
+    # StudentChapterProgress by the progress and chapter views
+    completed_chapters = models.IntegerField(default=0)
 
     class Meta:
         unique_together = ('student', 'course')
@@ -136,11 +132,20 @@ class StudentCourseEnrollment(models.Model):
     def __str__(self):
         return f"{self.student.fullname} enrolled in {self.course.title}"
 
+    @property
+    def progress(self):
+        """Completed share of the course in percent; needs ``course`` loaded."""
+        total = self.course.total_chapters
+        if not total:
+            return 100 if self.completed_at else 0
+        return min(100, round(self.completed_chapters * 100 / total))
+
 class StudentChapterProgress(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='chapter_progress')
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     chapter = models.ForeignKey(Chapter, on_delete=models.CASCADE)
-    completed_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: offline clients sync the time they finished the chapter
+    completed_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         unique_together = ('student', 'chapter')
@@ -174,7 +179,7 @@ class CourseRating(models.Model):
         ratings = CourseRating.objects.filter(course=course)
         course.total_ratings = ratings.count()
         course.average_rating = ratings.aggregate(Avg('rating'))['rating__avg'] or 0
-        course.save()
+        course.save(update_fields=['total_ratings', 'average_rating', 'updated_at'])
 
 class StudentFavoriteCourse(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='favorite_courses')
@@ -232,6 +237,7 @@ class QuizQuestion(models.Model):
     ans4 = models.CharField(max_length=200)
     right_ans = models.CharField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "11. Quiz Questions"
@@ -298,8 +304,11 @@ class Notification(models.Model):
     message = models.TextField()
     related_quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, blank=True)
     related_course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True)
+    # Set on 'New Message' notifications so a conversation can mark its own as read
+    related_conversation = models.ForeignKey('Conversation', on_delete=models.SET_NULL, null=True, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -382,11 +391,36 @@ class TeacherStudentChat(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Serves history pages and after_id polling of one conversation
+            models.Index(fields=['teacher', 'student', 'id'], name='chat_conversation_id_idx'),
+        ]
         verbose_name_plural = "20. Teacher-Student Chats"
 
     def __str__(self):
         return f"Chat between {self.teacher.full_name} and {self.student.fullname}"
 
+class Conversation(models.Model):
+    """Read state and latest message of the chat between one teacher and one student."""
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='conversations')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='conversations')
+    last_message = models.TextField(blank=True, default='')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # Messages the teacher / the student has not opened yet
+    teacher_unread = models.IntegerField(default=0)
+    student_unread = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('teacher', 'student')
+        indexes = [
+            models.Index(fields=['teacher', '-last_message_at'], name='conversation_teacher_idx'),
+            models.Index(fields=['student', '-last_message_at'], name='conversation_student_idx'),
+        ]
+        verbose_name_plural = "23. Conversations"
+
+    def __str__(self):
+        return f"Conversation between {self.teacher.full_name} and {self.student.fullname}"
+
 class CoursePayment(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -401,3 +435,71 @@ class CoursePayment(models.Model):
 
     def __str__(self):
         return f'{self.student.fullname} - {self.course.title}'
+
+class NotificationJob(models.Model):
+    """A notification fan-out to every student enrolled in a course, run in the background."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='notification_jobs')
+    notification_type = models.CharField(max_length=20)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    related_quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    # Highest student id notified so far; a resumed job continues after it
+    last_student_id = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "22. Notification Jobs"
+
+    def __str__(self):
+        return f'{self.title} for {self.course.title} ({self.status})'
+
+    @property
+    def progress(self):
+        return round(self.processed * 100 / self.total, 2) if self.total else 100.0
+
+class OutboundEmail(models.Model):
+    """An email waiting in the outbox; main/outbox.py delivers it after the writing transaction commits."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    # Not sent before this time; pushed back after every failed attempt
+    available_at = models.DateTimeField(default=timezone.now)
+    # When a worker claimed the row; a claim older than OUTBOX_CLAIM_TIMEOUT is taken over
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_due_idx'),
+        ]
+        verbose_name_plural = "24. Outbound Emails"
+
+    def __str__(self):
+        return f'{self.subject} to {", ".join(self.recipients)} ({self.status})'
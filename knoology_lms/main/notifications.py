@@ -0,0 +1,143 @@
+"""
+Notification fan-out to the students enrolled in a course.
+
+Small courses are notified inside the request with batched bulk_create.
+Courses with more than NOTIFICATION_SYNC_LIMIT students get a NotificationJob
+instead. The job is handed to an in-process thread pool once the request's
+transaction commits, and the request returns straight away with the job id.
+Jobs record their progress after every batch, so any process can report it,
+and a job cut short by a restart can be resumed with
+``manage.py process_notification_jobs``.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import realtime
+from .models import Notification, NotificationJob, StudentCourseEnrollment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_SYNC_LIMIT = 1000
+DEFAULT_WORKERS = 2
+
+_executor = None
+
+
+def batch_size():
+    return getattr(settings, 'NOTIFICATION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def enrolled_student_batches(course_id, after_student_id=0, size=None):
+    """Yield lists of enrolled student ids in id order, one keyset query per batch."""
+    size = size or batch_size()
+    while True:
+        batch = list(
+            StudentCourseEnrollment.objects.filter(course_id=course_id, student_id__gt=after_student_id)
+            .order_by('student_id')
+            .values_list('student_id', flat=True)[:size]
+        )
+        if not batch:
+            return
+        yield batch
+        after_student_id = batch[-1]
+
+
+def create_notifications(student_ids, fields):
+    """bulk_create one notification per student (bulk_create skips post_save, so push them here)."""
+    Notification.objects.bulk_create(
+        [Notification(recipient_student_id=student_id, **fields) for student_id in student_ids]
+    )
+    realtime.publish('student', student_ids, 'notification', {
+        'notification_type': fields['notification_type'],
+        'title': fields['title'],
+        'message': fields['message'],
+    })
+
+
+def notify_course_students(course, notification_type, title, message, related_quiz=None):
+    """
+    Notify every student enrolled in ``course``.
+
+    Returns ``(recipient_count, job)``. ``job`` is None when the notifications
+    were already written, otherwise the queued NotificationJob.
+    """
+    total = StudentCourseEnrollment.objects.filter(course=course).count()
+    fields = {
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'related_quiz': related_quiz,
+        'related_course': course,
+    }
+
+    if total <= getattr(settings, 'NOTIFICATION_SYNC_LIMIT', DEFAULT_SYNC_LIMIT):
+        for student_ids in enrolled_student_batches(course.id):
+            create_notifications(student_ids, fields)
+        return total, None
+
+    fields.pop('related_course')
+    job = NotificationJob.objects.create(course=course, total=total, **fields)
+    # The worker must not start before the job row (and whatever the caller
+    # wrote alongside it) is visible to its own connection
+    transaction.on_commit(lambda: submit_job(job.id))
+    return total, job
+
+
+def submit_job(job_id):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'NOTIFICATION_WORKERS', DEFAULT_WORKERS),
+            thread_name_prefix='notifications'
+        )
+    return _executor.submit(run_job, job_id)
+
+
+def run_job(job_id, claim_statuses=('pending',)):
+    """
+    Run a NotificationJob to completion. The job is claimed atomically, so a
+    job picked up by one worker is skipped by any other. Returns True if this
+    call ran the job.
+    """
+    try:
+        claimed = NotificationJob.objects.filter(
+            id=job_id, status__in=claim_statuses
+        ).update(status='running', error='', updated_at=timezone.now())
+        if not claimed:
+            return False
+
+        job = NotificationJob.objects.get(id=job_id)
+        fields = {
+            'notification_type': job.notification_type,
+            'title': job.title,
+            'message': job.message,
+            'related_quiz_id': job.related_quiz_id,
+            'related_course_id': job.course_id,
+        }
+
+        for student_ids in enrolled_student_batches(job.course_id, job.last_student_id):
+            # Each batch and its progress update commit together, so a resumed
+            # job never notifies a student twice
+            with transaction.atomic():
+                create_notifications(student_ids, fields)
+                NotificationJob.objects.filter(id=job_id).update(
+                    processed=F('processed') + len(student_ids),
+                    last_student_id=student_ids[-1],
+                    updated_at=timezone.now()
+                )
+
+        NotificationJob.objects.filter(id=job_id).update(status='completed', updated_at=timezone.now())
+        return True
+    except Exception as e:
+        logger.exception('Notification job %s failed', job_id)
+        NotificationJob.objects.filter(id=job_id).update(status='failed', error=str(e), updated_at=timezone.now())
+        return True
+    finally:
+        # Connections are per thread; do not leave the worker's one open
+        connections.close_all()
@@ -0,0 +1,200 @@
+"""
+Outbound email queue.
+
+queue_email() writes an OutboundEmail row in the caller's transaction, so a
+mail exists exactly when the data it is about was committed, and the request
+does not wait on the SMTP relay. Once the transaction commits, a background
+thread in the same process is woken to deliver everything due.
+
+Delivery claims up to OUTBOX_BATCH_SIZE rows at a time and sends them over
+one backend connection. A failed message is retried with exponential backoff
+(OUTBOX_RETRY_DELAY, doubled per attempt) until OUTBOX_MAX_ATTEMPTS, then
+marked failed. Rows claimed by a worker that died are taken over once the
+claim is older than OUTBOX_CLAIM_TIMEOUT.
+
+Set OUTBOX_IN_PROCESS off to leave delivery to ``manage.py send_queued_email
+--loop`` running as its own process.
+"""
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 30
+DEFAULT_CLAIM_TIMEOUT = 300
+# Longest the in-process worker sleeps waiting for a retry to fall due
+IDLE_POLL_SECONDS = 60
+
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def queue_email(subject, body, recipients, from_email=None, html_message=None):
+    """Queue a mail for delivery once the current transaction commits. Returns the OutboundEmail."""
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+    if _setting('OUTBOX_IN_PROCESS', True):
+        transaction.on_commit(wake_worker)
+    return email
+
+
+def queue_emails(messages, batch_size=None):
+    """queue_email() for many mails at once; ``messages`` are dicts of its keyword arguments."""
+    emails = OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=message['subject'],
+            body=message['body'],
+            html_body=message.get('html_message') or '',
+            from_email=message.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+            recipients=list(message['recipients']),
+        )
+        for message in messages
+    ], batch_size=batch_size)
+    if emails and _setting('OUTBOX_IN_PROCESS', True):
+        transaction.on_commit(wake_worker)
+    return emails
+
+
+def wake_worker():
+    """Start the delivery thread if it is not running, and have it look for due mail."""
+    global _worker
+    with _worker_lock:
+        _wakeup.set()
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name='outbox', daemon=True)
+            _worker.start()
+
+
+def _run_worker():
+    try:
+        while True:
+            _wakeup.clear()
+            deliver_due()
+            delay = seconds_until_next_due()
+            if delay is None:
+                # Nothing left; stop unless mail was queued while we were checking
+                with _worker_lock:
+                    if not _wakeup.is_set():
+                        return
+                continue
+            _wakeup.wait(min(delay, IDLE_POLL_SECONDS))
+    except Exception:
+        logger.exception('Outbox worker stopped')
+    finally:
+        connections.close_all()
+
+
+def seconds_until_next_due():
+    """Seconds until the next pending mail may be sent, or None if there is none."""
+    next_at = OutboundEmail.objects.filter(status='pending').aggregate(next_at=Min('available_at'))['next_at']
+    if next_at is None:
+        return None
+    return max(0.0, (next_at - timezone.now()).total_seconds())
+
+
+def claim_batch(size=None):
+    """Mark up to ``size`` due mails as sending and return them."""
+    size = size or _setting('OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=_setting('OUTBOX_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT))
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', available_at__lte=now) | Q(status='sending', claimed_at__lt=stale))
+            .order_by('available_at', 'id')[:size]
+        )
+        if emails:
+            OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+                status='sending', claimed_at=now
+            )
+    return emails
+
+
+def _message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.recipients, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error):
+    attempts = email.attempts + 1
+    if attempts >= _setting('OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+        logger.error('Giving up on email %s to %s after %s attempts: %s', email.id, email.recipients, attempts, error)
+        fields = {'status': 'failed'}
+    else:
+        delay = _setting('OUTBOX_RETRY_DELAY', DEFAULT_RETRY_DELAY) * 2 ** (attempts - 1)
+        fields = {'status': 'pending', 'available_at': timezone.now() + datetime.timedelta(seconds=delay)}
+    OutboundEmail.objects.filter(id=email.id).update(
+        attempts=attempts, last_error=str(error), claimed_at=None, **fields
+    )
+
+
+def send_batch(emails):
+    """Send claimed mails over one backend connection. Returns the number sent."""
+    connection = get_connection()
+    sent_ids = []
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            _record_failure(email, e)
+        return 0
+    try:
+        for email in emails:
+            try:
+                _message(email, connection).send()
+            except Exception as e:
+                _record_failure(email, e)
+                # The SMTP session may be unusable after an error; start a fresh
+                # one. If that fails too, the next send opens its own.
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+                continue
+            sent_ids.append(email.id)
+    finally:
+        connection.close()
+        if sent_ids:
+            OutboundEmail.objects.filter(id__in=sent_ids).update(
+                status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1, claimed_at=None
+            )
+    return len(sent_ids)
+
+
+def deliver_due():
+    """Send every due mail, batch by batch. Returns (sent, failed attempts)."""
+    sent = failed = 0
+    while True:
+        emails = claim_batch()
+        if not emails:
+            break
+        delivered = send_batch(emails)
+        sent += delivered
+        failed += len(emails) - delivered
+    return sent, failed
@@ -0,0 +1,176 @@
+"""
+Keyset (cursor) pagination and streaming JSON output for large list endpoints.
+
+Unlike OFFSET pagination, a keyset page is fetched with a WHERE on the last
+row's ordering key, so page N costs the same as page 1. Every ordering ends in
+``id`` which makes the key unique and the cursor stable under inserts.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_MAX_PAGE_SIZE = 100
+DEFAULT_STREAM_CHUNK_SIZE = 500
+
+# ordering name -> (model fields making up the key, descending?)
+ORDERINGS = {
+    'id': (('id',), False),
+    '-id': (('id',), True),
+    'average_rating': (('average_rating', 'id'), False),
+    '-average_rating': (('average_rating', 'id'), True),
+    # Relevance of a search hit, annotated by main.search.search_courses
+    '-rank': (('rank', 'id'), True),
+    'attempted_at': (('attempted_at', 'id'), False),
+    '-attempted_at': (('attempted_at', 'id'), True),
+}
+
+# Orderings each kind of list accepts
+COURSE_ORDERINGS = ('id', '-id', 'average_rating', '-average_rating')
+SEARCH_ORDERINGS = COURSE_ORDERINGS + ('-rank',)
+ATTEMPT_ORDERINGS = ('-attempted_at', 'attempted_at')
+
+# How to turn cursor values back into Python values, per key field
+FIELD_PARSERS = {
+    'id': int,
+    'average_rating': Decimal,
+    'rank': float,
+    'attempted_at': datetime.fromisoformat,
+}
+
+
+class CursorError(ValueError):
+    """Raised when the cursor, ordering or page size in a request is invalid."""
+
+
+def wants_pagination(request):
+    """Pagination is opt-in so existing clients keep getting the full list."""
+    return 'cursor' in request.GET or 'page_size' in request.GET
+
+
+def wants_stream(request):
+    return request.GET.get('stream') in ('1', 'true')
+
+
+def get_page_size(request, endpoint):
+    """Page size for an endpoint: ?page_size= capped by API_MAX_PAGE_SIZE, else API_PAGE_SIZES[endpoint]."""
+    page_sizes = getattr(settings, 'API_PAGE_SIZES', {})
+    default = page_sizes.get(endpoint, DEFAULT_PAGE_SIZE)
+    max_size = getattr(settings, 'API_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+
+    raw = request.GET.get('page_size')
+    if raw is None:
+        return default
+    try:
+        size = int(raw)
+    except ValueError:
+        raise CursorError('page_size must be an integer')
+    if size < 1:
+        raise CursorError('page_size must be positive')
+    return min(size, max_size)
+
+
+def encode_cursor(ordering, values):
+    payload = json.dumps({'o': ordering, 'v': [str(value) for value in values]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        cursor_ordering, raw_values = payload['o'], payload['v']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise CursorError('Invalid cursor')
+
+    key_fields = ORDERINGS[ordering][0]
+    if cursor_ordering != ordering or len(raw_values) != len(key_fields):
+        raise CursorError('Cursor does not match the requested ordering')
+    try:
+        return [FIELD_PARSERS[field](value) for field, value in zip(key_fields, raw_values)]
+    except (ValueError, TypeError, InvalidOperation):
+        raise CursorError('Invalid cursor')
+
+
+def _after_key_filter(key_fields, values, descending):
+    """
+    Build the row-value comparison ``(f1, f2, ...) > (v1, v2, ...)`` (or ``<``)
+    as nested ORs, which the ORM can express and an index on the key serves.
+    """
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for i, field in enumerate(key_fields):
+        equal_prefix = {key_fields[j]: values[j] for j in range(i)}
+        condition |= Q(**equal_prefix, **{f'{field}__{lookup}': values[i]})
+    return condition
+
+
+def apply_ordering(queryset, request, default_ordering='id', allowed=None):
+    """
+    Order ``queryset`` by the ``?ordering=`` key; returns ``(queryset, ordering)``.
+
+    ``allowed`` limits the orderings an endpoint accepts (default: all of ORDERINGS).
+    """
+    allowed = allowed or ORDERINGS
+    ordering = request.GET.get('ordering', default_ordering)
+    if ordering not in allowed:
+        raise CursorError(f'ordering must be one of: {", ".join(allowed)}')
+    key_fields, descending = ORDERINGS[ordering]
+    prefix = '-' if descending else ''
+    return queryset.order_by(*[prefix + field for field in key_fields]), ordering
+
+
+def keyset_page(queryset, request, endpoint, default_ordering='id', allowed=None):
+    """
+    Return ``(rows, next_cursor)`` for one page of ``queryset``.
+
+    Reads ``ordering``, ``cursor`` and ``page_size`` from the query string.
+    ``next_cursor`` is None on the last page.
+    """
+    queryset, ordering = apply_ordering(queryset, request, default_ordering, allowed)
+    key_fields, descending = ORDERINGS[ordering]
+    page_size = get_page_size(request, endpoint)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, ordering)
+        queryset = queryset.filter(_after_key_filter(key_fields, values, descending))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(ordering, [getattr(last, field) for field in key_fields])
+    return rows, next_cursor
+
+
+def stream_json_list(queryset, to_representation, prefix='[', suffix=']', chunk_size=None):
+    """
+    Stream ``queryset`` as a JSON array, one serialized row at a time.
+
+    Rows are read with ``.iterator()`` (a server-side cursor on PostgreSQL), so
+    neither the model instances nor the rendered list are held in memory.
+    ``prefix``/``suffix`` let callers wrap the array in their usual envelope.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'API_STREAM_CHUNK_SIZE', DEFAULT_STREAM_CHUNK_SIZE)
+    encoder = JSONEncoder()
+
+    def generate():
+        yield prefix
+        first = True
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            row = encoder.encode(to_representation(obj))
+            yield row if first else ',' + row
+            first = False
+        yield suffix
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
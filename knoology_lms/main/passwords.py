@@ -0,0 +1,92 @@
+"""
+Student password hashing for requests.
+
+A PBKDF2 check costs hundreds of milliseconds of CPU. Every hash made or
+checked for a request runs on one bounded thread pool of
+PASSWORD_HASHING_WORKERS threads (hashlib releases the GIL while hashing, so
+they run in parallel), which keeps a login storm from taking every CPU the
+web workers have. That holds for sync views under WSGI and ASGI alike. At most
+PASSWORD_HASHING_QUEUE further requests wait for a thread; beyond that
+PasswordHashingBusy is raised and the view should answer 503 at once.
+
+check_student_password() also accepts the plaintext passwords older accounts
+were stored with, and hashes made with an outdated hasher or work factor. On a
+successful login those are replaced by a hash from the first entry of
+PASSWORD_HASHERS.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.utils.crypto import constant_time_compare
+
+from .models import Student
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_QUEUE = 32
+
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+def _pool():
+    global _executor, _slots
+    with _pool_lock:
+        if _executor is None:
+            workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', DEFAULT_WORKERS)
+            queue = getattr(settings, 'PASSWORD_HASHING_QUEUE', DEFAULT_QUEUE)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+            _slots = threading.BoundedSemaphore(workers + queue)
+    return _executor, _slots
+
+
+def run_hashing(func, *args):
+    """Run ``func(*args)`` on the hashing pool and wait for the result."""
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(raw_password):
+    return run_hashing(make_password, raw_password)
+
+
+def _verify(raw_password, encoded):
+    """Return (valid, needs_rehash)."""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        # Stored as plaintext by older registrations
+        return constant_time_compare(raw_password, encoded), True
+    if not hasher.verify(raw_password, encoded):
+        return False, False
+    preferred = get_hasher('default')
+    return True, hasher.algorithm != preferred.algorithm or hasher.must_update(encoded)
+
+
+def check_student_password(student, raw_password, rehash=True):
+    """
+    Check ``raw_password`` against the student's stored password. With
+    ``rehash``, a correct password stored as plaintext or with an outdated
+    hash is re-hashed and saved.
+    """
+    if not raw_password or not student.password:
+        return False
+    valid, needs_rehash = run_hashing(_verify, raw_password, student.password)
+    if valid and needs_rehash and rehash:
+        encoded = hash_password(raw_password)
+        # Leave the row alone if the password was changed in the meantime
+        Student.objects.filter(id=student.id, password=student.password).update(password=encoded)
+        student.password = encoded
+    return valid
@@ -0,0 +1,216 @@
+"""
+Course progress counters.
+
+Course.total_chapters and StudentCourseEnrollment.completed_chapters count
+Chapter and StudentChapterProgress rows. They are updated with F()
+expressions in the same transaction as the rows they count, so whether a
+student finished a course, or how far along they are, is a read of the
+enrollment row. ``manage.py reconcile_enrollment_counts`` repairs counters
+that drifted, e.g. after chapters were edited in the admin.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Chapter, Course, StudentChapterProgress, StudentCourseEnrollment
+
+
+# Largest batch accepted by sync_progress
+MAX_SYNC_ITEMS = 500
+
+
+class ProgressError(Exception):
+    pass
+
+
+def chapter_count():
+    """Number of chapters of the outer Course, for annotate() or update()."""
+    chapters = Chapter.objects.filter(course=OuterRef('pk')).order_by().values('course')
+    return Coalesce(Subquery(chapters.annotate(c=Count('id')).values('c')), 0)
+
+
+def completed_count():
+    """Number of chapters the outer enrollment's student completed in its course."""
+    progress = StudentChapterProgress.objects.filter(
+        student=OuterRef('student'), chapter__course=OuterRef('course')
+    ).order_by().values('student')
+    return Coalesce(Subquery(progress.annotate(c=Count('id')).values('c')), 0)
+
+
+def completed_chapters_for(student_id, course_id):
+    """Progress a new enrollment starts from; rows survive an unenrollment."""
+    return StudentChapterProgress.objects.filter(student_id=student_id, chapter__course_id=course_id).count()
+
+
+def count_completed(enrollments, added, total_chapters, now=None):
+    """
+    Add ``added`` completed chapters to ``enrollments`` (a queryset) and stamp
+    completed_at (``now``) on those that now cover all ``total_chapters``, in
+    one UPDATE.
+    """
+    fields = {'completed_chapters': F('completed_chapters') + added}
+    if total_chapters > 0:
+        fields['completed_at'] = Case(
+            When(completed_at__isnull=True, completed_chapters__gte=total_chapters - added,
+                 then=Value(now or timezone.now())),
+            default=F('completed_at'),
+        )
+    return enrollments.update(**fields)
+
+
+def complete_chapter(student_id, course_id, chapter_id):
+    """
+    Record that a student completed a chapter. Returns ``(enrollment,
+    created, completed)``: the enrollment's counter already includes the
+    chapter, and ``completed`` is True if this chapter completed the course.
+    Raises ProgressError if the student is not enrolled in the course or the
+    chapter belongs to another course.
+    """
+    enrollment = (
+        StudentCourseEnrollment.objects.select_related('course')
+        .annotate(chapter_in_course=Exists(Chapter.objects.filter(id=chapter_id, course=OuterRef('course'))))
+        .filter(student_id=student_id, course_id=course_id)
+        .first()
+    )
+    if enrollment is None:
+        raise ProgressError('Student is not enrolled in this course')
+    if not enrollment.chapter_in_course:
+        raise ProgressError('Chapter not found in this course')
+
+    completed = False
+    with transaction.atomic():
+        _, created = StudentChapterProgress.objects.get_or_create(
+            student_id=student_id, chapter_id=chapter_id, defaults={'course_id': course_id}
+        )
+        if created:
+            now = timezone.now()
+            row = StudentCourseEnrollment.objects.filter(pk=enrollment.pk)
+            count_completed(row, 1, enrollment.course.total_chapters, now)
+            # Read back rather than add to the row read above: a concurrent
+            # request may have completed another chapter since
+            enrollment.completed_chapters, enrollment.completed_at = row.values_list(
+                'completed_chapters', 'completed_at'
+            ).get()
+            # Only the UPDATE that stamped completed_at stored this request's time
+            completed = enrollment.completed_at == now
+    return enrollment, created, completed
+
+
+def _completed_time(value, now):
+    """A synced completion time, no later than ``now``; None if unparseable."""
+    if value in (None, ''):
+        return now
+    try:
+        completed_at = parse_datetime(str(value))
+    except ValueError:
+        return None
+    if completed_at is None:
+        return None
+    if timezone.is_naive(completed_at):
+        completed_at = timezone.make_aware(completed_at)
+    return min(completed_at, now)
+
+
+def sync_progress(student_id, items):
+    """
+    Record a batch of ``{'course_id', 'chapter_id', 'completed_at'}`` items
+    for a student, e.g. replayed by a client that studied offline.
+
+    Items are checked against the student's enrollments in one query and
+    written with a single bulk INSERT. The counters of the enrollments
+    touched are then recounted in one UPDATE, in the same transaction, so
+    rows a concurrent request inserted first (and bulk_create skipped) are
+    not counted twice. Returns ``(courses, rejected, completed)``: the merged
+    completed chapter ids per course touched by the batch, the items that
+    were not chapters of a course the student is enrolled in, and
+    ``(enrollment_id, course_id)`` for the enrollments this batch completed.
+    """
+    if not isinstance(items, list):
+        raise ProgressError('items must be a list')
+    if len(items) > MAX_SYNC_ITEMS:
+        raise ProgressError(f'At most {MAX_SYNC_ITEMS} items can be synced at once')
+
+    now = timezone.now()
+    requested, rejected = {}, []
+    for item in items:
+        try:
+            key = (int(item['course_id']), int(item['chapter_id']))
+            completed_at = _completed_time(item.get('completed_at'), now)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            key = completed_at = None
+        if key is None or completed_at is None:
+            rejected.append(item)
+            continue
+        # A chapter synced twice keeps its earliest completion
+        requested[key] = min(completed_at, requested.get(key, completed_at))
+
+    valid = set(Chapter.objects.filter(
+        id__in={chapter_id for _, chapter_id in requested},
+        course_id__in={course_id for course_id, _ in requested},
+        course__enrolled_students__student_id=student_id,
+    ).values_list('course_id', 'id'))
+    rejected += [
+        {'course_id': course_id, 'chapter_id': chapter_id}
+        for course_id, chapter_id in requested if (course_id, chapter_id) not in valid
+    ]
+
+    courses = {course_id: set() for course_id, _ in valid}
+    for course_id, chapter_id in StudentChapterProgress.objects.filter(
+        student_id=student_id, course_id__in=courses
+    ).values_list('course_id', 'chapter_id'):
+        courses[course_id].add(chapter_id)
+
+    new = [(course_id, chapter_id) for course_id, chapter_id in valid if chapter_id not in courses[course_id]]
+    completed = []
+    if new:
+        with transaction.atomic():
+            # ignore_conflicts skips rows a concurrent request inserted since the read above
+            StudentChapterProgress.objects.bulk_create([
+                StudentChapterProgress(
+                    student_id=student_id, course_id=course_id, chapter_id=chapter_id,
+                    completed_at=requested[course_id, chapter_id],
+                )
+                for course_id, chapter_id in new
+            ], ignore_conflicts=True)
+            enrollments = StudentCourseEnrollment.objects.filter(
+                student_id=student_id, course_id__in={course_id for course_id, _ in new}
+            )
+            # Recounted rather than incremented, as bulk_create cannot tell which rows it skipped
+            enrollments.update(completed_chapters=completed_count())
+            completed = list(enrollments.filter(
+                completed_at__isnull=True, course__total_chapters__gt=0,
+                completed_chapters__gte=F('course__total_chapters'),
+            ).values_list('id', 'course_id'))
+            if completed:
+                StudentCourseEnrollment.objects.filter(
+                    id__in=[enrollment_id for enrollment_id, _ in completed], completed_at__isnull=True
+                ).update(completed_at=now)
+        for course_id, chapter_id in new:
+            courses[course_id].add(chapter_id)
+    return {course_id: sorted(chapter_ids) for course_id, chapter_ids in courses.items()}, rejected, completed
+
+
+def _enrollments_with_chapter(chapter_id, course_id):
+    students = StudentChapterProgress.objects.filter(chapter_id=chapter_id).values('student')
+    return StudentCourseEnrollment.objects.filter(course_id=course_id, student__in=students)
+
+
+def chapter_added(course_id):
+    Course.objects.filter(id=course_id).update(total_chapters=F('total_chapters') + 1)
+
+
+def chapter_removed(chapter):
+    """Call before deleting ``chapter``, in the same transaction."""
+    _enrollments_with_chapter(chapter.id, chapter.course_id).update(completed_chapters=F('completed_chapters') - 1)
+    Course.objects.filter(id=chapter.course_id).update(total_chapters=F('total_chapters') - 1)
+
+
+def chapter_moved(chapter, old_course_id):
+    """Call after saving ``chapter`` under another course, in the same transaction."""
+    _enrollments_with_chapter(chapter.id, old_course_id).update(completed_chapters=F('completed_chapters') - 1)
+    _enrollments_with_chapter(chapter.id, chapter.course_id).update(completed_chapters=F('completed_chapters') + 1)
+    StudentChapterProgress.objects.filter(chapter=chapter).update(course_id=chapter.course_id)
+    Course.objects.filter(id=old_course_id).update(total_chapters=F('total_chapters') - 1)
+    chapter_added(chapter.course_id)
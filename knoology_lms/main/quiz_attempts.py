@@ -0,0 +1,72 @@
+"""
+Loader shared by the quiz attempt list views.
+
+Attempts come with their quiz, course and student joined in. Per-question
+responses are opt-in (?include=responses) and, when asked for, are fetched
+for every attempt on the page with one prefetch query.
+"""
+from django.db.models import Prefetch
+
+from .models import StudentQuizResponse
+from .pagination import ATTEMPT_ORDERINGS, apply_ordering, keyset_page, wants_pagination
+
+
+def wants_responses(request):
+    """Question-level detail is opt-in: ?include=responses."""
+    return 'responses' in request.GET.get('include', '').split(',')
+
+
+def load_quiz_attempts(request, attempts, endpoint):
+    """
+    Load completed quiz attempts for the attempt list views.
+
+    Responses are fetched with a single prefetch query, and only when asked
+    for. With ?cursor= or ?page_size= one keyset page (newest first by
+    default) is returned; returns ``(rows, next_cursor)``.
+    """
+    include_responses = wants_responses(request)
+    attempts = attempts.select_related('quiz', 'course', 'student')
+    if include_responses:
+        attempts = attempts.prefetch_related(Prefetch(
+            'responses',
+            queryset=StudentQuizResponse.objects.select_related('question').order_by('id')
+        ))
+
+    next_cursor = None
+    if wants_pagination(request):
+        attempts, next_cursor = keyset_page(
+            attempts, request, endpoint, default_ordering='-attempted_at', allowed=ATTEMPT_ORDERINGS
+        )
+    else:
+        attempts, _ = apply_ordering(attempts, request, default_ordering='-attempted_at', allowed=ATTEMPT_ORDERINGS)
+
+    rows = []
+    for attempt in attempts:
+        # Calculate percentage score
+        percentage = (attempt.obtained_marks / attempt.quiz.total_marks * 100) if attempt.quiz.total_marks > 0 else 0
+
+        row = {
+            'id': attempt.id,
+            'student': attempt.student.id,
+            'student_name': attempt.student.fullname,
+            'username': attempt.student.username,
+            'quiz': attempt.quiz.id,
+            'quiz_title': attempt.quiz.title,
+            'course': attempt.course.id,
+            'course_title': attempt.course.title,
+            'total_questions': attempt.total_questions,
+            'total_score': attempt.correct_answers,
+            'obtained_marks': float(attempt.obtained_marks),
+            'total_marks': float(attempt.quiz.total_marks),
+            'percentage': float(percentage),
+            'created_at': attempt.attempted_at
+        }
+        if include_responses:
+            row['questions_data'] = [{
+                'question_text': response.question.question_text,
+                'selected_option': response.selected_answer,
+                'correct_option': response.question.right_ans,
+                'is_correct': response.is_correct
+            } for response in attempt.responses.all()]
+        rows.append(row)
+    return rows, next_cursor
@@ -0,0 +1,117 @@
+"""
+Versioned quiz snapshots.
+
+A snapshot is an immutable copy of a quiz and its questions, built with two
+queries and shared by quiz delivery (questions without answers) and grading
+(the answer key). Snapshots are cached in-process and in the ``shared`` cache
+under the quiz's current version. The version itself lives only in the shared
+cache, which every server process reads, and any write to the quiz or its
+questions bumps it (see main/signals.py), so no process serves or grades
+against a stale snapshot; those are never read again and expire on their own.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.core.cache import caches
+
+from .models import Quiz, QuizQuestion
+
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60
+LOCAL_SNAPSHOT_LIMIT = 256
+# Must be shared by every server process (see CACHES in settings)
+SHARED_CACHE = 'shared'
+
+DELIVERY_FIELDS = ('id', 'question_text', 'ans1', 'ans2', 'ans3', 'ans4')
+
+_local_snapshots = OrderedDict()
+_local_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    """Treat as read-only: the same instance is handed to every request."""
+    quiz: dict
+    questions: tuple
+    answer_key: dict
+
+    @property
+    def total_questions(self):
+        return len(self.questions)
+
+    def delivery(self):
+        """Quiz details and questions as sent to students; never includes right_ans."""
+        return dict(self.quiz, total_questions=self.total_questions), [dict(q) for q in self.questions]
+
+
+def _version_key(quiz_id):
+    return f'quiz_version:{quiz_id}'
+
+
+def _snapshot_key(quiz_id, version):
+    return f'quiz_snapshot:{quiz_id}:{version}'
+
+
+def get_quiz_version(quiz_id):
+    shared = caches[SHARED_CACHE]
+    key = _version_key(quiz_id)
+    version = shared.get(key)
+    if version is None:
+        # add() so that concurrent first readers agree on a single version
+        shared.add(key, uuid.uuid4().hex, None)
+        version = shared.get(key)
+    return version
+
+
+def bump_quiz_version(quiz_id):
+    caches[SHARED_CACHE].set(_version_key(quiz_id), uuid.uuid4().hex, None)
+
+
+def build_quiz_snapshot(quiz_id):
+    quiz = Quiz.objects.values('id', 'title', 'description', 'total_marks').get(id=quiz_id)
+    rows = QuizQuestion.objects.filter(quiz_id=quiz_id).order_by('id').values(*DELIVERY_FIELDS, 'right_ans')
+
+    questions = []
+    answer_key = {}
+    for row in rows:
+        answer_key[row['id']] = row.pop('right_ans')
+        questions.append(row)
+
+    return QuizSnapshot(quiz=quiz, questions=tuple(questions), answer_key=answer_key)
+
+
+def _remember(local_key, snapshot):
+    with _local_lock:
+        _local_snapshots[local_key] = snapshot
+        _local_snapshots.move_to_end(local_key)
+        while len(_local_snapshots) > LOCAL_SNAPSHOT_LIMIT:
+            _local_snapshots.popitem(last=False)
+
+
+def get_quiz_snapshot(quiz_id):
+    """
+    Return the current snapshot of a quiz, raising Quiz.DoesNotExist if the
+    quiz is gone. Costs one shared-cache read (the version) when the snapshot
+    is already held in this process.
+    """
+    quiz_id = int(quiz_id)
+    version = get_quiz_version(quiz_id)
+    local_key = (quiz_id, version)
+
+    with _local_lock:
+        snapshot = _local_snapshots.get(local_key)
+        if snapshot is not None:
+            _local_snapshots.move_to_end(local_key)
+    if snapshot is not None:
+        return snapshot
+
+    key = _snapshot_key(quiz_id, version)
+    shared = caches[SHARED_CACHE]
+    snapshot = shared.get(key)
+    if snapshot is None:
+        snapshot = build_quiz_snapshot(quiz_id)
+        shared.set(key, snapshot, SNAPSHOT_CACHE_TIMEOUT)
+
+    _remember(local_key, snapshot)
+    return snapshot
@@ -0,0 +1,82 @@
+"""
+Cache-backed attempt limits for logins.
+
+LOGIN_RATE_LIMITS maps a scope to (attempts, window in seconds): 'account'
+counts failed logins per username and 'ip' counts every login attempt per
+client address. A client over either limit is turned away before any password
+is hashed. Counters are fixed windows kept in the ``shared`` cache, so the
+limits hold across every server process. Each entry stores its count with
+the time its window ends and is rewritten with the time left, so hits never
+extend a window. The read-then-write is not atomic, so a burst of concurrent
+attempts can slip a few past a limit.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Must be shared by every server process (see CACHES in settings)
+SHARED_CACHE = 'shared'
+
+DEFAULT_LIMITS = {
+    'account': (5, 300),
+    'ip': (30, 300),
+}
+
+
+def _limits():
+    return getattr(settings, 'LOGIN_RATE_LIMITS', DEFAULT_LIMITS)
+
+
+def _key(scope, value):
+    # Hashed so any username is a valid cache key
+    return f'login-window:{scope}:{hashlib.sha256(str(value).encode()).hexdigest()}'
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class LoginLimiter:
+    def __init__(self, request, account):
+        self.keys = {
+            'account': _key('account', account),
+            'ip': _key('ip', client_ip(request)),
+        }
+
+    def retry_after(self):
+        """Seconds to wait if a limit is reached, otherwise None."""
+        limits = _limits()
+        now = time.time()
+        windows = caches[SHARED_CACHE].get_many([self.keys[scope] for scope in limits if scope in self.keys])
+        blocked = []
+        for scope, (attempts, _) in limits.items():
+            count, ends_at = windows.get(self.keys.get(scope), (0, now))
+            if count >= attempts and ends_at > now:
+                blocked.append(math.ceil(ends_at - now))
+        return max(blocked) if blocked else None
+
+    def _hit(self, scope):
+        limit = _limits().get(scope)
+        if limit is None:
+            return
+        shared = caches[SHARED_CACHE]
+        key = self.keys[scope]
+        now = time.time()
+        count, ends_at = shared.get(key, (0, now))
+        if ends_at <= now:
+            # No window yet, or the last one is over: start a new one
+            count, ends_at = 0, now + limit[1]
+        # Only the time left, so the hit does not push the window's end back
+        shared.set(key, (count + 1, ends_at), timeout=math.ceil(ends_at - now))
+
+    def attempt(self):
+        self._hit('ip')
+
+    def failed(self):
+        self._hit('account')
+
+    def succeeded(self):
+        caches[SHARED_CACHE].delete(self.keys['account'])
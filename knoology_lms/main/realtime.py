@@ -0,0 +1,191 @@
+"""
+Server-sent events for chat messages and notifications.
+
+Browsers hold one ``GET /api/events/<user_type>/<user_id>/`` stream (served by
+the ASGI application in knoology_lms/asgi.py) instead of polling the chat and
+notification endpoints. Events are fanned out by an in-process broker that
+maps ``(user_type, user_id)`` to the asyncio queues of the streams open in this
+process.
+
+On PostgreSQL every event is published with ``pg_notify`` on one channel and a
+listener thread in each process feeds what it hears into the local broker, so
+a message written by one worker reaches streams held by any other. On other
+databases events go straight to the local broker (single process only).
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.db import connection, connections, transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = 'lms_events'
+# pg_notify payloads must stay under 8000 bytes
+MAX_PAYLOAD_BYTES = 7500
+KEEPALIVE_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_encoder = JSONEncoder()
+
+
+class Broker:
+    """In-process pub/sub from (user_type, user_id) to subscriber queues."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_type, user_id):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers[(user_type, user_id)].add((loop, queue))
+        return queue
+
+    def unsubscribe(self, user_type, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get((user_type, user_id))
+            if not subscribers:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                del self._subscribers[(user_type, user_id)]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def deliver(self, user_type, user_ids, event):
+        """Hand ``event`` to every local stream of the given users; safe from any thread."""
+        with self._lock:
+            targets = [s for user_id in user_ids for s in self._subscribers.get((user_type, user_id), ())]
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+
+def _offer(queue, event):
+    # A client that stopped reading loses events instead of growing memory;
+    # it resyncs through the REST endpoints when it reconnects
+    if not queue.full():
+        queue.put_nowait(event)
+
+
+broker = Broker()
+
+
+def _payloads(user_type, user_ids, event, data):
+    """Split one event into pg_notify payloads that each fit under the size limit."""
+    body = {'t': user_type, 'e': event, 'd': data}
+    if len(_encoder.encode(body).encode()) > MAX_PAYLOAD_BYTES // 2:
+        # Too large to carry (e.g. a very long chat message): send the ids only
+        # and let the client fetch the rest
+        body['d'] = {key: data[key] for key in ('id', 'teacher', 'student') if key in data}
+        body['truncated'] = True
+
+    chunk = []
+    for user_id in user_ids:
+        chunk.append(user_id)
+        if len(_encoder.encode(dict(body, u=chunk)).encode()) > MAX_PAYLOAD_BYTES:
+            chunk.pop()
+            yield _encoder.encode(dict(body, u=chunk))
+            chunk = [user_id]
+    if chunk:
+        yield _encoder.encode(dict(body, u=chunk))
+
+
+def _send(user_type, user_ids, event, data):
+    if connection.vendor != 'postgresql':
+        broker.deliver(user_type, user_ids, {'event': event, 'data': data})
+        return
+    with connection.cursor() as cursor:
+        for payload in _payloads(user_type, user_ids, event, data):
+            cursor.execute('SELECT pg_notify(%s, %s)', [PG_CHANNEL, payload])
+
+
+def publish(user_type, user_ids, event, data):
+    """
+    Push ``event`` with JSON-serializable ``data`` to the streams of the
+    given teachers or students once the current transaction commits.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    transaction.on_commit(lambda: _send(user_type, user_ids, event, data))
+
+
+class _PgListener(threading.Thread):
+    """LISTENs on PG_CHANNEL with a dedicated connection and feeds the broker."""
+
+    def __init__(self):
+        super().__init__(name='realtime-listener', daemon=True)
+
+    def run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Realtime listener lost its connection, reconnecting')
+                threading.Event().wait(1)
+
+    def _listen(self):
+        db = connections.create_connection('default')
+        # A psycopg 3 connection of its own, outside the pool: it stays in
+        # LISTEN for the life of the process
+        with db.Database.connect(**db.get_connection_params(), autocommit=True) as raw:
+            raw.execute(f'LISTEN {PG_CHANNEL}')
+            while True:
+                # Returns after KEEPALIVE_SECONDS of silence; a dropped connection raises
+                for notify in raw.notifies(timeout=KEEPALIVE_SECONDS):
+                    self._dispatch(notify.payload)
+
+    @staticmethod
+    def _dispatch(payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        event = {'event': message['e'], 'data': message['d']}
+        if message.get('truncated'):
+            event['truncated'] = True
+        broker.deliver(message['t'], message['u'], event)
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    global _listener
+    if connection.vendor != 'postgresql':
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = _PgListener()
+            _listener.start()
+
+
+def format_event(event):
+    lines = [f"event: {event['event']}"]
+    data = dict(event['data'], truncated=True) if event.get('truncated') else event['data']
+    lines.append(f'data: {_encoder.encode(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def event_stream(user_type, user_id):
+    """Async generator of SSE frames for one user, with keepalive comments."""
+    queue = broker.subscribe(user_type, user_id)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(user_type, user_id, queue)
@@ -0,0 +1,135 @@
+"""
+Cached responses for the public catalog endpoints.
+
+Rendered GET responses are kept in two tiers: the local-memory ``default``
+cache of the serving process, backed by the file-based ``shared`` cache that
+every process on the host reads. An entry is keyed by the request's host,
+path, sorted query parameters and Accept header, plus the current version of
+the data group the view reads. Writes to the models of a group bump its
+version in the shared cache (see main/signals.py), so stale entries are never
+read again and expire on their own.
+
+Every cached response carries an ETag: the view's own (see main/conditional.py)
+or a hash of the content. A request whose If-None-Match matches gets a 304
+from the cache entry, without running the view.
+
+Counters written with QuerySet.update() (Course.total_enrolled) send no
+signal and can lag by up to RESPONSE_CACHE_TIMEOUT seconds.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+LOCAL_CACHE = 'default'
+SHARED_CACHE = 'shared'
+DEFAULT_TIMEOUT = 300
+
+GROUPS = ('categories', 'courses', 'faqs', 'flatpages', 'ratings')
+
+
+def _version_key(group):
+    return f'response_version:{group}'
+
+
+def get_version(group):
+    shared = caches[SHARED_CACHE]
+    key = _version_key(group)
+    version = shared.get(key)
+    if version is None:
+        # add() so that concurrent first readers agree on a single version
+        shared.add(key, uuid.uuid4().hex, None)
+        version = shared.get(key)
+    return version
+
+
+def bump_versions(*groups):
+    caches[SHARED_CACHE].set_many({_version_key(group): uuid.uuid4().hex for group in groups}, None)
+
+
+def invalidate(*groups):
+    """Bump ``groups`` once the current transaction commits."""
+    # After the commit, so a reader cannot cache the old rows under the new version
+    transaction.on_commit(lambda: bump_versions(*groups))
+
+
+def clear():
+    """Drop every cached response and version, in both tiers."""
+    caches[LOCAL_CACHE].clear()
+    caches[SHARED_CACHE].clear()
+
+
+def _cache_key(request, group):
+    query = sorted((name, values) for name, values in request.GET.lists())
+    parts = (
+        request.scheme, request.get_host(), request.path, repr(query),
+        request.META.get('HTTP_ACCEPT', ''), get_version(group),
+    )
+    return f'response:{group}:' + hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def _lookup(key):
+    local = caches[LOCAL_CACHE]
+    entry = local.get(key)
+    if entry is None:
+        entry = caches[SHARED_CACHE].get(key)
+        if entry is not None:
+            local.set(key, entry, _timeout())
+    return entry
+
+
+def _store(key, entry):
+    timeout = _timeout()
+    caches[LOCAL_CACHE].set(key, entry, timeout)
+    caches[SHARED_CACHE].set(key, entry, timeout)
+
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def cache_response(group):
+    """
+    Cache a view's successful GET responses until ``group`` changes. Wraps a
+    view function, or a class-based view's ``dispatch`` through
+    method_decorator.
+    """
+    if group not in GROUPS:
+        raise ValueError(f'Unknown response cache group {group!r}')
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not _timeout():
+                return view(request, *args, **kwargs)
+
+            key = _cache_key(request, group)
+            entry = _lookup(key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                if callable(getattr(response, 'render', None)):
+                    response.render()
+                etag = response.get('ETag') or '"%s"' % hashlib.md5(
+                    response.content, usedforsecurity=False
+                ).hexdigest()
+                entry = {'content': response.content, 'headers': dict(response.items()), 'etag': etag}
+                _store(key, entry)
+
+            last_modified = parse_http_date_safe(entry['headers'].get('Last-Modified', ''))
+            response = get_conditional_response(request, etag=entry['etag'], last_modified=last_modified)
+            if response is None:
+                response = HttpResponse(entry['content'])
+                for header, value in entry['headers'].items():
+                    response[header] = value
+            response['ETag'] = entry['etag']
+            return response
+        return wrapper
+    return decorator
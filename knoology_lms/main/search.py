@@ -0,0 +1,82 @@
+"""
+Course search backed by PostgreSQL full-text search.
+
+Course.search_vector holds a weighted tsvector (title > technologies >
+description) behind a GIN index. Queries go through websearch_to_tsquery and
+are ranked with ts_rank. When nothing matches, typos are caught by a pg_trgm
+similarity search over title and technologies. On other databases (e.g. the
+SQLite used for local benchmarks) search falls back to icontains matching.
+"""
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Greatest, Substr
+
+SEARCH_CONFIG = 'english'
+
+SNIPPET_OPTIONS = {
+    'start_sel': '<mark>',
+    'stop_sel': '</mark>',
+    'max_words': 35,
+    'min_words': 15,
+    'max_fragments': 2,
+}
+
+
+def course_search_vector():
+    """Expression that computes the value stored in Course.search_vector."""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('technologies', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def search_courses(queryset, query):
+    """
+    Filter ``queryset`` down to courses matching ``query``.
+
+    Every returned row is annotated with ``rank`` (higher is better) and a
+    highlighted ``snippet`` of the description, so callers can page through
+    results ordered by ``(-rank, -id)``. ts_rank and similarity() return
+    ``real``; rank is cast to double precision so that keyset cursors holding
+    a Python float compare equal to the row they came from.
+    """
+    if not is_supported():
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(technologies__icontains=query)
+        ).annotate(
+            rank=Value(0.0, output_field=FloatField()),
+            snippet=Substr('description', 1, 200),
+        )
+
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    snippet = SearchHeadline('description', search_query, config=SEARCH_CONFIG, **SNIPPET_OPTIONS)
+
+    matches = queryset.filter(search_vector=search_query)
+    if matches.exists():
+        return matches.annotate(
+            rank=Cast(SearchRank(F('search_vector'), search_query), FloatField()),
+            snippet=snippet,
+        )
+
+    # No lexeme matched; treat the query as a possibly misspelled title or
+    # technology. The % operator (trigram_similar, pg_trgm.similarity_threshold)
+    # is served by the trigram GIN indexes, similarity() then orders the hits.
+    return queryset.filter(
+        Q(title__trigram_similar=query) | Q(technologies__trigram_similar=query)
+    ).annotate(
+        rank=Cast(Greatest(
+            TrigramSimilarity('title', query),
+            TrigramSimilarity('technologies', query),
+        ), FloatField()),
+        snippet=snippet,
+    )
@@ -3,9 +3,11 @@ from .models import (Teacher, Course, CourseCategory, Chapter, Student,
                    StudentCourseEnrollment, CourseRating, Assignment, 
                    Quiz, QuizQuestion, CourseQuiz, 
                    StudentQuizAttempt, StudentQuizResponse, Notification, StudyMaterial, FAQ, ContactUs,
-                   TeacherStudentChat)
+                   TeacherStudentChat, NotificationJob)
 from django.contrib.flatpages.models import FlatPage
 
+from .passwords import hash_password
+
 class TeacherSerializer(serializers.ModelSerializer):
     profile_img_url = serializers.SerializerMethodField()
 
@@ -44,15 +46,19 @@ class CategorySerializer(serializers.ModelSerializer):
 class CourseSerializer(serializers.ModelSerializer):
     teacher = TeacherSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
-    total_enrolled = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
         fields = ['id', 'category', 'teacher', 'title', 'description', 'featured_img', 'technologies', 'price', 'average_rating', 'total_ratings', 'total_enrolled']
-    
-    def get_total_enrolled(self, obj):
-        # Count the number of students enrolled in this course
-        return obj.enrolled_students.count()
+        # total_enrolled is maintained by the enrollment views, never by clients
+        read_only_fields = ['total_enrolled']
+
+class CourseSearchSerializer(CourseSerializer):
+    rank = serializers.FloatField(read_only=True)
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + ['rank', 'snippet']
 
 class ChapterSerializer(serializers.ModelSerializer):
     class Meta:
@@ -75,12 +81,16 @@ class StudentSerializer(serializers.ModelSerializer):
             return self.context['request'].build_absolute_uri(obj.profile_img.url)
         return None
 
+    def create(self, validated_data):
+        if validated_data.get('password'):
+            validated_data['password'] = hash_password(validated_data['password'])
+        return super().create(validated_data)
+
     def update(self, instance, validated_data):
         # Handle password update only if it's provided
         if 'password' in validated_data:
             if validated_data['password']:  # Only hash if password is not empty
-                from django.contrib.auth.hashers import make_password
-                validated_data['password'] = make_password(validated_data['password'])
+                validated_data['password'] = hash_password(validated_data['password'])
             else:
                 validated_data.pop('password')  # Remove empty password from update
             
@@ -179,6 +189,14 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ['id', 'recipient_teacher', 'recipient_student', 'notification_type', 
                  'title', 'message', 'related_quiz', 'related_course', 'is_read', 'created_at']
 
+class NotificationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = NotificationJob
+        fields = ['id', 'course', 'notification_type', 'title', 'status', 'total',
+                  'processed', 'progress', 'error', 'created_at', 'updated_at']
+
 class StudyMaterialSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudyMaterial
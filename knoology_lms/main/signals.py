@@ -0,0 +1,144 @@
+"""
+Signal handlers that keep cached and derived data in step with writes.
+
+Connected in MainConfig.ready().
+"""
+from django.contrib.flatpages.models import FlatPage
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import realtime, response_cache
+from .authentication import invalidate_profile
+from .dashboard import invalidate_teacher_stats
+from .models import (
+    FAQ, Course, CourseCategory, CourseRating, Notification, Quiz, QuizQuestion, Student, StudentCourseEnrollment,
+    Teacher, TeacherStudentChat
+)
+from .quiz_store import bump_quiz_version
+
+
+def _course_teacher_id(course_id):
+    return Course.objects.filter(id=course_id).values_list('teacher_id', flat=True).first()
+
+
+@receiver(post_save, sender=StudentCourseEnrollment)
+@receiver(post_delete, sender=StudentCourseEnrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    # Use the already-loaded course when the view had one, otherwise look up its teacher
+    if StudentCourseEnrollment.course.is_cached(instance):
+        teacher_id = instance.course.teacher_id
+    else:
+        teacher_id = _course_teacher_id(instance.course_id)
+    if teacher_id is not None:
+        invalidate_teacher_stats(teacher_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    invalidate_teacher_stats(instance.teacher_id)
+    response_cache.invalidate('courses', 'ratings')
+
+
+@receiver(pre_save, sender=Course)
+def course_moving(sender, instance, update_fields=None, **kwargs):
+    # A course handed to another teacher also changes the stats of the teacher it left
+    if instance.pk is None or (update_fields is not None and 'teacher' not in update_fields):
+        return
+    old_teacher_id = _course_teacher_id(instance.pk)
+    if old_teacher_id is not None and old_teacher_id != instance.teacher_id:
+        invalidate_teacher_stats(old_teacher_id)
+
+
+@receiver(post_save, sender=CourseCategory)
+@receiver(post_delete, sender=CourseCategory)
+def category_changed(sender, instance, **kwargs):
+    # Courses embed their category
+    response_cache.invalidate('categories', 'courses')
+
+
+@receiver(post_save, sender=CourseRating)
+@receiver(post_delete, sender=CourseRating)
+def rating_changed(sender, instance, **kwargs):
+    response_cache.invalidate('ratings')
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def faq_changed(sender, instance, **kwargs):
+    response_cache.invalidate('faqs')
+
+
+@receiver(post_save, sender=FlatPage)
+@receiver(post_delete, sender=FlatPage)
+@receiver(m2m_changed, sender=FlatPage.sites.through)
+def flatpage_changed(sender, **kwargs):
+    response_cache.invalidate('flatpages')
+
+
+def _bump_after_commit(quiz_id):
+    # Bump once the write is visible, so a reader cannot cache the old rows under the new version
+    transaction.on_commit(lambda: bump_quiz_version(quiz_id))
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    _bump_after_commit(instance.id)
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def quiz_question_changed(sender, instance, **kwargs):
+    _bump_after_commit(instance.quiz_id)
+
+
+@receiver(pre_save, sender=QuizQuestion)
+def quiz_question_moving(sender, instance, **kwargs):
+    # A question re-pointed at another quiz also changes the quiz it left
+    if instance.pk is None:
+        return
+    old_quiz_id = QuizQuestion.objects.filter(pk=instance.pk).values_list('quiz_id', flat=True).first()
+    if old_quiz_id is not None and old_quiz_id != instance.quiz_id:
+        _bump_after_commit(old_quiz_id)
+
+
+@receiver(post_save, sender=TeacherStudentChat)
+def chat_message_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    from .serializers import TeacherStudentChatSerializer
+    data = TeacherStudentChatSerializer(instance).data
+    realtime.publish('teacher', [instance.teacher_id], 'chat_message', data)
+    realtime.publish('student', [instance.student_id], 'chat_message', data)
+
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    from .serializers import NotificationSerializer
+    data = NotificationSerializer(instance).data
+    if instance.recipient_teacher_id:
+        realtime.publish('teacher', [instance.recipient_teacher_id], 'notification', data)
+    if instance.recipient_student_id:
+        realtime.publish('student', [instance.recipient_student_id], 'notification', data)
+
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def teacher_changed(sender, instance, created=False, **kwargs):
+    invalidate_profile('teacher', instance.id)
+    if not created:
+        # Courses embed their teacher
+        response_cache.invalidate('courses')
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, instance, created=False, **kwargs):
+    invalidate_profile('student', instance.id)
+    if not created:
+        # Testimonials show the student's name
+        response_cache.invalidate('ratings')
@@ -0,0 +1,61 @@
+"""
+Shared test setup: isolated caches and media, and accounts built with
+main/factories.py.
+"""
+import os
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from main import factories
+
+
+class IsolatedStorageMixin:
+    """
+    Runs a test class against caches and a MEDIA_ROOT of its own.
+
+    ``default`` is a fresh LocMemCache and ``shared`` a FileBasedCache in a
+    temporary directory, the backends the project runs with, so a test run
+    never reads or wipes the caches or media of a development server. Both
+    caches are cleared before each test and the directory is removed after
+    the class.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Before super(), so setUpTestData already sees the overrides
+        temp_dir = tempfile.mkdtemp(prefix='lms-tests-')
+        cls.addClassCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        isolated = override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': temp_dir},
+                'shared': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': os.path.join(temp_dir, 'cache'),
+                },
+            },
+            MEDIA_ROOT=os.path.join(temp_dir, 'media'),
+        )
+        isolated.enable()
+        cls.addClassCleanup(isolated.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        caches['shared'].clear()
+
+
+def create_teacher(**fields):
+    teacher = factories.teacher_factory(**fields)
+    teacher.save()
+    return teacher
+
+
+def create_student(password='secret', **fields):
+    """A verified student; ``password`` is stored as given, hashed or not."""
+    student = factories.student_factory(password, **fields)
+    student.save()
+    return student
@@ -0,0 +1,114 @@
+import io
+import tempfile
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.accounts import import_accounts, read_csv
+from main.models import OutboundEmail, Student, Teacher
+
+STUDENT_HEADER = 'fullname,username,email,password,interested_categories\n'
+TEACHER_HEADER = 'full_name,email,mobile_number,password,qualification,skills,bio\n'
+
+
+def student_csv(count, start=0):
+    return STUDENT_HEADER + ''.join(
+        f'Student {i},student{i},student{i}@example.com,pass{i},python\n' for i in range(start, start + count)
+    )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccountImportTests(TestCase):
+    def test_model_save_has_no_side_effects(self):
+        Student.objects.create(
+            fullname='Student', username='student', email='student@example.com',
+            password='x', interested_categories='python'
+        )
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_students_are_created_verified_with_hashed_passwords(self):
+        result = import_accounts('student', read_csv(student_csv(3)), workers=1)
+
+        self.assertEqual((result.created, result.otp_queued, result.errors), (3, 0, []))
+        student = Student.objects.get(username='student1')
+        self.assertTrue(student.verify_status)
+        self.assertIsNone(student.otp_digit)
+        self.assertTrue(check_password('pass1', student.password))
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_passwords_are_hashed_in_worker_processes(self):
+        result = import_accounts('student', read_csv(student_csv(100)), workers=2)
+
+        self.assertEqual(result.created, 100)
+        self.assertTrue(check_password('pass99', Student.objects.get(username='student99').password))
+
+    def test_already_hashed_passwords_are_kept(self):
+        hashed = make_password('secret')
+        rows = read_csv(STUDENT_HEADER + f'Student,student,student@example.com,{hashed},python\n')
+        import_accounts('student', rows, workers=1)
+        self.assertEqual(Student.objects.get().password, hashed)
+
+    def test_invalid_and_duplicate_rows_are_reported(self):
+        import_accounts('student', read_csv(student_csv(1)), workers=1)
+        csv = STUDENT_HEADER + (
+            'Taken,student0,new@example.com,x,python\n'
+            'No Email,nomail,,x,python\n'
+            'Bad Email,bad,not-an-email,x,python\n'
+            'Good,good,good@example.com,x,python\n'
+            'Again,other,GOOD@example.com,x,python\n'
+        )
+
+        result = import_accounts('student', read_csv(csv), workers=1)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [
+            (3, 'missing email'),
+            (4, 'invalid email not-an-email'),
+            (6, 'email good@example.com appears earlier in the file'),
+            (2, 'username student0 is already registered'),
+        ])
+
+    def test_send_otp_creates_unverified_accounts_and_queues_mail(self):
+        csv = TEACHER_HEADER + 'Teacher,teacher@example.com,100,secret,MSc,Django,\n'
+
+        with self.captureOnCommitCallbacks():
+            result = import_accounts('teacher', read_csv(csv), send_otp=True)
+
+        self.assertEqual((result.created, result.otp_queued), (1, 1))
+        teacher = Teacher.objects.get()
+        self.assertFalse(teacher.verify_status)
+        # Teacher passwords are stored as entered, see teacher_login
+        self.assertEqual(teacher.password, 'secret')
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.recipients, ['teacher@example.com'])
+        self.assertIn(teacher.otp_digit, email.html_body)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(student_csv(5))
+            file.flush()
+            out, err = io.StringIO(), io.StringIO()
+            call_command('import_accounts', 'student', file.name, '--workers', '1', stdout=out, stderr=err)
+
+        self.assertEqual(Student.objects.count(), 5)
+        self.assertIn('Created 5 student account(s)', out.getvalue())
+
+    def test_admin_upload(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        url = reverse('admin:main_student_import_csv')
+        self.assertEqual(self.client.get(reverse('admin:main_student_changelist')).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.post(url, {
+            'csv_file': SimpleUploadedFile('students.csv', student_csv(2).encode()),
+            'send_otp': 'on',
+        })
+
+        self.assertRedirects(response, reverse('admin:main_student_changelist'))
+        self.assertEqual(Student.objects.filter(verify_status=False).count(), 2)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
@@ -0,0 +1,142 @@
+from unittest import mock
+
+from django.core import signing
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main import realtime
+from main.authentication import TOKEN_SALT, clear_profile_cache, issue_token
+from main.models import Student, Teacher
+
+
+@override_settings(
+    PASSWORD_HASHERS=['main.tests.test_login.FastPBKDF2PasswordHasher'],
+    AUTH_TOKEN_REQUIRED=False,
+)
+class AccessTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_profile_cache()
+        self.student = Student.objects.create(
+            fullname='Student', username='student', email='student@example.com',
+            password='secret', interested_categories='python', verify_status=True
+        )
+        self.other = Student.objects.create(
+            fullname='Other', username='other', email='other@example.com',
+            password='secret', interested_categories='python', verify_status=True
+        )
+        self.teacher = Teacher.objects.create(
+            full_name='Teacher', email='teacher@example.com', password='secret', qualification='MSc',
+            mobile_number='9999999999', skills='python', verify_status=True
+        )
+
+    def bearer(self, token):
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_login_returns_token_for_the_account(self):
+        response = self.client.post(reverse('student_login'), {'username': 'student', 'password': 'secret'})
+        token = response.json()['access_token']
+
+        me = self.client.get(reverse('current-user'), **self.bearer(token)).json()
+        self.assertEqual((me['user_type'], me['id'], me['email']), ('student', self.student.id, 'student@example.com'))
+
+        response = self.client.post(
+            reverse('teacher_login'), {'email': 'teacher@example.com', 'password': 'secret'},
+            content_type='application/json'
+        )
+        me = self.client.get(reverse('current-user'), **self.bearer(response.json()['access_token'])).json()
+        self.assertEqual((me['user_type'], me['name']), ('teacher', 'Teacher'))
+
+    def test_forged_or_expired_token_is_rejected(self):
+        forged = signing.dumps({'type': 'student', 'id': self.student.id}, salt=TOKEN_SALT, key='not-the-key')
+        response = self.client.get(reverse('current-user'), **self.bearer(forged))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+        token = issue_token(self.student)
+        with override_settings(AUTH_TOKEN_TTL=-1):
+            response = self.client.get(reverse('current-user'), **self.bearer(token))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['message'], 'Token has expired')
+
+    def test_url_id_must_belong_to_the_token(self):
+        token = issue_token(self.student)
+        own = self.client.get(reverse('enrolled-courses', args=[self.student.id]), **self.bearer(token))
+        self.assertEqual(own.status_code, 200)
+        other = self.client.get(reverse('enrolled-courses', args=[self.other.id]), **self.bearer(token))
+        self.assertEqual(other.status_code, 403)
+        detail = self.client.get(reverse('student-detail', args=[self.other.id]), **self.bearer(token))
+        self.assertEqual(detail.status_code, 403)
+
+    def test_url_naming_another_account_type_is_refused(self):
+        student = self.bearer(issue_token(self.student))
+        for url in (
+            reverse('teacher_dashboard_stats', args=[self.teacher.id]),
+            reverse('events', args=['teacher', self.teacher.id]),
+        ):
+            self.assertEqual(self.client.get(url, **student).status_code, 403)
+        # Public teacher pages stay readable
+        self.assertEqual(self.client.get(reverse('teacher-courses', args=[self.teacher.id]), **student).status_code, 200)
+        self.assertEqual(
+            self.client.patch(reverse('teacher-detail', args=[self.teacher.id]), {}, content_type='application/json',
+                              **student).status_code,
+            403
+        )
+
+        teacher = self.bearer(issue_token(self.teacher))
+        self.assertEqual(self.client.get(reverse('student-courses', args=[self.student.id]), **teacher).status_code, 200)
+        self.assertEqual(self.client.get(reverse('enrolled-courses', args=[self.student.id]), **teacher).status_code, 403)
+
+    def test_stale_token_does_not_block_public_routes(self):
+        token = issue_token(self.student)
+        with override_settings(AUTH_TOKEN_TTL=-1):
+            headers = self.bearer(token)
+            self.assertEqual(self.client.get(reverse('category-list'), **headers).status_code, 200)
+            login = self.client.post(
+                reverse('student_login'), {'username': 'student', 'password': 'secret'}, **headers
+            )
+            self.assertEqual(login.status_code, 200)
+            # Routes acting for an account still need a valid token when tokens are required
+            url = reverse('enrolled-courses', args=[self.student.id])
+            with override_settings(AUTH_TOKEN_REQUIRED=True):
+                response = self.client.get(url, **headers)
+            self.assertEqual((response.status_code, response.json()['message']), (401, 'Token has expired'))
+
+    def test_event_stream_needs_the_users_own_token(self):
+        url = reverse('events', args=['student', self.student.id])
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, {'access_token': issue_token(self.other)}).status_code, 403)
+        # The stream itself is never read, so it needs no closing. Without the
+        # listener thread no connection outlives the test database
+        with mock.patch.object(realtime, 'ensure_listener'):
+            response = self.client.get(url, {'access_token': issue_token(self.student)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_parameter_token_on_get(self):
+        url = reverse('enrolled-courses', args=[self.other.id])
+        response = self.client.get(url, {'access_token': issue_token(self.student)})
+        self.assertEqual(response.status_code, 403)
+
+    def test_token_required_setting(self):
+        url = reverse('enrolled-courses', args=[self.student.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with override_settings(AUTH_TOKEN_REQUIRED=True):
+            self.assertEqual(self.client.get(url).status_code, 401)
+            # Public routes stay open
+            self.assertEqual(self.client.get(reverse('category-list')).status_code, 200)
+
+    def test_profile_is_cached_until_the_account_changes(self):
+        headers = self.bearer(issue_token(self.student))
+        self.client.get(reverse('current-user'), **headers)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('current-user'), **headers)
+
+        self.student.fullname = 'Renamed'
+        self.student.save()
+        self.assertEqual(self.client.get(reverse('current-user'), **headers).json()['name'], 'Renamed')
+
+    def test_deleted_account_is_unauthenticated(self):
+        headers = self.bearer(issue_token(self.other))
+        self.other.delete()
+        self.assertEqual(self.client.get(reverse('current-user'), **headers).status_code, 401)
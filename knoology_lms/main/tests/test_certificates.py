@@ -0,0 +1,94 @@
+import json
+import os
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from main import certificates
+from main.models import Chapter, Course, CourseCategory, StudentCourseEnrollment
+from main.progress import chapter_added
+from main.tests.base import IsolatedStorageMixin, create_student, create_teacher
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class CertificateTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        teacher = create_teacher()
+        category = CourseCategory.objects.create(title='Python', description='Python courses')
+        self.course = Course.objects.create(
+            category=category, teacher=teacher, title='Django', description='Web', technologies='django'
+        )
+        self.chapters = []
+        for title in ('One', 'Two'):
+            self.chapters.append(Chapter.objects.create(course=self.course, title=title, description=title))
+            chapter_added(self.course.id)
+        self.student = create_student(fullname='Jane Doe')
+        self.enrollment = StudentCourseEnrollment.objects.create(student=self.student, course=self.course)
+        self.url = reverse('generate-certificate', args=[self.student.id, self.course.id])
+
+    def complete(self, chapter):
+        return self.client.post(reverse('mark-chapter-complete'), json.dumps({
+            'student_id': self.student.id, 'course_id': self.course.id, 'chapter_id': chapter.id
+        }), content_type='application/json')
+
+    def test_completing_the_course_schedules_one_render(self):
+        with mock.patch.object(certificates, 'submit_render') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.complete(self.chapters[0])
+            submit.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.complete(self.chapters[1])
+                self.complete(self.chapters[1])
+        submit.assert_called_once_with(self.enrollment.id, mock.ANY)
+
+        # The name the worker will render under is the one downloads look up
+        self.enrollment.refresh_from_db()
+        certificates.ensure_certificate(self.enrollment, 'http://testserver/verify/')
+        with mock.patch.object(certificates, 'render_certificate', side_effect=AssertionError):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_syncing_the_last_chapters_schedules_a_render(self):
+        items = [{'course_id': self.course.id, 'chapter_id': chapter.id} for chapter in self.chapters]
+        with mock.patch.object(certificates, 'submit_render') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('sync-chapter-progress'), json.dumps({
+                    'student_id': self.student.id, 'items': items
+                }), content_type='application/json')
+        submit.assert_called_once_with(
+            self.enrollment.id, f'http://testserver/verify-certificate/{self.student.id}/{self.course.id}/'
+        )
+
+    def test_failed_write_leaves_no_file_behind(self):
+        self.enrollment.completed_at = timezone.now()
+        self.enrollment.save()
+        name = certificates.certificate_name(self.enrollment)
+
+        with mock.patch.object(certificates.os, 'replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                certificates.ensure_certificate(self.enrollment, 'http://testserver/verify/')
+        self.assertFalse(default_storage.exists(name))
+        leftovers = os.listdir(os.path.dirname(default_storage.path(name)))
+        self.assertEqual([entry for entry in leftovers if entry.endswith('.part')], [])
+
+    def test_download_is_rendered_once_then_served_from_storage(self):
+        self.enrollment.completed_at = timezone.now()
+        self.enrollment.save()
+
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Disposition'], 'attachment; filename="Certificate_Jane_Doe.pdf"')
+        content = first.content
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertTrue(default_storage.exists(certificates.certificate_name(self.enrollment)))
+
+        with mock.patch.object(certificates, 'render_certificate', side_effect=AssertionError):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, content)
+
+    def test_unfinished_course_has_no_certificate(self):
+        self.complete(self.chapters[0])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,92 @@
+import threading
+from unittest import mock, skipUnless
+
+from django.db import OperationalError, connection, connections
+from django.test import TransactionTestCase, override_settings
+
+from main import chat
+from main.models import Conversation, Notification, Student, Teacher, TeacherStudentChat
+
+
+class FakeDeadlock(Exception):
+    pgcode = '40P01'
+
+
+# Accounts created here queue OTP mail; keep the outbox thread off the test database
+@override_settings(OUTBOX_IN_PROCESS=False)
+class SendChatMessageConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    MESSAGES_PER_THREAD = 15
+
+    def setUp(self):
+        self.teacher = Teacher.objects.create(
+            full_name='Teacher', email='teacher@example.com', password='x',
+            mobile_number='1', qualification='MSc', skills='Django'
+        )
+        self.student = Student.objects.create(
+            fullname='Student', email='student@example.com', password='x',
+            username='student', interested_categories='python'
+        )
+
+    def _hammer(self, sender, errors):
+        try:
+            for i in range(self.MESSAGES_PER_THREAD):
+                chat.send_chat_message(self.teacher, self.student, f'{sender} {i}', sender)
+        except Exception as e:  # pragma: no cover - reported by the assertion below
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    # SQLite serializes writers with a table lock instead of row locks
+    @skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers')
+    def test_many_threads_on_one_conversation(self):
+        errors = []
+        threads = [
+            threading.Thread(target=self._hammer, args=('teacher' if n % 2 else 'student', errors))
+            for n in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        per_side = self.THREADS // 2 * self.MESSAGES_PER_THREAD
+        self.assertEqual(TeacherStudentChat.objects.count(), per_side * 2)
+
+        # No lost counter updates and exactly one notification per message
+        conversation = Conversation.objects.get(teacher=self.teacher, student=self.student)
+        self.assertEqual(conversation.teacher_unread, per_side)
+        self.assertEqual(conversation.student_unread, per_side)
+        self.assertEqual(Notification.objects.filter(related_conversation=conversation).count(), per_side * 2)
+
+        # The preview is the newest message even when commits land out of order
+        newest = TeacherStudentChat.objects.order_by('-timestamp').first()
+        self.assertEqual(conversation.last_message_at, newest.timestamp)
+
+    def test_deadlock_is_retried_without_duplicates(self):
+        original = chat.record_message
+        calls = []
+
+        def deadlock_once(message):
+            calls.append(message)
+            if len(calls) == 1:
+                raise OperationalError('deadlock detected') from FakeDeadlock()
+            return original(message)
+
+        with mock.patch.object(chat, 'record_message', side_effect=deadlock_once):
+            chat.send_chat_message(self.teacher, self.student, 'hello', 'student')
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(TeacherStudentChat.objects.count(), 1)
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(Conversation.objects.get().teacher_unread, 1)
+
+    def test_other_errors_are_not_retried(self):
+        with mock.patch.object(chat, 'record_message', side_effect=OperationalError('disk full')) as record:
+            with self.assertRaises(OperationalError):
+                chat.send_chat_message(self.teacher, self.student, 'hello', 'student')
+
+        self.assertEqual(record.call_count, 1)
+        self.assertEqual(TeacherStudentChat.objects.count(), 0)
+        self.assertFalse(connection.in_atomic_block)
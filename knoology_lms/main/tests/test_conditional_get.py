@@ -0,0 +1,90 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.models import Chapter, Course, CourseCategory, Notification, Quiz, QuizQuestion, Student, Teacher
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.teacher = Teacher.objects.create(
+            full_name='Teacher', email='teacher@example.com', password='secret', qualification='MSc',
+            mobile_number='9999999999', skills='python', verify_status=True
+        )
+        category = CourseCategory.objects.create(title='Python', description='Python courses')
+        self.course = Course.objects.create(
+            category=category, teacher=self.teacher, title='Django', description='Web', technologies='django'
+        )
+        self.chapter = Chapter.objects.create(course=self.course, title='Intro', description='Start here')
+        self.student = Student.objects.create(
+            fullname='Student', username='student', email='student@example.com',
+            password='secret', interested_categories='python', verify_status=True
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_resource_returns_304_after_one_query(self):
+        url = reverse('course_chapter_list', args=[self.course.id])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):
+            second = self.revalidate(url, first)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_edit_add_and_delete_change_the_validator(self):
+        url = reverse('course_chapter_list', args=[self.course.id])
+        first = self.client.get(url)
+        self.chapter.title = 'Welcome'
+        self.chapter.save()
+        second = self.revalidate(url, first)
+        self.assertContains(second, 'Welcome')
+
+        extra = Chapter.objects.create(course=self.course, title='Setup', description='Install')
+        third = self.revalidate(url, second)
+        self.assertEqual(third.status_code, 200)
+
+        extra.delete()
+        self.assertEqual(self.revalidate(url, third).status_code, 200)
+
+    def test_course_detail_tracks_embedded_teacher(self):
+        url = reverse('course-detail', args=[self.course.id])
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+        self.teacher.full_name = 'Renamed'
+        self.teacher.save()
+        self.assertContains(self.revalidate(url, first), 'Renamed')
+
+    def test_missing_object_runs_the_view(self):
+        response = self.client.get(reverse('course-detail', args=[0]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_quiz_questions(self):
+        quiz = Quiz.objects.create(teacher=self.teacher, title='Basics', description='Quiz', total_marks=10)
+        question = QuizQuestion.objects.create(
+            quiz=quiz, question_text='2 + 2?', ans1='3', ans2='4', ans3='5', ans4='6', right_ans='4'
+        )
+        url = reverse('quiz-questions', args=[quiz.id])
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        question.delete()
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_notifications_marked_read(self):
+        notification = Notification.objects.create(
+            recipient_student=self.student, notification_type='general', title='Hi', message='Welcome'
+        )
+        url = reverse('notifications', args=['student', self.student.id])
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        self.client.post(reverse('mark-notification-read', args=[notification.id]))
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_empty_list_gets_a_validator(self):
+        url = reverse('study-materials-by-course', args=[self.course.id])
+        first = self.client.get(url)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
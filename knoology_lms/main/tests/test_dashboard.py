@@ -0,0 +1,33 @@
+from django.core.cache import caches
+from django.test import TestCase
+
+from main import dashboard
+from main.models import Course, CourseCategory, StudentCourseEnrollment
+from main.tests.base import IsolatedStorageMixin, create_student, create_teacher
+
+
+class TeacherStatsTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = create_teacher()
+        self.other_teacher = create_teacher()
+        category = CourseCategory.objects.create(title='Python', description='Python courses')
+        self.course = Course.objects.create(
+            category=category, teacher=self.teacher, title='Django', description='Web', technologies='django'
+        )
+        StudentCourseEnrollment.objects.create(student=create_student(), course=self.course)
+
+    def test_stats_are_kept_in_the_shared_cache(self):
+        stats = dashboard.get_teacher_stats(self.teacher.id)
+        self.assertEqual((stats['total_courses'], stats['total_students']), (1, 1))
+        self.assertEqual(caches['shared'].get(dashboard.teacher_stats_cache_key(self.teacher.id)), stats)
+
+    def test_moving_a_course_refreshes_both_teachers(self):
+        self.assertEqual(dashboard.get_teacher_stats(self.teacher.id)['total_courses'], 1)
+        self.assertEqual(dashboard.get_teacher_stats(self.other_teacher.id)['total_courses'], 0)
+
+        self.course.teacher = self.other_teacher
+        self.course.save()
+
+        self.assertEqual(dashboard.get_teacher_stats(self.teacher.id)['total_courses'], 0)
+        self.assertEqual(dashboard.get_teacher_stats(self.other_teacher.id)['total_courses'], 1)
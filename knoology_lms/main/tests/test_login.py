@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, identify_hasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main import passwords
+from main.models import Student
+from main.passwords import PasswordHashingBusy
+from main.tests.base import IsolatedStorageMixin, create_student
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 100
+
+
+@override_settings(
+    PASSWORD_HASHERS=[
+        'main.tests.test_login.FastPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ],
+    LOGIN_RATE_LIMITS={'account': (3, 300), 'ip': (6, 300)},
+)
+class StudentLoginTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = create_student(make_password('secret'), username='student')
+
+    def login(self, password='secret', username='student', **extra):
+        return self.client.post(reverse('student_login'), {'username': username, 'password': password}, **extra)
+
+    def test_current_hash_is_kept(self):
+        stored = self.student.password
+        self.assertEqual(self.login().status_code, 200)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.password, stored)
+
+    def test_plaintext_password_is_rehashed_on_login(self):
+        Student.objects.filter(id=self.student.id).update(password='secret')
+
+        self.assertEqual(self.login().status_code, 200)
+        self.student.refresh_from_db()
+        self.assertEqual(identify_hasher(self.student.password).algorithm, 'pbkdf2_sha256')
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_weak_hash_is_rehashed_on_login(self):
+        Student.objects.filter(id=self.student.id).update(password=make_password('secret', hasher='md5'))
+
+        self.assertEqual(self.login().status_code, 200)
+        self.student.refresh_from_db()
+        self.assertEqual(identify_hasher(self.student.password).algorithm, 'pbkdf2_sha256')
+
+    def test_outdated_work_factor_is_rehashed_on_login(self):
+        Student.objects.filter(id=self.student.id).update(
+            password=PBKDF2PasswordHasher().encode('secret', 'somesalt', iterations=10)
+        )
+
+        self.assertEqual(self.login().status_code, 200)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.password.startswith('pbkdf2_sha256$100$'))
+
+    def test_wrong_password_is_rejected_and_not_rehashed(self):
+        Student.objects.filter(id=self.student.id).update(password='secret')
+
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.password, 'secret')
+
+    def test_account_is_locked_after_repeated_failures(self):
+        for _ in range(3):
+            self.assertEqual(self.login('wrong').status_code, 401)
+
+        with mock.patch('main.views.check_student_password') as check:
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '300')
+        check.assert_not_called()
+        # Other accounts from the same address are not affected
+        self.assertEqual(self.login(username='someone-else').status_code, 401)
+
+    def test_successful_login_resets_the_account_counter(self):
+        for _ in range(2):
+            self.login('wrong')
+        self.assertEqual(self.login().status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.login('wrong').status_code, 401)
+
+    def test_address_is_limited_across_accounts(self):
+        for i in range(6):
+            self.login(username=f'user{i}')
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_address_window_closes_while_logins_keep_arriving(self):
+        # A shared address (campus NAT) logging someone in every two minutes;
+        # the file cache's own expiry follows the same clock
+        start = time.time()
+        with mock.patch('time.time') as clock:
+            for minute in range(0, 60, 2):
+                clock.return_value = start + minute * 60
+                self.assertEqual(self.login(REMOTE_ADDR='10.0.0.3').status_code, 200)
+
+    def test_busy_hashing_pool_answers_503(self):
+        with mock.patch('main.passwords.run_hashing', side_effect=PasswordHashingBusy):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class HashingPoolTests(TestCase):
+    def test_callers_beyond_the_queue_are_turned_away(self):
+        slots = threading.BoundedSemaphore(1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with mock.patch.object(passwords, '_pool', return_value=(executor, slots)):
+                self.assertEqual(passwords.run_hashing(len, 'abc'), 3)
+                slots.acquire()
+                with self.assertRaises(PasswordHashingBusy):
+                    passwords.run_hashing(len, 'abc')
@@ -0,0 +1,118 @@
+import datetime
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from main import outbox
+from main.models import ContactUs, OutboundEmail, Student, Teacher
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        type(self).opened += 1
+        return super().open()
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('relay down')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_BATCH_SIZE=2,
+    OUTBOX_MAX_ATTEMPTS=3,
+    OUTBOX_RETRY_DELAY=30,
+)
+class OutboxTests(TestCase):
+    def test_signup_queues_otp_email_until_the_worker_runs(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('teacher-list'), {
+                'full_name': 'Teacher', 'email': 'teacher@example.com', 'mobile_number': '100',
+                'password': 'secret', 'qualification': 'MSc', 'skills': 'Django'
+            })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(callbacks, [outbox.wake_worker])
+        self.assertEqual(mail.outbox, [])
+        teacher = Teacher.objects.get()
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.recipients, [teacher.email])
+        self.assertIn(teacher.otp_digit, email.html_body)
+
+        self.assertEqual(outbox.deliver_due(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+
+    def test_auto_verified_student_signup_sends_no_otp(self):
+        response = self.client.post(reverse('student_register'), {
+            'fullname': 'Student', 'username': 'student', 'email': 'student@example.com',
+            'password': 'secret', 'interested_categories': 'python'
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Student.objects.get().verify_status)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_rolled_back_transaction_leaves_no_email(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                outbox.queue_email('Hello', 'body', ['user@example.com'])
+                raise RuntimeError
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    @override_settings(EMAIL_BACKEND='main.tests.test_outbox.CountingBackend')
+    def test_batches_reuse_one_connection(self):
+        for i in range(5):
+            outbox.queue_email(f'Mail {i}', 'body', [f'user{i}@example.com'])
+        CountingBackend.opened = 0
+
+        self.assertEqual(outbox.deliver_due(), (5, 0))
+        # Batches of two: three connections for five mails
+        self.assertEqual(CountingBackend.opened, 3)
+        self.assertEqual([m.subject for m in mail.outbox], [f'Mail {i}' for i in range(5)])
+
+    @override_settings(EMAIL_BACKEND='main.tests.test_outbox.FailingBackend')
+    def test_failed_send_is_retried_with_backoff_then_given_up(self):
+        email = outbox.queue_email('Hello', 'body', ['user@example.com'])
+
+        self.assertEqual(outbox.deliver_due(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'relay down'))
+        self.assertGreater(email.available_at, timezone.now() + datetime.timedelta(seconds=25))
+        # Not due yet
+        self.assertEqual(outbox.deliver_due(), (0, 0))
+
+        with self.assertLogs('main.outbox', 'ERROR'):
+            for _ in range(2):
+                OutboundEmail.objects.filter(id=email.id).update(available_at=timezone.now())
+                outbox.deliver_due()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+
+    def test_stale_claim_is_taken_over(self):
+        email = outbox.queue_email('Hello', 'body', ['user@example.com'])
+        OutboundEmail.objects.filter(id=email.id).update(
+            status='sending', claimed_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        self.assertEqual(outbox.deliver_due(), (1, 0))
+
+    def test_contact_form_queues_admin_and_confirmation_mail(self):
+        response = self.client.post(reverse('contact-form-submit'), {
+            'name': 'Visitor', 'email': 'visitor@example.com', 'subject': 'Hi', 'message': 'Question'
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ContactUs.objects.count(), 1)
+        recipients = sorted(r for email in OutboundEmail.objects.all() for r in email.recipients)
+        self.assertIn('visitor@example.com', recipients)
+        self.assertEqual(len(recipients), 2)
+        self.assertEqual(mail.outbox, [])
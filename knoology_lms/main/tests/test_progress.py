@@ -0,0 +1,230 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.authentication import issue_token
+from main.progress import complete_chapter, count_completed
+from main.models import Chapter, Course, CourseCategory, StudentChapterProgress, StudentCourseEnrollment, Student, Teacher
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class ProgressCounterTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(
+            full_name='Teacher', email='teacher@example.com', password='secret', qualification='MSc',
+            mobile_number='9999999999', skills='python', verify_status=True
+        )
+        category = CourseCategory.objects.create(title='Python', description='Python courses')
+        self.course = Course.objects.create(
+            category=category, teacher=teacher, title='Django', description='Web', technologies='django'
+        )
+        self.other_course = Course.objects.create(
+            category=category, teacher=teacher, title='Flask', description='Web', technologies='flask'
+        )
+        for title in ('One', 'Two', 'Three'):
+            self.add_chapter(self.course, title)
+        self.chapters = list(self.course.chapters.order_by('id'))
+        self.student = Student.objects.create(
+            fullname='Student', username='student', email='student@example.com',
+            password='secret', interested_categories='python', verify_status=True
+        )
+        self.enroll()
+
+    def add_chapter(self, course, title):
+        response = self.client.post(
+            reverse('chapter-list', args=[course.id]), {'title': title, 'description': title}
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def enroll(self):
+        response = self.client.post(
+            reverse('course-enroll'), {'student_id': self.student.id, 'course_id': self.course.id},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def complete(self, chapter, course=None):
+        return self.client.post(reverse('mark-chapter-complete'), json.dumps({
+            'student_id': self.student.id, 'course_id': (course or self.course).id, 'chapter_id': chapter.id
+        }), content_type='application/json')
+
+    def enrollment(self):
+        return StudentCourseEnrollment.objects.get(student=self.student, course=self.course)
+
+    def test_chapter_views_keep_total_in_step(self):
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.total_chapters, 3)
+        self.client.delete(reverse('chapter-detail', args=[self.chapters[0].id]))
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.total_chapters, 2)
+
+    def test_completing_every_chapter_completes_the_enrollment(self):
+        self.assertEqual(self.complete(self.chapters[0]).json()['progress'], 33)
+        self.assertEqual(self.complete(self.chapters[0]).json()['completed_chapters'], 1)
+        self.complete(self.chapters[1])
+        self.assertIsNone(self.enrollment().completed_at)
+
+        data = self.complete(self.chapters[2]).json()
+        self.assertEqual((data['completed_chapters'], data['total_chapters'], data['progress']), (3, 3, 100))
+        self.assertIsNotNone(self.enrollment().completed_at)
+
+    def test_last_of_two_concurrent_completions_completes_the_course(self):
+        self.complete(self.chapters[0])
+        real_get_or_create = StudentChapterProgress.objects.get_or_create
+
+        def concurrent_completion_first(**kwargs):
+            # Another request completes the second chapter after this one read the enrollment
+            StudentChapterProgress.objects.create(student=self.student, course=self.course, chapter=self.chapters[1])
+            count_completed(StudentCourseEnrollment.objects.filter(student=self.student), 1, 3)
+            return real_get_or_create(**kwargs)
+
+        with mock.patch.object(StudentChapterProgress.objects, 'get_or_create', concurrent_completion_first):
+            enrollment, _, completed = complete_chapter(self.student.id, self.course.id, self.chapters[2].id)
+        self.assertTrue(completed)
+        self.assertEqual(enrollment.completed_chapters, 3)
+        self.assertEqual(enrollment.completed_at, self.enrollment().completed_at)
+
+    def test_rejects_chapter_outside_an_enrolled_course(self):
+        self.add_chapter(self.other_course, 'Elsewhere')
+        elsewhere = self.other_course.chapters.get()
+        self.assertEqual(self.complete(elsewhere).status_code, 400)
+        self.assertEqual(self.complete(elsewhere, course=self.other_course).status_code, 400)
+        self.assertEqual(self.enrollment().completed_chapters, 0)
+
+    def test_deleting_a_completed_chapter_decrements_progress(self):
+        self.complete(self.chapters[0])
+        self.complete(self.chapters[1])
+        self.client.delete(reverse('chapter-detail', args=[self.chapters[0].id]))
+        self.assertEqual(self.enrollment().completed_chapters, 1)
+
+    def test_moving_a_chapter_moves_its_progress(self):
+        self.complete(self.chapters[0])
+        StudentCourseEnrollment.objects.create(student=self.student, course=self.other_course)
+        self.client.patch(
+            reverse('chapter-detail', args=[self.chapters[0].id]), {'course': self.other_course.id},
+            content_type='application/json'
+        )
+        self.assertEqual(self.enrollment().completed_chapters, 0)
+        moved = StudentCourseEnrollment.objects.get(student=self.student, course=self.other_course)
+        self.assertEqual(moved.completed_chapters, 1)
+        self.assertEqual(
+            list(Course.objects.order_by('id').values_list('total_chapters', flat=True)), [2, 1]
+        )
+
+    def test_reenrolling_keeps_earlier_progress(self):
+        self.complete(self.chapters[0])
+        self.client.post(
+            reverse('course-unenroll'), {'student_id': self.student.id, 'course_id': self.course.id},
+            content_type='application/json'
+        )
+        self.enroll()
+        self.assertEqual(self.enrollment().completed_chapters, 1)
+
+    def test_enrolled_courses_report_progress(self):
+        self.complete(self.chapters[0])
+        course = self.client.get(reverse('enrolled-courses', args=[self.student.id])).json()['data'][0]
+        self.assertEqual((course['completed_chapters'], course['total_chapters'], course['progress']), (1, 3, 33))
+
+    def test_reconcile_repairs_drifted_counters(self):
+        Chapter.objects.create(course=self.course, title='Admin', description='Added in the admin')
+        StudentChapterProgress.objects.create(student=self.student, course=self.course, chapter=self.chapters[0])
+
+        out = StringIO()
+        call_command('reconcile_enrollment_counts', stdout=out)
+        self.assertIn('Reconciled 1 course(s) and 1 enrollment(s)', out.getvalue())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.total_chapters, 4)
+        self.assertEqual(self.enrollment().completed_chapters, 1)
+
+    def sync(self, items):
+        return self.client.post(reverse('sync-chapter-progress'), json.dumps({
+            'student_id': self.student.id, 'items': items
+        }), content_type='application/json')
+
+    def test_sync_merges_a_batch_and_completes_the_course(self):
+        self.complete(self.chapters[0])
+        items = [
+            {'course_id': self.course.id, 'chapter_id': chapter.id, 'completed_at': '2026-01-02T10:00:00Z'}
+            for chapter in self.chapters
+        ]
+        with self.assertNumQueries(8):
+            data = self.sync(items).json()
+        self.assertEqual(data['courses'], [{'course_id': self.course.id, 'completed_chapters': [c.id for c in self.chapters]}])
+        self.assertEqual(data['rejected'], [])
+
+        enrollment = self.enrollment()
+        self.assertEqual(enrollment.completed_chapters, 3)
+        self.assertIsNotNone(enrollment.completed_at)
+        synced = StudentChapterProgress.objects.get(student=self.student, chapter=self.chapters[1])
+        self.assertEqual(synced.completed_at.isoformat(), '2026-01-02T10:00:00+00:00')
+
+        self.sync(items)
+        self.assertEqual(self.enrollment().completed_chapters, 3)
+
+    def test_sync_rejects_items_outside_enrolled_courses(self):
+        self.add_chapter(self.other_course, 'Elsewhere')
+        elsewhere = self.other_course.chapters.get()
+        data = self.sync([
+            {'course_id': self.other_course.id, 'chapter_id': elsewhere.id},
+            {'course_id': self.course.id, 'chapter_id': elsewhere.id},
+            {'course_id': self.course.id, 'chapter_id': self.chapters[0].id, 'completed_at': 'yesterday'},
+            {'course_id': self.course.id, 'chapter_id': self.chapters[1].id},
+        ]).json()
+        self.assertEqual(len(data['rejected']), 3)
+        self.assertEqual(data['courses'], [{'course_id': self.course.id, 'completed_chapters': [self.chapters[1].id]}])
+        self.assertEqual(self.enrollment().completed_chapters, 1)
+        self.assertEqual(self.sync({'course_id': self.course.id}).status_code, 400)
+
+    def test_sync_recounts_rows_written_concurrently(self):
+        items = [{'course_id': self.course.id, 'chapter_id': chapter.id} for chapter in self.chapters[:2]]
+        real_bulk_create = StudentChapterProgress.objects.bulk_create
+
+        def concurrent_insert_first(objs, **kwargs):
+            # mark_chapter_complete stores the first chapter between the read and the INSERT
+            StudentChapterProgress.objects.create(student=self.student, course=self.course, chapter=self.chapters[0])
+            StudentCourseEnrollment.objects.filter(student=self.student).update(completed_chapters=F('completed_chapters') + 1)
+            return real_bulk_create(objs, **kwargs)
+
+        with mock.patch.object(StudentChapterProgress.objects, 'bulk_create', concurrent_insert_first):
+            self.sync(items)
+        self.assertEqual(self.enrollment().completed_chapters, 2)
+
+    def test_marking_a_chapter_acts_for_the_token_student(self):
+        other = Student.objects.create(
+            fullname='Other', username='other', email='other@example.com',
+            password='secret', interested_categories='python', verify_status=True
+        )
+        url = reverse('mark-chapter-complete')
+        body = {'student_id': self.student.id, 'course_id': self.course.id, 'chapter_id': self.chapters[0].id}
+        response = self.client.post(url, json.dumps(body), content_type='application/json',
+                                    HTTP_AUTHORIZATION=f'Bearer {issue_token(other)}')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.enrollment().completed_chapters, 0)
+
+        del body['student_id']
+        response = self.client.post(url, json.dumps(body), content_type='application/json',
+                                    HTTP_AUTHORIZATION=f'Bearer {issue_token(self.student)}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.enrollment().completed_chapters, 1)
+
+    def test_sync_acts_for_the_token_student(self):
+        other = Student.objects.create(
+            fullname='Other', username='other', email='other@example.com',
+            password='secret', interested_categories='python', verify_status=True
+        )
+        item = [{'course_id': self.course.id, 'chapter_id': self.chapters[0].id}]
+        response = self.client.post(reverse('sync-chapter-progress'), json.dumps({
+            'student_id': self.student.id, 'items': item
+        }), content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {issue_token(other)}')
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post(reverse('sync-chapter-progress'), json.dumps({'items': item}),
+                                    content_type='application/json',
+                                    HTTP_AUTHORIZATION=f'Bearer {issue_token(self.student)}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.enrollment().completed_chapters, 1)
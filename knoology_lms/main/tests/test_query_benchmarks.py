@@ -0,0 +1,408 @@
+"""
+Query-count regression benchmarks for every route in main/urls.py.
+
+A realistic dataset is seeded once (main/factories.py), then every route is
+called with the Django test client. Each call runs in a savepoint that is
+rolled back, with caches cleared, so every route is measured cold and
+against the same data. Caches and media are temporary ones of this class
+(main/tests/base.py), never those of a development server. The query count and wall time of each call are
+compared with query_baselines.json next to this file, which holds one set of
+baselines per database vendor and dataset scale (``postgresql@1``); the
+counts of list routes grow with the dataset, so a run is only compared with
+baselines recorded at its own scale:
+
+- more queries than the baseline fails the test;
+- with BENCHMARK_TIME_FACTOR=3, so does taking more than 3x the baseline time;
+- a route without a benchmark call fails ``test_every_route_is_benchmarked``.
+
+Run against SQLite or a throwaway PostgreSQL database:
+
+    python manage.py test main.tests.test_query_benchmarks
+
+Environment variables:
+
+- BENCHMARK_SCALE: dataset size, 1.0 is 3000 students and 200 courses. A
+  scale without recorded baselines fails until they are recorded with
+  BENCHMARK_UPDATE_BASELINE=1.
+- BENCHMARK_UPDATE_BASELINE=1: rewrite the baseline file from this run.
+- BENCHMARK_REPORT=<path>: write every measured call as JSON.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from main import factories, realtime, response_cache, urls
+from main.authentication import clear_profile_cache, issue_token
+from main.middleware import count_queries, install_counters
+from main.models import (
+    Assignment, Chapter, ContactUs, CourseQuiz, CoursePayment, Notification, PasswordResetToken,
+    StudentCourseEnrollment, StudentQuizAttempt, StudyMaterial, Teacher, Student, TeacherStudentChat
+)
+from main.tests.base import IsolatedStorageMixin
+
+BASELINE_FILE = Path(__file__).with_name('query_baselines.json')
+SCALE = float(os.getenv('BENCHMARK_SCALE', 1.0))
+TIME_FACTOR = float(os.getenv('BENCHMARK_TIME_FACTOR') or 0)
+# Slack for timer noise on very fast routes when TIME_FACTOR is set
+TIME_SLACK_SECONDS = 0.05
+
+# Routes that currently answer 500 for reasons unrelated to performance.
+# They are still measured; remove an entry once the route is fixed.
+KNOWN_SERVER_ERRORS = {
+    'teacher-reset-password': 'the URL passes token but the view takes it from the body',
+    'teacher-forgot-password': 'PasswordResetToken.user points at Student, not Teacher',
+}
+
+
+@dataclass(frozen=True)
+class Call:
+    method: str
+    kwargs: dict = field(default_factory=dict)
+    data: dict = None
+    query: str = ''
+    multipart: bool = False
+    # Extra request headers, in WSGI form (HTTP_AUTHORIZATION=...)
+    headers: dict = None
+    # Tells apart calls to one route that differ only in their URL kwargs
+    label: str = ''
+
+    def key(self, name):
+        key = f'{name} {self.method}'
+        if self.label:
+            key += f' ({self.label})'
+        return key + (f'?{self.query}' if self.query else '')
+
+
+class Fixtures:
+    """The seeded rows each benchmark call points at, plus a few one-off rows."""
+
+    def __init__(self, dataset):
+        enrollments = (
+            StudentCourseEnrollment.objects.filter(student_id__in=dataset.student_ids)
+            .select_related('course').order_by('student_id', 'id')
+        )
+        by_student = {}
+        for enrollment in enrollments:
+            by_student.setdefault(enrollment.student_id, []).append(enrollment.course)
+        # A student with a completed attempt in the first course and a quiz
+        # still to take in the second one
+        self.student_id = next(
+            student_id for student_id, courses in by_student.items()
+            if len(courses) > 1 and StudentQuizAttempt.objects.filter(
+                student_id=student_id, course=courses[0], is_completed=True
+            ).exists()
+        )
+        self.course, self.quiz_course = by_student[self.student_id][:2]
+        self.teacher_id = self.course.teacher_id
+        self.chat_teacher_id = TeacherStudentChat.objects.filter(student_id=self.student_id).values_list(
+            'teacher_id', flat=True
+        ).first()
+        self.other_course_id = next(
+            course_id for course_id in dataset.course_ids
+            if course_id not in {c.id for c in by_student[self.student_id]}
+        )
+        self.quiz_id = CourseQuiz.objects.filter(course=self.quiz_course).values_list('quiz_id', flat=True).first()
+        self.course_quiz_id, self.assigned_quiz_id = CourseQuiz.objects.filter(course=self.course).values_list(
+            'id', 'quiz_id'
+        ).first()
+        self.attempt_id = StudentQuizAttempt.objects.filter(
+            student_id=self.student_id, is_completed=True
+        ).values_list('id', flat=True).first()
+        self.open_attempt = StudentQuizAttempt.objects.create(
+            student_id=self.student_id, quiz_id=self.quiz_id, course=self.quiz_course
+        )
+        self.question_ids = list(
+            self.open_attempt.quiz.questions.order_by('id').values_list('id', flat=True)
+        )
+        self.chapter_ids = list(Chapter.objects.filter(course=self.course).order_by('id').values_list('id', flat=True))
+        self.chapter_id = self.chapter_ids[0]
+        self.material_id = StudyMaterial.objects.filter(course__teacher_id=self.teacher_id).values_list(
+            'id', flat=True
+        ).first() or StudyMaterial.objects.create(
+            teacher_id=self.teacher_id, course=self.course, title='Notes', file='study_materials/notes.pdf'
+        ).id
+        self.assignment = Assignment.objects.create(
+            student_id=self.student_id, course=self.course, title='Essay', description='Write an essay',
+            due_date=(timezone.now() + timedelta(days=7)).date()
+        )
+        self.notification_id = Notification.objects.filter(
+            recipient_student_id=self.student_id
+        ).values_list('id', flat=True).first()
+        self.contact_message = ContactUs.objects.create(
+            name='Visitor', email='visitor@example.com', subject='Hello', message='Question'
+        )
+        self.reset_token = PasswordResetToken.objects.create(
+            user_id=self.student_id, token='benchmark-token', expiry_time=timezone.now() + timedelta(hours=1)
+        )
+        self.payment = CoursePayment.objects.create(
+            course_id=self.other_course_id, student_id=self.student_id, order_id='order_benchmark', amount=499
+        )
+        # bulk_create keeps Teacher.save / Student.save from sending OTP e-mails
+        self.unverified_teacher, = Teacher.objects.bulk_create([
+            factories.teacher_factory(verify_status=False, otp_digit='123456')
+        ])
+        self.unverified_student, = Student.objects.bulk_create([
+            factories.student_factory('unused', verify_status=False, otp_digit='123456')
+        ])
+        # Certificates are only issued for completed courses
+        StudentCourseEnrollment.objects.filter(student_id=self.student_id, course=self.course).update(
+            completed_at=timezone.now()
+        )
+        flatpage = FlatPage.objects.create(url='/about/', title='About', content='About Knoology LMS')
+        flatpage.sites.add(Site.objects.get_current())
+        self.student = Student.objects.get(id=self.student_id)
+        self.teacher = Teacher.objects.get(id=self.teacher_id)
+
+
+def benchmark_calls(f):
+    """The calls made for every URL name in main/urls.py."""
+    student, teacher, course = f.student_id, f.teacher_id, f.course.id
+    answers = [{'question_id': qid, 'selected_answer': 'Answer'} for qid in f.question_ids]
+    return {
+        'current-user': [Call('GET', headers={'HTTP_AUTHORIZATION': f'Bearer {issue_token(f.student)}'})],
+        'verify-teacher-otp': [Call('POST', {'teacher_id': f.unverified_teacher.id}, {'otp_digit': '123456'})],
+        'verify-student-otp': [Call('POST', {'student_id': f.unverified_student.id}, {'otp_digit': '123456'})],
+        'resend-otp': [Call('POST', data={'user_type': 'student', 'user_id': f.unverified_student.id})],
+        'student-forgot-password': [Call('POST', data={'email': f.student.email})],
+        'student-reset-password': [Call('POST', {'token': f.reset_token.token}, {'new_password': 'new-password'})],
+        'teacher-forgot-password': [Call('POST', data={'email': f.teacher.email})],
+        'teacher-reset-password': [Call('POST', {'token': 'unknown'}, {'new_password': 'new-password'})],
+        'category-list': [Call('GET')],
+        'category_list': [Call('GET')],
+        'course-list': [Call('GET'), Call('GET', query='page_size=20'), Call('GET', query='ordering=-average_rating&page_size=20')],
+        'course-detail': [Call('GET', {'pk': course})],
+        'teacher-list': [Call('GET')],
+        'teacher-detail': [Call('GET', {'pk': teacher})],
+        'teacher_login': [Call('POST', data={'email': f.teacher.email, 'password': factories.SEED_PASSWORD})],
+        'teacher_dashboard_stats': [Call('GET', {'teacher_id': teacher})],
+        'teacher-courses': [Call('GET', {'teacher_id': teacher})],
+        'teacher-enrolled-students': [Call('GET', {'teacher_id': teacher})],
+        'teacher-assignments': [Call('GET', {'teacher_id': teacher})],
+        'teacher-all-quiz-attempts': [Call('GET', {'teacher_id': teacher}), Call('GET', {'teacher_id': teacher}, query='page_size=50')],
+        'teacher-student-quiz-attempts': [Call('GET', {'teacher_id': teacher, 'student_id': student})],
+        'chapter-list': [
+            Call('GET', {'course_id': course}),
+            Call('POST', {'course_id': course}, {'title': 'New chapter', 'description': 'About', 'text_content': 'Text'}),
+        ],
+        'course_chapter_list': [Call('GET', {'course_id': course})],
+        'chapter-detail': [Call('GET', {'pk': f.chapter_id})],
+        'student_register': [Call('POST', data={
+            'fullname': 'New Student', 'username': 'new-student', 'email': 'new-student@example.com',
+            'password': 'password', 'interested_categories': 'Python'
+        })],
+        'student_login': [Call('POST', data={'username': f.student.username, 'password': factories.SEED_PASSWORD})],
+        'student-detail': [Call('GET', {'pk': student})],
+        'student_dashboard_stats': [Call('GET', {'student_id': student})],
+        'student-enrolled-teachers': [Call('GET', {'student_id': student})],
+        'course-enroll': [Call('POST', data={'student_id': student, 'course_id': f.other_course_id})],
+        'course-unenroll': [Call('POST', data={'student_id': student, 'course_id': course})],
+        'check-enrollment': [Call('GET', {'student_id': student, 'course_id': course})],
+        'enrolled-courses': [Call('GET', {'student_id': student})],
+        'course-enrolled-students': [Call('GET', {'course_id': course})],
+        'all-enrolled-students': [Call('GET')],
+        'check-rating': [Call('GET', {'student_id': student, 'course_id': course})],
+        'rate-course': [Call('POST', data={'student_id': student, 'course_id': course, 'rating': 4, 'review': 'Good'})],
+        'teacher-change-password': [Call('POST', {'teacher_id': teacher}, {
+            'current_password': factories.SEED_PASSWORD, 'new_password': 'new-password'
+        })],
+        'student-change-password': [Call('POST', {'student_id': student}, {
+            'current_password': factories.SEED_PASSWORD, 'new_password': 'new-password'
+        })],
+        'recommended-courses': [Call('GET', {'student_id': student})],
+        'check-favorite': [Call('GET', {'student_id': student, 'course_id': course})],
+        'toggle-favorite': [Call('POST', data={'student_id': student, 'course_id': course})],
+        'favorite-courses': [Call('GET', {'student_id': student})],
+        'student-assignments': [Call('GET', {'student_id': student})],
+        'add-assignment': [Call('POST', {'student_id': student}, {
+            'course': course, 'title': 'Homework', 'description': 'Exercises', 'due_date': '2030-01-01'
+        })],
+        'submit-assignment': [Call('POST', {'assignment_id': f.assignment.id}, {
+            'submitted_file': SimpleUploadedFile('answer.txt', b'my answer')
+        }, multipart=True)],
+        'grade-assignment': [Call('POST', {'assignment_id': f.assignment.id}, {'grade': 'A'})],
+        'update-assignment': [Call('PUT', {'assignment_id': f.assignment.id}, {
+            'title': 'Essay', 'due_date': '2030-01-01', 'description': 'Longer essay'
+        })],
+        'delete-assignment': [Call('DELETE', {'assignment_id': f.assignment.id})],
+        'student-courses': [Call('GET', {'student_id': student})],
+        'teacher-quizzes': [Call('GET', {'teacher_id': teacher})],
+        'quiz-detail': [Call('GET', {'pk': f.quiz_id})],
+        'quiz-questions': [Call('GET', {'quiz_id': f.quiz_id})],
+        'add-quiz-question': [Call('POST', {'quiz_id': f.quiz_id}, {
+            'question_text': 'New?', 'ans1': 'a', 'ans2': 'b', 'ans3': 'c', 'ans4': 'd', 'right_ans': 'a'
+        })],
+        'quiz-question-detail': [Call('GET', {'pk': f.question_ids[0]})],
+        'assign-quiz-to-course': [Call('POST', data={'quiz_id': f.quiz_id, 'course_id': course})],
+        'remove-quiz-from-course': [Call('DELETE', {'course_quiz_id': f.course_quiz_id})],
+        'course-assigned-quizzes': [Call('GET', {'course_id': course})],
+        'student-available-quizzes': [Call('GET', {'student_id': student})],
+        'get-quiz-for-attempt': [Call('GET', {'quiz_id': f.quiz_id, 'student_id': student, 'course_id': f.quiz_course.id})],
+        'submit-quiz-attempt': [Call('POST', {'attempt_id': f.open_attempt.id}, {'answers': answers})],
+        'student-quiz-results': [Call('GET', {'student_id': student})],
+        'quiz-attempt-detail': [Call('GET', {'attempt_id': f.attempt_id})],
+        'course-quiz-results': [Call('GET', {'course_id': course, 'quiz_id': f.assigned_quiz_id})],
+        'student-quiz-attempts': [Call('GET', {'student_id': student}), Call('GET', {'student_id': student}, query='include=responses')],
+        'all-quiz-attempts': [Call('GET'), Call('GET', query='page_size=50&include=responses')],
+        'notifications': [Call('GET', {'user_type': 'student', 'user_id': student})],
+        'mark-notification-read': [Call('POST', {'notification_id': f.notification_id})],
+        'unread-notification-count': [Call('GET', {'user_type': 'student', 'user_id': student})],
+        'search-courses': [Call('GET', query='q=python'), Call('GET', query='q=python&page_size=20')],
+        'study-materials': [Call('GET')],
+        'study-materials-by-course': [Call('GET', {'course_id': course})],
+        'study-material-detail': [Call('GET', {'pk': f.material_id})],
+        'notify-new-study-material': [Call('POST', data={'course_id': course, 'material_id': f.material_id})],
+        'notification-job': [Call('GET', {'job_id': 0})],
+        'metrics': [Call('GET')],
+        'get_top_course_ratings': [Call('GET')],
+        'faq-list': [Call('GET')],
+        'flatpage-list': [Call('GET')],
+        'get-flatpage-by-url': [Call('GET', {'url': 'about'})],
+        'contact-form-submit': [Call('POST', data={
+            'name': 'Visitor', 'email': 'visitor@example.com', 'subject': 'Hi', 'message': 'Hello there'
+        })],
+        'get-contact-messages': [Call('GET')],
+        'mark-contact-message-read': [Call('PATCH', {'message_id': f.contact_message.id})],
+        'send-message': [Call('POST', data={
+            'teacher_id': f.chat_teacher_id, 'student_id': student, 'message': 'Hello', 'message_from': 'student'
+        })],
+        'chat-messages': [
+            Call('GET', {'user_type': 'student', 'user_id': student, 'other_user_id': f.chat_teacher_id}),
+            Call('GET', {'user_type': 'student', 'user_id': student, 'other_user_id': f.chat_teacher_id}, query='limit=20'),
+        ],
+        'chat-users': [
+            Call('GET', {'user_type': 'student', 'user_id': student}, label='student'),
+            Call('GET', {'user_type': 'teacher', 'user_id': f.chat_teacher_id}, label='teacher'),
+        ],
+        'events': [Call('GET', {'user_type': 'student', 'user_id': student}, headers={
+            'HTTP_AUTHORIZATION': f'Bearer {issue_token(f.student)}'
+        })],
+        'delete-conversation': [Call('DELETE', {'teacher_id': f.chat_teacher_id, 'student_id': student})],
+        'checkout': [Call('POST', data={'student_id': student, 'course_id': f.other_course_id})],
+        'verify-payment': [Call('POST', data={
+            'razorpay_order_id': f.payment.order_id, 'razorpay_payment_id': 'pay_benchmark', 'razorpay_signature': 'sig'
+        })],
+        'generate-certificate': [Call('GET', {'student_id': student, 'course_id': course})],
+        'mark-chapter-complete': [Call('POST', data={'student_id': student, 'course_id': course, 'chapter_id': f.chapter_id})],
+        'sync-chapter-progress': [Call('POST', data={'student_id': student, 'items': [
+            {'course_id': course, 'chapter_id': chapter_id} for chapter_id in f.chapter_ids
+        ]})],
+        'get-completed-chapters': [Call('GET', {'student_id': student, 'course_id': course})],
+    }
+
+
+def fake_razorpay_client(*args, **kwargs):
+    client = mock.Mock()
+    client.order.create.side_effect = lambda order: {'id': 'order_fake', 'amount': order['amount'], 'currency': 'INR'}
+    client.utility.verify_payment_signature.return_value = True
+    return client
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    METRICS_ENABLED=False,
+    QUERY_BUDGETS={},
+    QUERY_BUDGET_DEFAULT=None,
+)
+class QueryBenchmarkTests(IsolatedStorageMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        dataset = factories.seed_dataset(factories.SeedConfig(scale=SCALE))
+        cls.fixtures = Fixtures(dataset)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+        cls.section = f'{connection.vendor}@{SCALE:g}'
+        cls.baseline = cls.baselines.get(cls.section, {})
+        cls.measured = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.getenv('BENCHMARK_UPDATE_BASELINE') and cls.measured:
+            cls.baselines[cls.section] = {
+                key: {'queries': result['queries'], 'seconds': result['seconds']}
+                for key, result in sorted(cls.measured.items())
+            }
+            BASELINE_FILE.write_text(json.dumps(dict(sorted(cls.baselines.items())), indent=2) + '\n')
+        if os.getenv('BENCHMARK_REPORT') and cls.measured:
+            Path(os.getenv('BENCHMARK_REPORT')).write_text(json.dumps(cls.measured, indent=2) + '\n')
+        super().tearDownClass()
+
+    def test_every_route_is_benchmarked(self):
+        named = {pattern.name for pattern in urls.urlpatterns}
+        calls = benchmark_calls(self.fixtures)
+        self.assertEqual(sorted(named - calls.keys()), [], 'routes without a benchmark call')
+        self.assertEqual(sorted(calls.keys() - named), [], 'benchmark calls for routes that no longer exist')
+
+    def measure(self, name, call):
+        url = reverse(name, kwargs=call.kwargs)
+        if call.query:
+            url = f'{url}?{call.query}'
+        if call.data is None:
+            kwargs = {}
+        elif call.multipart:
+            kwargs = {'data': call.data}
+        else:
+            kwargs = {'data': json.dumps(call.data), 'content_type': 'application/json'}
+        kwargs.update(call.headers or {})
+        request = getattr(self.client, call.method.lower())
+
+        cache.clear()
+        clear_profile_cache()
+        response_cache.clear()
+        # Counted through an execute wrapper: connection.queries_log stops
+        # growing at 9000 entries, which the worst routes go past
+        with transaction.atomic():
+            with count_queries(collect_sql=True) as counter:
+                start = time.perf_counter()
+                response = request(url, **kwargs)
+                seconds = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return response, counter, seconds
+
+    def test_query_counts_within_baseline(self):
+        self.client.raise_request_exception = False
+        install_counters()
+        failures = []
+        if not self.baseline:
+            failures.append(
+                f'no baselines for {self.section} in {BASELINE_FILE.name} (run with BENCHMARK_UPDATE_BASELINE=1)'
+            )
+        with mock.patch('main.views.razorpay.Client', fake_razorpay_client), \
+                mock.patch.object(realtime, 'ensure_listener'):
+            for name, calls in benchmark_calls(self.fixtures).items():
+                for call in calls:
+                    key = call.key(name)
+                    response, counter, seconds = self.measure(name, call)
+                    count = counter.count
+                    self.measured[key] = {'queries': count, 'seconds': round(seconds, 4), 'status': response.status_code}
+                    if response.status_code >= 500 and name not in KNOWN_SERVER_ERRORS:
+                        failures.append(f'{key}: HTTP {response.status_code}')
+                    expected = self.baseline.get(key)
+                    if expected is None:
+                        if self.baseline:
+                            failures.append(f'{key}: no baseline (run with BENCHMARK_UPDATE_BASELINE=1)')
+                        continue
+                    if count > expected['queries']:
+                        statements = '\n'.join(f'    {sql[:200]}' for _, sql in counter.statements[:20])
+                        failures.append(f'{key}: {count} queries, baseline {expected["queries"]}\n{statements}')
+                    if TIME_FACTOR and seconds > expected['seconds'] * TIME_FACTOR + TIME_SLACK_SECONDS:
+                        failures.append(f'{key}: {seconds:.3f}s, baseline {expected["seconds"]:.3f}s')
+        if os.getenv('BENCHMARK_UPDATE_BASELINE'):
+            return
+        self.assertFalse(failures, '\n' + '\n'.join(failures))
@@ -0,0 +1,35 @@
+from django.core.cache import caches
+from django.test import TestCase
+
+from main import quiz_store
+from main.models import Quiz, QuizQuestion
+from main.tests.base import IsolatedStorageMixin, create_teacher
+
+
+class QuizStoreTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        teacher = create_teacher()
+        self.quiz = Quiz.objects.create(teacher=teacher, title='Basics', description='Quiz', total_marks=10)
+        self.question = QuizQuestion.objects.create(
+            quiz=self.quiz, question_text='2 + 2?', ans1='3', ans2='4', ans3='5', ans4='6', right_ans='4'
+        )
+
+    def test_edit_made_by_another_process_is_seen(self):
+        self.assertEqual(quiz_store.get_quiz_snapshot(self.quiz.id).answer_key, {self.question.id: '4'})
+
+        # Another worker saves the question: it shares only the 'shared' cache with this one
+        version = quiz_store.get_quiz_version(self.quiz.id)
+        QuizQuestion.objects.filter(id=self.question.id).update(right_ans='5')
+        caches['shared'].set(quiz_store._version_key(self.quiz.id), 'bumped-elsewhere', None)
+
+        self.assertNotEqual(quiz_store.get_quiz_version(self.quiz.id), version)
+        self.assertEqual(quiz_store.get_quiz_snapshot(self.quiz.id).answer_key, {self.question.id: '5'})
+
+    def test_question_save_bumps_the_shared_version(self):
+        version = quiz_store.get_quiz_version(self.quiz.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.right_ans = '6'
+            self.question.save()
+        self.assertNotEqual(caches['shared'].get(quiz_store._version_key(self.quiz.id)), version)
+        self.assertEqual(quiz_store.get_quiz_snapshot(self.quiz.id).answer_key, {self.question.id: '6'})
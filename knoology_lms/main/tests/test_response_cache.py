@@ -0,0 +1,81 @@
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main import response_cache
+from main.models import FAQ, Course, CourseCategory
+from main.tests.base import IsolatedStorageMixin, create_teacher
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=300)
+class ResponseCacheTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = CourseCategory.objects.create(title='Python', description='Python courses')
+        self.teacher = create_teacher()
+        self.course = Course.objects.create(
+            category=self.category, teacher=self.teacher, title='Django', description='Web', technologies='django'
+        )
+
+    def get(self, name, *args, query=None, **headers):
+        return self.client.get(reverse(name, args=args), query, **headers)
+
+    def test_repeated_get_is_served_from_cache(self):
+        first = self.get('course-detail', self.course.id)
+        with self.assertNumQueries(0):
+            second = self.get('course-detail', self.course.id)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Content-Type'], 'application/json')
+
+    def test_matching_etag_returns_304(self):
+        etag = self.get('category-list')['ETag']
+        with self.assertNumQueries(0):
+            response = self.get('category-list', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get('category-list', HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_query_parameters_are_part_of_the_key(self):
+        self.get('course-list', query={'page_size': 1, 'ordering': 'id'})
+        with self.assertNumQueries(0):
+            self.get('course-list', query={'ordering': 'id', 'page_size': 1})
+        with self.assertNumQueries(1):
+            self.get('course-list', query={'page_size': 2, 'ordering': 'id'})
+
+    def test_shared_tier_serves_other_processes(self):
+        self.get('faq-list')
+        caches['default'].clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('faq-list').status_code, 200)
+
+    def test_writes_invalidate_dependent_responses(self):
+        self.get('course-list')
+        self.get('category-list')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.title = 'Python 3'
+            self.category.save()
+        self.assertContains(self.get('category-list'), 'Python 3')
+        self.assertContains(self.get('course-list'), 'Python 3')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FAQ.objects.create(question='Refunds?', answer='Within 7 days')
+        self.assertContains(self.get('faq-list'), 'Refunds?')
+
+    def test_flatpage_site_change_invalidates(self):
+        page = FlatPage.objects.create(url='/about/', title='About', content='About us')
+        page.sites.add(Site.objects.get_current())
+        self.assertEqual(self.get('get-flatpage-by-url', 'about').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            page.sites.clear()
+        self.assertEqual(self.get('get-flatpage-by-url', 'about').status_code, 404)
+
+    def test_writes_are_not_cached(self):
+        self.get('category-list')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('category-list'), {'title': 'Go', 'description': 'Go courses'})
+        self.assertEqual(response.status_code, 201)
+        self.assertContains(self.get('category-list'), 'Go courses')
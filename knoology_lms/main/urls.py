@@ -2,6 +2,9 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    # The teacher or student of the request's access token
+    path('auth/me/', views.current_user, name='current-user'),
+
     # OTP Verification URLs
     path('verify-teacher-otp/<int:teacher_id>/', views.verify_teacher_otp, name='verify-teacher-otp'),
     path('verify-student-otp/<int:student_id>/', views.verify_student_otp, name='verify-student-otp'),
@@ -96,6 +99,10 @@ urlpatterns = [
     path('study-materials/<int:course_id>/', views.StudyMaterialList.as_view(), name='study-materials-by-course'),
     path('study-material-detail/<int:pk>/', views.StudyMaterialDetail.as_view(), name='study-material-detail'),
     path('notify-new-study-material/', views.notify_new_study_material, name='notify-new-study-material'),
+    path('notification-job/<int:job_id>/', views.notification_job_status, name='notification-job'),
+
+    # Request metrics (Prometheus)
+    path('metrics/', views.metrics, name='metrics'),
 
     # Top Course Ratings endpoint
     path('get-top-course-ratings/', views.get_top_course_ratings, name='get_top_course_ratings'),
@@ -116,6 +123,7 @@ urlpatterns = [
     path('send-message/', views.send_message, name='send-message'),
     path('chat-messages/<str:user_type>/<int:user_id>/<int:other_user_id>/', views.get_chat_messages, name='chat-messages'),
     path('chat-users/<str:user_type>/<int:user_id>/', views.get_chat_users, name='chat-users'),
+    path('events/<str:user_type>/<int:user_id>/', views.event_stream, name='events'),
     path('delete-conversation/<int:teacher_id>/<int:student_id>/', views.delete_conversation, name='delete-conversation'),
 
     # Payment URLs
@@ -123,5 +131,6 @@ urlpatterns = [
     path('verify-payment/', views.verify_payment, name='verify-payment'),
     path('generate-certificate/<int:student_id>/<int:course_id>/', views.generate_certificate, name='generate-certificate'),
     path('mark-chapter-complete/', views.mark_chapter_complete, name='mark-chapter-complete'),
+    path('sync-chapter-progress/', views.sync_chapter_progress, name='sync-chapter-progress'),
     path('get-completed-chapters/<int:student_id>/<int:course_id>/', views.get_completed_chapters, name='get-completed-chapters'),
 ]
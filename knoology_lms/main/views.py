@@ -2,27 +2,28 @@ import json
 import uuid
 import random
 import datetime
-from django.db.models import Avg, Q, Count
-from django.http import JsonResponse
+from django.db import transaction, IntegrityError
+from django.db.models import Avg, Q, Count, F
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.exceptions import ParseError
 from django.core.exceptions import ValidationError
-from django.contrib.auth.hashers import check_password, make_password
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.flatpages.models import FlatPage
 from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from .models import (
     Teacher, Course, CourseCategory, Chapter, Student, 
     StudentCourseEnrollment, CourseRating, StudentFavoriteCourse, 
     Assignment, Quiz, QuizQuestion, CourseQuiz, 
     StudentQuizAttempt, StudentQuizResponse, Notification, StudyMaterial,FAQ, ContactUs,
-    PasswordResetToken, TeacherStudentChat, CoursePayment
+    PasswordResetToken, TeacherStudentChat, CoursePayment, NotificationJob, Conversation
 )
 import razorpay
 from django.conf import settings
@@ -33,7 +34,33 @@ from .serializers import (
     QuizDetailSerializer, CourseQuizSerializer, StudentQuizAttemptSerializer,
     StudentQuizResponseSerializer, NotificationSerializer, StudyMaterialSerializer,
     StudentCourseEnrollmentSerializer,FaqSerializer, FlatPageSerializer, ContactUsSerializer,
-    TeacherStudentChatSerializer
+    TeacherStudentChatSerializer, CourseSearchSerializer, NotificationJobSerializer
+)
+from . import certificates, realtime, search as course_search
+from .metrics import registry as metrics_registry
+from .conditional import (
+    conditional_get, course_chapters_state, course_state, notifications_state, quiz_questions_state,
+    study_materials_state
+)
+from .chat import HistoryParamError, chat_history, inbox, mark_conversation_read, send_chat_message
+from .dashboard import get_teacher_stats
+from .grading import calculate_marks, grade_answers
+from .accounts import generate_otp, queue_otp_email
+from .authentication import Principal, allow_cross_type, body_account, issue_token
+from .notifications import notify_course_students
+from .progress import (
+    chapter_added, chapter_moved, chapter_removed, complete_chapter, completed_chapters_for, sync_progress
+)
+from .passwords import PasswordHashingBusy, check_student_password, hash_password
+from .ratelimit import LoginLimiter
+from .outbox import queue_email
+from .quiz_attempts import load_quiz_attempts
+from .quiz_store import get_quiz_snapshot
+from .response_cache import cache_response
+from .pagination import (
+    COURSE_ORDERINGS, SEARCH_ORDERINGS,
+    CursorError, apply_ordering, keyset_page, stream_json_list,
+    wants_pagination, wants_stream
 )
 
 # Create your views here.
@@ -47,7 +74,15 @@ class TeacherList(generics.ListCreateAPIView):
    serializer_class= TeacherSerializer
    #permission_classes = [permissions.IsAuthenticated]
 
+   def perform_create(self, serializer):
+       # New teachers verify their email with an OTP
+       with transaction.atomic():
+           teacher = serializer.save(otp_digit=generate_otp())
+           queue_otp_email(teacher)
+
 # Copy this code and replace the TeacherDetail class in views.py
+# Public profile, also read by students
+@allow_cross_type('GET')
 class TeacherDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = Teacher.objects.all()
     serializer_class = TeacherSerializer
@@ -65,7 +100,7 @@ class TeacherDetail(generics.RetrieveUpdateDestroyAPIView):
         if 'profile_img' in request.FILES:
             # Save the file directly to the instance
             instance.profile_img = request.FILES['profile_img']
-            instance.save(update_fields=['profile_img'])
+            instance.save(update_fields=['profile_img', 'updated_at'])
             
         # Process the rest of the data with partial update
         serializer = self.get_serializer(instance, data=request.data, partial=True)
@@ -113,7 +148,8 @@ def teacher_login(request):
                     'message': 'Login successful',
                     'teacher_id': teacher.id,
                     'full_name': teacher.full_name,
-                    'email': teacher.email
+                    'email': teacher.email,
+                    'access_token': issue_token(teacher)
                 })
             except Teacher.DoesNotExist:
                 return JsonResponse({
@@ -133,15 +169,38 @@ def teacher_login(request):
         }, status=405)
 
 
+@method_decorator(cache_response('categories'), name='dispatch')
 class CategoryList(generics.ListCreateAPIView):
    queryset= CourseCategory.objects.all()
    serializer_class= CategorySerializer
    #permission_classes = [permissions.IsAuthenticated]
 
+@method_decorator(cache_response('courses'), name='dispatch')
 class CourseList(generics.ListCreateAPIView):
     queryset = Course.objects.select_related('teacher', 'category').all()
     serializer_class = CourseSerializer
 
+    def list(self, request, *args, **kwargs):
+        # ?stream=1 streams the catalog row by row, ?cursor= / ?page_size= return
+        # one keyset page. Without either the full list is returned as before.
+        if not (wants_stream(request) or wants_pagination(request)):
+            return super().list(request, *args, **kwargs)
+
+        try:
+            if wants_stream(request):
+                queryset, _ = apply_ordering(self.get_queryset(), request, allowed=COURSE_ORDERINGS)
+                return stream_json_list(queryset, self.get_serializer().to_representation)
+
+            courses, next_cursor = keyset_page(self.get_queryset(), request, 'course-list', allowed=COURSE_ORDERINGS)
+        except CursorError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(courses, many=True)
+        return Response({
+            'results': serializer.data,
+            'next_cursor': next_cursor
+        })
+
     def create(self, request, *args, **kwargs):
         try:
             teacher_id = request.data.get('teacher')
@@ -178,6 +237,8 @@ class CourseList(generics.ListCreateAPIView):
         category = CourseCategory.objects.get(id=category_id)
         serializer.save(teacher=teacher, category=category)
 
+@method_decorator(cache_response('courses'), name='dispatch')
+@method_decorator(conditional_get(course_state, last_modified=True), name='dispatch')
 class CourseDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = Course.objects.select_related('teacher', 'category').all()
     serializer_class = CourseSerializer
@@ -205,12 +266,13 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
     def patch(self, request, *args, **kwargs):
         return self.partial_update(request, *args, **kwargs)
 
+@allow_cross_type('GET')
 class TeacherCourseList(generics.ListAPIView):
     serializer_class = CourseSerializer
 
     def get_queryset(self):
         teacher_id = self.kwargs.get('teacher_id')
-        return Course.objects.filter(teacher_id=teacher_id).select_related('teacher', 'category').prefetch_related('enrolled_students')
+        return Course.objects.filter(teacher_id=teacher_id).select_related('teacher', 'category')
 
 class ChapterList(generics.ListCreateAPIView):
     serializer_class = ChapterSerializer
@@ -233,7 +295,9 @@ class ChapterList(generics.ListCreateAPIView):
             
             serializer = self.get_serializer(data=data)
             if serializer.is_valid():
-                serializer.save(course=course)
+                with transaction.atomic():
+                    serializer.save(course=course)
+                    chapter_added(course.id)
                 return Response({
                     'status': 'success',
                     'message': 'Chapter added successfully',
@@ -260,7 +324,9 @@ class ChapterList(generics.ListCreateAPIView):
         course_id = self.kwargs.get('course_id')
         try:
             course = Course.objects.get(id=course_id)
-            serializer.save(course=course)
+            with transaction.atomic():
+                serializer.save(course=course)
+                chapter_added(course.id)
         except Course.DoesNotExist:
             raise ValidationError('Invalid course ID')
 
@@ -271,7 +337,9 @@ class ChapterDetail(generics.RetrieveUpdateDestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
-            self.perform_destroy(instance)
+            with transaction.atomic():
+                chapter_removed(instance)
+                self.perform_destroy(instance)
             return Response({'message': 'Chapter deleted successfully'}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -279,13 +347,18 @@ class ChapterDetail(generics.RetrieveUpdateDestroyAPIView):
     def update(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
+            old_course_id = instance.course_id
             serializer = self.get_serializer(instance, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
-            self.perform_update(serializer)
+            with transaction.atomic():
+                self.perform_update(serializer)
+                if instance.course_id != old_course_id:
+                    chapter_moved(instance, old_course_id)
             return Response({'message': 'Chapter updated successfully', 'data': serializer.data})
         except Exception as e:
             return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@conditional_get(course_chapters_state)
 @api_view(['GET'])
 def course_chapter_list(request, course_id):
     try:
@@ -307,8 +380,8 @@ class StudentRegistrationView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            # Auto-verify student (OTP disabled)
-            student = serializer.save(verify_status=True)
+            # Auto-verify student (OTP disabled), so no OTP is generated or mailed
+            serializer.save(verify_status=True)
             return Response({
                 'status': 'success',
                 'message': 'Student registration successful',
@@ -320,23 +393,49 @@ class StudentRegistrationView(generics.CreateAPIView):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+def current_user(request):
+    """The teacher or student the request's access token belongs to."""
+    principal = request.user
+    profile = principal.profile if isinstance(principal, Principal) else None
+    if profile is None:
+        # A bad token reaches the view as anonymous (see TokenAuthMiddleware)
+        response = Response({
+            'status': 'error',
+            'message': getattr(request._request, 'token_error', None) or 'Authentication required'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return Response({
+        'status': 'success',
+        'user_type': principal.user_type,
+        **profile
+    })
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def student_login(request):
     username = request.data.get('username')
     password = request.data.get('password')
     
+    # Turn away clients over the attempt limits before hashing anything
+    limiter = LoginLimiter(request, username)
+    retry_after = limiter.retry_after()
+    if retry_after:
+        return Response({
+            'status': 'error',
+            'message': 'Too many login attempts. Please try again later.'
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(retry_after)})
+    limiter.attempt()
+    
     try:
         student = Student.objects.get(username=username)
         
-        # Try checking with Django's check_password first (for hashed passwords)
-        password_valid = check_password(password, student.password)
-        
-        # If that fails, try direct comparison (for unhashed passwords)
-        if not password_valid and student.password == password:
-            password_valid = True
+        # Accepts hashed and legacy plaintext passwords; outdated ones are re-hashed
+        password_valid = check_student_password(student, password)
         
         if password_valid:
+            limiter.succeeded()
             # Check if the account is verified
             if not student.verify_status:
                 return Response({
@@ -353,18 +452,26 @@ def student_login(request):
                 'student_id': student.id,
                 'username': student.username,
                 'fullname': student.fullname,
-                'email': student.email
+                'email': student.email,
+                'access_token': issue_token(student)
             })
         else:
+            limiter.failed()
             return Response({
                 'status': 'error',
                 'message': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
     except Student.DoesNotExist:
+        limiter.failed()
         return Response({
             'status': 'error',
             'message': 'Student not found'
         }, status=status.HTTP_401_UNAUTHORIZED)
+    except PasswordHashingBusy:
+        return Response({
+            'status': 'error',
+            'message': 'Server is busy. Please try again shortly.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
 
 @api_view(['POST'])
 def student_change_password(request, student_id):
@@ -383,16 +490,16 @@ def student_change_password(request, student_id):
                 'message': 'Current password and new password are required'
             }, status=status.HTTP_400_BAD_REQUEST)
             
-        # Verify current password using Django's check_password since student passwords are hashed
-        if not check_password(current_password, student.password):
+        # Verify current password (hashed, or plaintext for older accounts)
+        if not check_student_password(student, current_password, rehash=False):
             return Response({
                 'status': 'error',
                 'message': 'Current password is incorrect'
             }, status=status.HTTP_401_UNAUTHORIZED)
             
         # Update password with hashed version
-        student.password = make_password(new_password)
-        student.save()
+        student.password = hash_password(new_password)
+        student.save(update_fields=['password'])
         
         return Response({
             'status': 'success',
@@ -404,6 +511,11 @@ def student_change_password(request, student_id):
             'status': 'error',
             'message': 'Student not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except PasswordHashingBusy:
+        return Response({
+            'status': 'error',
+            'message': 'Server is busy. Please try again shortly.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
     except Exception as e:
         return Response({
             'status': 'error',
@@ -430,22 +542,20 @@ def student_forgot_password(request):
         token = str(uuid.uuid4())
         expiry_time = timezone.now() + datetime.timedelta(hours=1)  # Token valid for 1 hour
         
-        # Save the token in the database
-        PasswordResetToken.objects.create(
-            user=student,
-            token=token,
-            expiry_time=expiry_time
-        )
-        
-        # Send email with reset link - Use path parameter instead of query parameter
+        # Save the token and queue the email with the reset link together
         reset_link = f"http://localhost:3000/reset-password/{token}"  # Frontend URL with token in path
-        send_mail(
-            'Knoology LMS - Password Reset Request',
-            f'Click the link below to reset your password:\n\n{reset_link}',
-            'noreply@knoology.com',
-            [email],
-            fail_silently=False
-        )
+        with transaction.atomic():
+            PasswordResetToken.objects.create(
+                user=student,
+                token=token,
+                expiry_time=expiry_time
+            )
+            queue_email(
+                'Knoology LMS - Password Reset Request',
+                f'Click the link below to reset your password:\n\n{reset_link}',
+                [email],
+                from_email='noreply@knoology.com'
+            )
         
         return Response({
             'status': 'success',
@@ -495,8 +605,8 @@ def student_reset_password(request, token):
         
         # Update the student's password
         student = reset_token.user
-        student.password = make_password(new_password)
-        student.save()
+        student.password = hash_password(new_password)
+        student.save(update_fields=['password'])
         
         # Delete the token after successful password reset
         reset_token.delete()
@@ -505,6 +615,11 @@ def student_reset_password(request, token):
             'status': 'success',
             'message': 'Password has been reset successfully'
         })
+    except PasswordHashingBusy:
+        return Response({
+            'status': 'error',
+            'message': 'Server is busy. Please try again shortly.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
     except Exception as e:
         return Response({
             'status': 'error',
@@ -531,23 +646,21 @@ def teacher_forgot_password(request):
         token = str(uuid.uuid4())
         expiry_time = timezone.now() + datetime.timedelta(hours=1)  # Token valid for 1 hour
         
-        # Save the token in the database
-        PasswordResetToken.objects.create(
-            user=teacher,
-            token=token,
-            expiry_time=expiry_time,
-            is_teacher=True
-        )
-        
-        # Send email with reset link
+        # Save the token and queue the email with the reset link together
         reset_link = f"http://localhost:3000/teacher-reset-password/{token}"  # Frontend URL with token in path
-        send_mail(
-            'Knoology LMS - Password Reset Request',
-            f'Click the link below to reset your password:\n\n{reset_link}',
-            'noreply@knoology.com',
-            [email],
-            fail_silently=False
-        )
+        with transaction.atomic():
+            PasswordResetToken.objects.create(
+                user=teacher,
+                token=token,
+                expiry_time=expiry_time,
+                is_teacher=True
+            )
+            queue_email(
+                'Knoology LMS - Password Reset Request',
+                f'Click the link below to reset your password:\n\n{reset_link}',
+                [email],
+                from_email='noreply@knoology.com'
+            )
         
         return Response({
             'status': 'success',
@@ -622,34 +735,14 @@ def teacher_dashboard_stats(request, teacher_id):
     - Total number of unique students enrolled in those courses.
     """
     try:
-        # Count total courses for the teacher
-        total_courses = Course.objects.filter(teacher_id=teacher_id).count()
-
-        # Count unique students enrolled in the teacher's courses
-        total_students = StudentCourseEnrollment.objects.filter(
-            course__teacher_id=teacher_id
-        ).values('student').distinct().count()
-        
-        # Optionally, fetch recent courses (can be done in a separate call if preferred)
-        # recent_courses = Course.objects.filter(teacher_id=teacher_id).order_by('-id')[:3]
-        # recent_courses_serializer = CourseSerializer(recent_courses, many=True)
-
-        # Get course enrollment data for charts
-        courses = Course.objects.filter(teacher_id=teacher_id)
-        course_data = []
-        for course in courses:
-            enrollment_count = StudentCourseEnrollment.objects.filter(course=course).count()
-            if enrollment_count > 0:
-                course_data.append({
-                    'title': course.title,
-                    'enrollments': enrollment_count
-                })
+        # Grouped aggregates, cached per teacher until an enrollment or course changes
+        stats = get_teacher_stats(teacher_id)
 
         return Response({
             'status': 'success',
-            'total_courses': total_courses,
-            'total_students': total_students,
-            'course_data': course_data
+            'total_courses': stats['total_courses'],
+            'total_students': stats['total_students'],
+            'course_data': stats['course_data']
         })
     except Teacher.DoesNotExist:
          return Response({
@@ -735,8 +828,22 @@ def enroll_in_course(request):
                 'message': 'Student is already enrolled in this course'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create enrollment
-        enrollment = StudentCourseEnrollment.objects.create(student=student, course=course)
+        # Create enrollment and bump the course's enrollment counter together
+        try:
+            with transaction.atomic():
+                # Progress from an earlier enrollment is kept and counts again
+                enrollment = StudentCourseEnrollment.objects.create(
+                    student=student, course=course, completed_chapters=completed_chapters_for(student.id, course.id)
+                )
+                Course.objects.filter(id=course.id).update(
+                    total_enrolled=F('total_enrolled') + 1, updated_at=timezone.now()
+                )
+        except IntegrityError:
+            # A concurrent request enrolled the student first
+            return Response({
+                'status': 'error',
+                'message': 'Student is already enrolled in this course'
+            }, status=status.HTTP_400_BAD_REQUEST)
         serializer = StudentCourseEnrollmentSerializer(enrollment)
         
         return Response({
@@ -783,15 +890,22 @@ def get_enrolled_courses(request, student_id):
                 'message': f'Student with ID {student_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
             
-        enrollments = StudentCourseEnrollment.objects.filter(student_id=student_id)
+        enrollments = StudentCourseEnrollment.objects.filter(
+            student_id=student_id
+        ).select_related('course__teacher', 'course__category')
         courses = [enrollment.course for enrollment in enrollments]
         
         # Add request to the serializer context
         serializer = CourseSerializer(courses, many=True, context={'request': request})
+        data = serializer.data
+        for course_data, enrollment in zip(data, enrollments):
+            course_data['total_chapters'] = enrollment.course.total_chapters
+            course_data['completed_chapters'] = enrollment.completed_chapters
+            course_data['progress'] = enrollment.progress
         
         return Response({
             'status': 'success',
-            'data': serializer.data
+            'data': data
         })
     except Exception as e:
         print(f"DEBUG: Error in get_enrolled_courses: {str(e)}")
@@ -809,11 +923,15 @@ def unenroll_from_course(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        enrollment = StudentCourseEnrollment.objects.get(
-            student_id=request.data['student_id'],
-            course_id=request.data['course_id']
-        )
-        enrollment.delete()
+        with transaction.atomic():
+            enrollment = StudentCourseEnrollment.objects.get(
+                student_id=request.data['student_id'],
+                course_id=request.data['course_id']
+            )
+            enrollment.delete()
+            Course.objects.filter(id=enrollment.course_id).update(
+                total_enrolled=F('total_enrolled') - 1, updated_at=timezone.now()
+            )
         
         return Response({
             'status': 'success',
@@ -833,7 +951,7 @@ def unenroll_from_course(request):
 @api_view(['GET'])
 def course_enrolled_students(request, course_id):
     try:
-        enrollments = StudentCourseEnrollment.objects.filter(course_id=course_id)
+        enrollments = StudentCourseEnrollment.objects.filter(course_id=course_id).select_related('student')
         students = [enrollment.student for enrollment in enrollments]
         student_data = []
         for student in students:
@@ -858,7 +976,7 @@ def course_enrolled_students(request, course_id):
 def all_enrolled_students(request):
     try:
         # Get unique students from enrollments
-        enrollments = StudentCourseEnrollment.objects.all()
+        enrollments = StudentCourseEnrollment.objects.select_related('student', 'course')
         student_data = {}
         
         for enrollment in enrollments:
@@ -1031,7 +1149,7 @@ def recommended_courses(request, student_id):
             recommended = base_query
         
         # Order by rating and limit to top 10
-        recommended = recommended.annotate(
+        recommended = recommended.select_related('teacher', 'category').annotate(
             avg_rating=Avg('ratings__rating')
         ).order_by('-avg_rating', '-total_ratings')[:10]
         
@@ -1125,7 +1243,9 @@ def get_favorite_courses(request, student_id):
                 'message': f'Student with ID {student_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
             
-        favorites = StudentFavoriteCourse.objects.filter(student_id=student_id)
+        favorites = StudentFavoriteCourse.objects.filter(
+            student_id=student_id
+        ).select_related('course__teacher', 'course__category')
         courses = [favorite.course for favorite in favorites]
         
         # Add request to the serializer context
@@ -1142,6 +1262,8 @@ def get_favorite_courses(request, student_id):
             'message': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
+# Teachers read the profiles of their students
+@allow_cross_type('GET')
 class StudentDetail(generics.RetrieveUpdateAPIView):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
@@ -1214,6 +1336,7 @@ class StudentDetail(generics.RetrieveUpdateAPIView):
         kwargs['partial'] = True
         return self.update(request, *args, **kwargs)
 
+@allow_cross_type('GET')
 @api_view(['GET'])
 def student_assignments(request, student_id):
     """Get all assignments for a student"""
@@ -1231,6 +1354,7 @@ def student_assignments(request, student_id):
             'message': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@allow_cross_type('POST')
 @api_view(['POST'])
 def add_assignment(request, student_id):
     """Add a new assignment for a student"""
@@ -1349,6 +1473,7 @@ def grade_assignment(request, assignment_id):
             'message': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@allow_cross_type('GET')
 @api_view(['GET'])
 def student_courses(request, student_id):
     """Get courses a student is enrolled in"""
@@ -1364,7 +1489,9 @@ def student_courses(request, student_id):
             }, status=status.HTTP_404_NOT_FOUND)
         
         print(f"DEBUG: Student exists, fetching enrollments")
-        enrollments = StudentCourseEnrollment.objects.filter(student_id=student_id)
+        enrollments = StudentCourseEnrollment.objects.filter(
+            student_id=student_id
+        ).select_related('course__teacher', 'course__category')
         print(f"DEBUG: Found {len(enrollments)} enrollments")
         courses = [enrollment.course for enrollment in enrollments]
         print(f"DEBUG: Extracted {len(courses)} courses")
@@ -1605,6 +1732,7 @@ class QuizQuestionDetail(generics.RetrieveUpdateDestroyAPIView):
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
+@conditional_get(quiz_questions_state)
 @api_view(['GET'])
 def quiz_questions(request, quiz_id):
     try:
@@ -1645,21 +1773,26 @@ def assign_quiz_to_course(request):
         course_quiz = CourseQuiz.objects.create(quiz=quiz, course=course)
         serializer = CourseQuizSerializer(course_quiz)
         
-        # Send notifications to enrolled students
-        enrolled_students = StudentCourseEnrollment.objects.filter(course=course)
-        for enrollment in enrolled_students:
-            Notification.objects.create(
-                recipient_student=enrollment.student,
-                notification_type='quiz_assigned',
-                title='New Quiz Available',
-                message=f'A new quiz "{quiz.title}" has been assigned to the course "{course.title}"',
-                related_quiz=quiz,
-                related_course=course
-            )
-        
+        # Send notifications to enrolled students (queued as a job for large courses)
+        notified, job = notify_course_students(
+            course,
+            notification_type='quiz_assigned',
+            title='New Quiz Available',
+            message=f'A new quiz "{quiz.title}" has been assigned to the course "{course.title}"',
+            related_quiz=quiz
+        )
+
+        if job is not None:
+            return Response({
+                'status': 'success',
+                'message': f'Quiz assigned to course successfully. Notifying {notified} students.',
+                'data': serializer.data,
+                'notification_job': NotificationJobSerializer(job).data
+            }, status=status.HTTP_201_CREATED)
+
         return Response({
             'status': 'success',
-            'message': f'Quiz assigned to course successfully. {enrolled_students.count()} students notified.',
+            'message': f'Quiz assigned to course successfully. {notified} students notified.',
             'data': serializer.data
         }, status=status.HTTP_201_CREATED)
         
@@ -1788,11 +1921,8 @@ def get_quiz_for_attempt(request, quiz_id, student_id, course_id):
                 'message': 'You have already completed this quiz'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get quiz details with questions
-        quiz = Quiz.objects.get(id=quiz_id)
-        questions = list(QuizQuestion.objects.filter(quiz=quiz).values(
-            'id', 'question_text', 'ans1', 'ans2', 'ans3', 'ans4'
-        ))
+        # Get quiz details with questions from the cached snapshot
+        quiz, questions = get_quiz_snapshot(quiz_id).delivery()
         
         # Start or get an existing incomplete attempt
         attempt, created = StudentQuizAttempt.objects.get_or_create(
@@ -1807,13 +1937,7 @@ def get_quiz_for_attempt(request, quiz_id, student_id, course_id):
         
         return Response({
             'status': 'success',
-            'quiz': {
-                'id': quiz.id,
-                'title': quiz.title,
-                'description': quiz.description,
-                'total_marks': quiz.total_marks,
-                'total_questions': len(questions)
-            },
+            'quiz': quiz,
             'questions': questions,
             'attempt_id': attempt.id
         })
@@ -1831,68 +1955,50 @@ def get_quiz_for_attempt(request, quiz_id, student_id, course_id):
 @api_view(['POST'])
 def submit_quiz_attempt(request, attempt_id):
     try:
-        # Get the attempt
-        attempt = StudentQuizAttempt.objects.get(id=attempt_id)
-        
-        if attempt.is_completed:
-            return Response({
-                'status': 'error',
-                'message': 'This quiz attempt has already been submitted'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Get submitted answers
-        answers = request.data.get('answers', [])
-        if not answers:
-            return Response({
-                'status': 'error',
-                'message': 'No answers submitted'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Process answers
-        correct_count = 0
-        
-        for ans in answers:
-            question_id = ans.get('question_id')
-            selected_answer = ans.get('selected_answer')
-            
-            try:
-                question = QuizQuestion.objects.get(id=question_id, quiz=attempt.quiz)
-                is_correct = question.right_ans == selected_answer
-                
-                if is_correct:
-                    correct_count += 1
-                
-                # Save response
-                StudentQuizResponse.objects.create(
-                    attempt=attempt,
-                    question=question,
-                    selected_answer=selected_answer,
-                    is_correct=is_correct
-                )
-                
-            except QuizQuestion.DoesNotExist:
-                continue
-        
-        # Calculate score
-        marks_per_question = attempt.quiz.total_marks / attempt.total_questions if attempt.total_questions > 0 else 0
-        obtained_marks = correct_count * marks_per_question
-        
-        # Update attempt
-        attempt.correct_answers = correct_count
-        attempt.obtained_marks = obtained_marks
-        attempt.is_completed = True
-        attempt.save()
-        
-        # Create notification for teacher
-        Notification.objects.create(
-            recipient_teacher=attempt.quiz.teacher,
-            notification_type='quiz_completed',
-            title='Quiz Completed',
-            message=f'Student {attempt.student.fullname} has completed the quiz "{attempt.quiz.title}" with score {obtained_marks}/{attempt.quiz.total_marks}',
-            related_quiz=attempt.quiz,
-            related_course=attempt.course
-        )
-        
+        with transaction.atomic():
+            # Lock the attempt so a double submit waits here and then sees is_completed
+            attempt = StudentQuizAttempt.objects.select_for_update(of=('self',)).select_related(
+                'quiz', 'student'
+            ).get(id=attempt_id)
+
+            if attempt.is_completed:
+                return Response({
+                    'status': 'error',
+                    'message': 'This quiz attempt has already been submitted'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Get submitted answers
+            answers = request.data.get('answers', [])
+            if not answers:
+                return Response({
+                    'status': 'error',
+                    'message': 'No answers submitted'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Grade every answer against the answer key in memory
+            answer_key = get_quiz_snapshot(attempt.quiz_id).answer_key
+            responses, correct_count = grade_answers(attempt, answers, answer_key)
+            StudentQuizResponse.objects.bulk_create(responses)
+
+            # Calculate score
+            obtained_marks = calculate_marks(correct_count, attempt.quiz.total_marks, attempt.total_questions)
+
+            # Update attempt
+            attempt.correct_answers = correct_count
+            attempt.obtained_marks = obtained_marks
+            attempt.is_completed = True
+            attempt.save(update_fields=['correct_answers', 'obtained_marks', 'is_completed'])
+
+            # Create notification for teacher
+            Notification.objects.create(
+                recipient_teacher_id=attempt.quiz.teacher_id,
+                notification_type='quiz_completed',
+                title='Quiz Completed',
+                message=f'Student {attempt.student.fullname} has completed the quiz "{attempt.quiz.title}" with score {obtained_marks}/{attempt.quiz.total_marks}',
+                related_quiz=attempt.quiz,
+                related_course_id=attempt.course_id
+            )
+
         return Response({
             'status': 'success',
             'message': 'Quiz submitted successfully',
@@ -2002,7 +2108,7 @@ def course_quiz_results(request, course_id, quiz_id):
             course_id=course_id,
             quiz_id=quiz_id,
             is_completed=True
-        ).select_related('student')
+        ).select_related('student', 'quiz')
         
         results = []
         for attempt in attempts:
@@ -2048,53 +2154,26 @@ def student_quiz_attempts(request, student_id):
         attempts = StudentQuizAttempt.objects.filter(
             student_id=student_id,
             is_completed=True
-        ).select_related('quiz', 'course', 'student')
-        
-        # Transform data for frontend visualization
-        result_data = []
-        for attempt in attempts:
-            # Get question-by-question responses
-            responses = StudentQuizResponse.objects.filter(attempt=attempt).select_related('question')
-            questions_data = []
-            
-            for response in responses:
-                questions_data.append({
-                    'question_text': response.question.question_text,
-                    'selected_option': response.selected_answer,
-                    'correct_option': response.question.right_ans,
-                    'is_correct': response.is_correct
-                })
-            
-            # Calculate percentage score
-            percentage = (attempt.obtained_marks / attempt.quiz.total_marks * 100) if attempt.quiz.total_marks > 0 else 0
-            
-            result_data.append({
-                'id': attempt.id,
-                'student': attempt.student.id,
-                'student_name': attempt.student.fullname,
-                'username': attempt.student.username,
-                'quiz': attempt.quiz.id,
-                'quiz_title': attempt.quiz.title,
-                'course': attempt.course.id,
-                'course_title': attempt.course.title,
-                'total_questions': attempt.total_questions,
-                'total_score': attempt.correct_answers,
-                'obtained_marks': float(attempt.obtained_marks),
-                'total_marks': float(attempt.quiz.total_marks),
-                'percentage': float(percentage),
-                'created_at': attempt.attempted_at,
-                'questions_data': json.dumps(questions_data)
-            })
+        )
         
-        return Response({
+        rows, next_cursor = load_quiz_attempts(request, attempts, 'student-quiz-attempts')
+        data = {
             'status': 'success',
-            'data': result_data
-        })
+            'data': rows
+        }
+        if wants_pagination(request):
+            data['next_cursor'] = next_cursor
+        return Response(data)
     except Student.DoesNotExist:
         return Response({
             'status': 'error',
             'message': 'Student not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except CursorError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'status': 'error',
@@ -2110,41 +2189,28 @@ def all_quiz_attempts(request):
         # Get all completed quiz attempts
         attempts = StudentQuizAttempt.objects.filter(
             is_completed=True
-        ).select_related('quiz', 'course', 'student')
-        
-        # Transform data for frontend visualization
-        result_data = []
-        for attempt in attempts:
-            # Calculate percentage score
-            percentage = (attempt.obtained_marks / attempt.quiz.total_marks * 100) if attempt.quiz.total_marks > 0 else 0
-            
-            result_data.append({
-                'id': attempt.id,
-                'student': attempt.student.id,
-                'student_name': attempt.student.fullname,
-                'username': attempt.student.username,
-                'quiz': attempt.quiz.id,
-                'quiz_title': attempt.quiz.title,
-                'course': attempt.course.id,
-                'course_title': attempt.course.title,
-                'total_questions': attempt.total_questions,
-                'total_score': attempt.correct_answers,
-                'obtained_marks': float(attempt.obtained_marks),
-                'total_marks': float(attempt.quiz.total_marks),
-                'percentage': float(percentage),
-                'created_at': attempt.attempted_at
-            })
+        )
         
-        return Response({
+        rows, next_cursor = load_quiz_attempts(request, attempts, 'all-quiz-attempts')
+        data = {
             'status': 'success',
-            'data': result_data
-        })
+            'data': rows
+        }
+        if wants_pagination(request):
+            data['next_cursor'] = next_cursor
+        return Response(data)
+    except CursorError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'status': 'error',
             'message': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@conditional_get(notifications_state)
 @api_view(['GET'])
 def get_notifications(request, user_type, user_id):
     try:
@@ -2233,22 +2299,36 @@ def search_courses(request):
                 'message': 'Search query is required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Search in title, description, and technologies
-        # Sanitize the query to avoid any potential issues
-        # This prevents issues with special characters in the search query
+        # Ranked full-text search over title, technologies and description
+        # (see main/search.py), with a typo-tolerant trigram fallback
         sanitized_query = query.strip()
-        
-        courses = Course.objects.filter(
-            Q(title__icontains=sanitized_query) |
-            Q(description__icontains=sanitized_query) |
-            Q(technologies__icontains=sanitized_query)
-        ).select_related('teacher', 'category').distinct()
+        courses = course_search.search_courses(
+            Course.objects.select_related('teacher', 'category'),
+            sanitized_query
+        )
 
-        serializer = CourseSerializer(courses, many=True)
+        if wants_stream(request):
+            courses, _ = apply_ordering(courses, request, default_ordering='-rank', allowed=SEARCH_ORDERINGS)
+            serializer = CourseSearchSerializer(context={'request': request})
+            return stream_json_list(
+                courses, serializer.to_representation,
+                prefix='{"status": "success", "data": [', suffix=']}'
+            )
+
+        courses, next_cursor = keyset_page(
+            courses, request, 'search-courses', default_ordering='-rank', allowed=SEARCH_ORDERINGS
+        )
+        serializer = CourseSearchSerializer(courses, many=True, context={'request': request})
         return Response({
             'status': 'success',
-            'data': serializer.data
+            'data': serializer.data,
+            'next_cursor': next_cursor
         })
+    except CursorError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         # Log the error for debugging
         print(f"Search error for query '{query}': {str(e)}")
@@ -2259,6 +2339,7 @@ def search_courses(request):
         })
 
 # Study Material views
+@method_decorator(conditional_get(study_materials_state), name='dispatch')
 class StudyMaterialList(generics.ListCreateAPIView):
     queryset = StudyMaterial.objects.all()
     serializer_class = StudyMaterialSerializer
@@ -2266,9 +2347,10 @@ class StudyMaterialList(generics.ListCreateAPIView):
     def get_queryset(self):
         # If course_id is provided, filter materials for specific course
         course_id = self.kwargs.get('course_id')
+        materials = StudyMaterial.objects.select_related('teacher', 'course')
         if course_id:
-            return StudyMaterial.objects.filter(course=course_id)
-        return StudyMaterial.objects.all()
+            return materials.filter(course=course_id)
+        return materials
 
 class StudyMaterialDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = StudyMaterial.objects.all()
@@ -2304,23 +2386,22 @@ def notify_new_study_material(request):
         course = Course.objects.get(id=course_id)
         study_material = StudyMaterial.objects.get(id=material_id)
         
-        # Get all students enrolled in this course
-        enrolled_students = StudentCourseEnrollment.objects.filter(course=course).values_list('student', flat=True)
-        
-        # Create notification for each enrolled student
-        for student_id in enrolled_students:
-            student = Student.objects.get(id=student_id)
-            notification = Notification(
-                recipient_student=student,
-                notification_type='study_material_added',
-                title=f'New study material added: {material_title}',
-                message=f'A new study material "{study_material.title}" has been added to your course "{course.title}"',
-                related_course=course,
-                is_read=False
-            )
-            notification.save()
-        
-        return JsonResponse({'success': True, 'message': f'Notifications sent to {len(enrolled_students)} students'})
+        # Notify every enrolled student (queued as a job for large courses)
+        notified, job = notify_course_students(
+            course,
+            notification_type='study_material_added',
+            title=f'New study material added: {material_title}',
+            message=f'A new study material "{study_material.title}" has been added to your course "{course.title}"'
+        )
+
+        if job is not None:
+            return JsonResponse({
+                'success': True,
+                'message': f'Notifying {notified} students',
+                'job_id': job.id
+            }, status=202)
+
+        return JsonResponse({'success': True, 'message': f'Notifications sent to {notified} students'})
     except Course.DoesNotExist:
         return JsonResponse({'error': 'Course not found'}, status=404)
     except StudyMaterial.DoesNotExist:
@@ -2328,6 +2409,34 @@ def notify_new_study_material(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@api_view(['GET'])
+def notification_job_status(request, job_id):
+    """Progress of a background notification fan-out"""
+    try:
+        job = NotificationJob.objects.get(id=job_id)
+        serializer = NotificationJobSerializer(job)
+        return Response({
+            'status': 'success',
+            'data': serializer.data
+        })
+    except NotificationJob.DoesNotExist:
+        return Response({
+            'status': 'error',
+            'message': 'Notification job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Per-endpoint request metrics in the Prometheus text format (staff only)"""
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        return Response({
+            'status': 'error',
+            'message': 'Metrics are disabled'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@cache_response('ratings')
 @api_view(['GET'])
 def get_top_course_ratings(request):
     """
@@ -2370,7 +2479,9 @@ def teacher_enrolled_students(request, teacher_id):
         teacher_course_ids = Course.objects.filter(teacher_id=teacher_id).values_list('id', flat=True)
         
         # Get enrollments for these courses
-        enrollments = StudentCourseEnrollment.objects.filter(course_id__in=teacher_course_ids)
+        enrollments = StudentCourseEnrollment.objects.filter(
+            course_id__in=teacher_course_ids
+        ).select_related('student', 'course')
         
         # Collect unique students with their enrolled courses (taught by this teacher)
         student_data = {}
@@ -2479,53 +2590,26 @@ def teacher_all_quiz_attempts(request, teacher_id):
         attempts = StudentQuizAttempt.objects.filter(
             Q(quiz_id__in=teacher_quiz_ids) | Q(course_id__in=teacher_course_ids),
             is_completed=True
-        ).select_related('quiz', 'course', 'student')
-        
-        # Transform data for frontend visualization
-        result_data = []
-        for attempt in attempts:
-            # Get question-by-question responses
-            responses = StudentQuizResponse.objects.filter(attempt=attempt).select_related('question')
-            questions_data = []
-            
-            for response in responses:
-                questions_data.append({
-                    'question_text': response.question.question_text,
-                    'selected_option': response.selected_answer,
-                    'correct_option': response.question.right_ans,
-                    'is_correct': response.is_correct
-                })
-            
-            # Calculate percentage score
-            percentage = (attempt.obtained_marks / attempt.quiz.total_marks * 100) if attempt.quiz.total_marks > 0 else 0
-            
-            result_data.append({
-                'id': attempt.id,
-                'student': attempt.student.id,
-                'student_name': attempt.student.fullname,
-                'username': attempt.student.username,
-                'quiz': attempt.quiz.id,
-                'quiz_title': attempt.quiz.title,
-                'course': attempt.course.id,
-                'course_title': attempt.course.title,
-                'total_questions': attempt.total_questions,
-                'total_score': attempt.correct_answers,
-                'obtained_marks': float(attempt.obtained_marks),
-                'total_marks': float(attempt.quiz.total_marks),
-                'percentage': float(percentage),
-                'created_at': attempt.attempted_at,
-                'questions_data': json.dumps(questions_data)
-            })
+        )
         
-        return Response({
+        rows, next_cursor = load_quiz_attempts(request, attempts, 'teacher-all-quiz-attempts')
+        data = {
             'status': 'success',
-            'data': result_data
-        })
+            'data': rows
+        }
+        if wants_pagination(request):
+            data['next_cursor'] = next_cursor
+        return Response(data)
     except Teacher.DoesNotExist:
         return Response({
             'status': 'error',
             'message': 'Teacher not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except CursorError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'status': 'error',
@@ -2562,48 +2646,16 @@ def teacher_student_quiz_attempts(request, teacher_id, student_id):
             student_id=student_id,
             course_id__in=teacher_course_ids,
             is_completed=True
-        ).select_related('quiz', 'course', 'student')
-        
-        # Transform data for frontend visualization
-        result_data = []
-        for attempt in attempts:
-            # Get question-by-question responses
-            responses = StudentQuizResponse.objects.filter(attempt=attempt).select_related('question')
-            questions_data = []
-            
-            for response in responses:
-                questions_data.append({
-                    'question_text': response.question.question_text,
-                    'selected_option': response.selected_answer,
-                    'correct_option': response.question.right_ans,
-                    'is_correct': response.is_correct
-                })
-            
-            # Calculate percentage score
-            percentage = (attempt.obtained_marks / attempt.quiz.total_marks * 100) if attempt.quiz.total_marks > 0 else 0
-            
-            result_data.append({
-                'id': attempt.id,
-                'student': attempt.student.id,
-                'student_name': attempt.student.fullname,
-                'username': attempt.student.username,
-                'quiz': attempt.quiz.id,
-                'quiz_title': attempt.quiz.title,
-                'course': attempt.course.id,
-                'course_title': attempt.course.title,
-                'total_questions': attempt.total_questions,
-                'total_score': attempt.correct_answers,
-                'obtained_marks': float(attempt.obtained_marks),
-                'total_marks': float(attempt.quiz.total_marks),
-                'percentage': float(percentage),
-                'created_at': attempt.attempted_at,
-                'questions_data': json.dumps(questions_data)
-            })
+        )
         
-        return Response({
+        rows, next_cursor = load_quiz_attempts(request, attempts, 'teacher-student-quiz-attempts')
+        data = {
             'status': 'success',
-            'data': result_data
-        })
+            'data': rows
+        }
+        if wants_pagination(request):
+            data['next_cursor'] = next_cursor
+        return Response(data)
     except Teacher.DoesNotExist:
         return Response({
             'status': 'error',
@@ -2614,6 +2666,11 @@ def teacher_student_quiz_attempts(request, teacher_id, student_id):
             'status': 'error',
             'message': 'Student not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except CursorError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'status': 'error',
@@ -2621,16 +2678,19 @@ def teacher_student_quiz_attempts(request, teacher_id, student_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(cache_response('faqs'), name='dispatch')
 class FaqList(generics.ListAPIView):
     queryset = FAQ.objects.all()
     serializer_class = FaqSerializer
 
 # FlatPage views
+@method_decorator(cache_response('flatpages'), name='dispatch')
 class FlatPageList(generics.ListAPIView):
     queryset = FlatPage.objects.all()
     serializer_class = FlatPageSerializer
     permission_classes = [AllowAny]
 
+@cache_response('flatpages')
 @api_view(['GET'])
 def get_flatpage_by_url(request, url):
     try:
@@ -2683,18 +2743,15 @@ def get_flatpage_by_url(request, url):
 def submit_contact_form(request):
     """
     Handle contact form submissions.
-    Saves the message to the database and sends an email notification.
+    Saves the message to the database and queues the email notifications.
     """
     try:
         serializer = ContactUsSerializer(data=request.data)
         if serializer.is_valid():
-            # Save the contact message to the database
-            contact_message = serializer.save()
-            
-            # Send email notification
-            try:
-                from django.core.mail import send_mail
-                from django.conf import settings
+            from_email = settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@knoology.com'
+            # Save the contact message and queue both emails in one transaction
+            with transaction.atomic():
+                contact_message = serializer.save()
                 
                 subject = f"New Contact Message: {contact_message.subject}"
                 message_body = f"""
@@ -2708,15 +2765,9 @@ def submit_contact_form(request):
                 Received on: {contact_message.created_at}
                 """
                 
-                # Send email from the site's support email to admin
+                # Notify the admin from the site's support email
                 recipient_list = [settings.ADMIN_EMAIL] if hasattr(settings, 'ADMIN_EMAIL') else ['admin@example.com']
-                send_mail(
-                    subject,
-                    message_body,
-                    settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@knoology.com',
-                    recipient_list,
-                    fail_silently=True,  # Do not raise exception if email sending fails
-                )
+                queue_email(subject, message_body, recipient_list, from_email=from_email)
                 
                 # Also send a confirmation email to the user
                 user_subject = "Thank you for contacting Knoology LMS"
@@ -2732,25 +2783,13 @@ def submit_contact_form(request):
                 Best regards,
                 The Knoology LMS Team
                 """
-                
-                send_mail(
-                    user_subject,
-                    user_message,
-                    settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@knoology.com',
-                    [contact_message.email],
-                    fail_silently=True,
-                )
-                
-                email_sent = True
-            except Exception as email_error:
-                print(f"Failed to send email: {str(email_error)}")
-                email_sent = False
+                queue_email(user_subject, user_message, [contact_message.email], from_email=from_email)
             
             # Return success response
             return Response({
                 'status': 'success',
                 'message': 'Your message has been sent successfully. We will get back to you soon.',
-                'email_notification_sent': email_sent
+                'email_notification_sent': True
             }, status=status.HTTP_201_CREATED)
         else:
             return Response({
@@ -2921,9 +2960,6 @@ def resend_otp(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        import random
-        new_otp = str(random.randint(100000, 999999))
-        
         if user_type == 'teacher':
             user = Teacher.objects.get(id=user_id)
         elif user_type == 'student':
@@ -2934,19 +2970,11 @@ def resend_otp(request):
                 'message': 'Invalid user_type. Must be "teacher" or "student".'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update OTP
-        user.otp_digit = new_otp
-        user.save()
-        
-        # Send email with new OTP
-        send_mail(
-            f'Verify Your Knoology LMS {user_type.capitalize()} Account',
-            'Please verify your account',
-            'knoologylms@gmail.com',
-            [user.email],
-            fail_silently=False,
-            html_message=f'<p>Your new OTP is </p><p>{new_otp}</p>'
-        )
+        # Update OTP and queue the email with it
+        user.otp_digit = generate_otp()
+        with transaction.atomic():
+            user.save(update_fields=['otp_digit'])
+            queue_otp_email(user, resend=True)
         
         return Response({
             'status': 'success',
@@ -3011,95 +3039,8 @@ def send_message(request):
                 'message': f'Student with ID {student_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Create the chat message
-        chat = TeacherStudentChat(
-            teacher=teacher,
-            student=student,
-            message=message,
-            message_from=message_from
-        )
-        
-        # Enhanced retry mechanism for database locks
-        import time
-        from django.db.utils import OperationalError
-        
-        max_retries = 5  # Increase max retries
-        retry_count = 0
-        success = False
-        last_error = None
-        
-        while retry_count < max_retries and not success:
-            try:
-                chat.save()
-                success = True
-            except OperationalError as e:
-                last_error = e
-                if "database is locked" in str(e).lower():
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        # Exponential backoff with jitter
-                        sleep_time = (0.1 * (2 ** retry_count)) + (0.1 * random.random())
-                        print(f"Database locked, retrying in {sleep_time:.2f}s (attempt {retry_count}/{max_retries})")
-                        time.sleep(sleep_time)
-                    else:
-                        print(f"Failed to save message after {max_retries} attempts due to database lock")
-                else:
-                    raise
-            except Exception as e:
-                last_error = e
-                raise
-        
-        if not success:
-            if last_error:
-                return Response({
-                    'status': 'error',
-                    'message': f'Failed to save message after {max_retries} attempts: {str(last_error)}'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            else:
-                return Response({
-                    'status': 'error',
-                    'message': f'Failed to save message after {max_retries} attempts'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-        # Create a notification for the recipient - with retry logic
-        retry_count = 0
-        success = False
-        
-        while retry_count < max_retries and not success:
-            try:
-                if message_from == 'teacher':
-                    recipient = student
-                    Notification.objects.create(
-                        recipient_student=recipient,
-                        notification_type='general',
-                        title='New Message',
-                        message=f'You have a new message from {teacher.full_name}',
-                        is_read=False
-                    )
-                else:  # message from student
-                    recipient = teacher
-                    Notification.objects.create(
-                        recipient_teacher=recipient,
-                        notification_type='general',
-                        title='New Message',
-                        message=f'You have a new message from {student.fullname}',
-                        is_read=False
-                    )
-                success = True
-            except OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        # Exponential backoff with jitter
-                        sleep_time = (0.1 * (2 ** retry_count)) + (0.1 * random.random())
-                        print(f"Database locked when creating notification, retrying in {sleep_time:.2f}s (attempt {retry_count}/{max_retries})")
-                        time.sleep(sleep_time)
-                    else:
-                        print(f"Failed to create notification after {max_retries} attempts due to database lock")
-                        # We continue anyway since the message was saved - notification failure is not fatal
-                        break
-                else:
-                    raise
+        # Message, conversation state and recipient notification in one transaction
+        chat = send_chat_message(teacher, student, message, message_from)
         
         # Serialize the message for the response
         serializer = TeacherStudentChatSerializer(chat)
@@ -3144,27 +3085,8 @@ def get_chat_messages(request, user_type, user_id, other_user_id):
                 teacher = Teacher.objects.get(id=teacher_id)
                 student = Student.objects.get(id=student_id)
                 
-                # Mark notifications as read - with retry logic for database lock
-                max_retries = 3
-                retry_count = 0
-                success = False
-                
-                while retry_count < max_retries and not success:
-                    try:
-                        Notification.objects.filter(
-                            recipient_teacher_id=teacher_id,
-                            is_read=False,
-                            notification_type='general',
-                            message__contains=f"from {student.fullname}"
-                        ).update(is_read=True)
-                        success = True
-                    except django.db.utils.OperationalError as e:
-                        if "database is locked" in str(e).lower():
-                            retry_count += 1
-                            import time
-                            time.sleep(0.5)  # Wait a moment before retrying
-                        else:
-                            raise  # Re-raise if it's a different error
+                # Opening the conversation reads everything in it
+                mark_conversation_read(teacher_id, student_id, 'teacher')
                 
             except (Teacher.DoesNotExist, Student.DoesNotExist) as e:
                 return Response({
@@ -3181,27 +3103,8 @@ def get_chat_messages(request, user_type, user_id, other_user_id):
                 teacher = Teacher.objects.get(id=teacher_id)
                 student = Student.objects.get(id=student_id)
                 
-                # Mark notifications as read - with retry logic for database lock
-                max_retries = 3
-                retry_count = 0
-                success = False
-                
-                while retry_count < max_retries and not success:
-                    try:
-                        Notification.objects.filter(
-                            recipient_student_id=student_id,
-                            is_read=False,
-                            notification_type='general',
-                            message__contains=f"from {teacher.full_name}"
-                        ).update(is_read=True)
-                        success = True
-                    except django.db.utils.OperationalError as e:
-                        if "database is locked" in str(e).lower():
-                            retry_count += 1
-                            import time
-                            time.sleep(0.5)  # Wait a moment before retrying
-                        else:
-                            raise  # Re-raise if it's a different error
+                # Opening the conversation reads everything in it
+                mark_conversation_read(teacher_id, student_id, 'student')
                 
             except (Teacher.DoesNotExist, Student.DoesNotExist) as e:
                 return Response({
@@ -3214,31 +3117,8 @@ def get_chat_messages(request, user_type, user_id, other_user_id):
                 'message': 'Invalid user type. Must be "teacher" or "student"'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get all messages between this teacher and student - with retry logic
-        max_retries = 3
-        retry_count = 0
-        messages = None
-        
-        while retry_count < max_retries and messages is None:
-            try:
-                messages = TeacherStudentChat.objects.filter(
-                    teacher_id=teacher_id,
-                    student_id=student_id
-                ).order_by('timestamp')
-            except django.db.utils.OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    retry_count += 1
-                    import time
-                    time.sleep(0.5)  # Wait a moment before retrying
-                else:
-                    raise  # Re-raise if it's a different error
-        
-        if messages is None:
-            return Response({
-                'status': 'error',
-                'message': 'Database was locked and could not be accessed after multiple retries.'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+        # Whole history, or only the slice asked for with after_id / before_id / limit
+        messages, has_more = chat_history(request, teacher_id, student_id)
         serializer = TeacherStudentChatSerializer(messages, many=True)
         
         # Get user details to return with the messages
@@ -3262,10 +3142,16 @@ def get_chat_messages(request, user_type, user_id, other_user_id):
             'status': 'success',
             'data': {
                 'messages': serializer.data,
-                'other_user': other_user_data
+                'other_user': other_user_data,
+                'has_more': has_more
             }
         })
         
+    except HistoryParamError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         # Log the full exception details for debugging
         import traceback
@@ -3277,6 +3163,44 @@ def get_chat_messages(request, user_type, user_id, other_user_id):
             'message': f"An error occurred: {str(e)}"
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+async def event_stream(request, user_type, user_id):
+    """
+    Server-sent events stream of new chat messages and notifications for one
+    user. Needs the ASGI application; each open stream is one idle coroutine.
+    No database work is done here, so open streams hold no DB connections.
+    Always needs the user's own access token (as ``access_token``, since
+    EventSource cannot send headers), whatever AUTH_TOKEN_REQUIRED says.
+    """
+    if user_type not in ('teacher', 'student'):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Invalid user type. Must be "teacher" or "student"'
+        }, status=400)
+
+    principal = getattr(request, 'principal', None)
+    if principal is None:
+        response = JsonResponse({
+            'status': 'error',
+            'message': getattr(request, 'token_error', None) or 'Authentication required'
+        }, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    if principal != Principal(user_type, user_id):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'You do not have access to this account'
+        }, status=403)
+
+    realtime.ensure_listener()
+    response = StreamingHttpResponse(
+        realtime.event_stream(user_type, user_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @api_view(['GET'])
 def get_chat_users(request, user_type, user_id):
     """
@@ -3286,71 +3210,33 @@ def get_chat_users(request, user_type, user_id):
     """
     try:
         if user_type == 'teacher':
-            # Get all students who have chatted with this teacher
-            student_ids = TeacherStudentChat.objects.filter(
-                teacher_id=user_id
-            ).values_list('student_id', flat=True).distinct()
-            
-            students = Student.objects.filter(id__in=student_ids)
+            # One query over this teacher's conversations, most recent first
             users_data = []
-            
-            for student in students:
-                # Get the latest message
-                latest_message = TeacherStudentChat.objects.filter(
-                    teacher_id=user_id,
-                    student_id=student.id
-                ).order_by('-timestamp').first()
-                
-                # Count unread messages
-                unread_count = Notification.objects.filter(
-                    recipient_teacher_id=user_id,
-                    is_read=False,
-                    notification_type='general',
-                    message__contains=f"from {student.fullname}"
-                ).count()
-                
+            for conversation in inbox('teacher', user_id):
+                student = conversation.student
                 users_data.append({
                     'id': student.id,
                     'name': student.fullname,
                     'username': student.username,
                     'email': student.email,
-                    'unread_count': unread_count,
-                    'last_message': latest_message.message if latest_message else '',
-                    'last_message_time': latest_message.timestamp if latest_message else None,
+                    'unread_count': conversation.teacher_unread,
+                    'last_message': conversation.last_message,
+                    'last_message_time': conversation.last_message_at,
                     'profile_img': student.profile_img.url if student.profile_img else None
                 })
                 
         elif user_type == 'student':
-            # Get all teachers who have chatted with this student
-            teacher_ids = TeacherStudentChat.objects.filter(
-                student_id=user_id
-            ).values_list('teacher_id', flat=True).distinct()
-            
-            teachers = Teacher.objects.filter(id__in=teacher_ids)
+            # One query over this student's conversations, most recent first
             users_data = []
-            
-            for teacher in teachers:
-                # Get the latest message
-                latest_message = TeacherStudentChat.objects.filter(
-                    teacher_id=teacher.id,
-                    student_id=user_id
-                ).order_by('-timestamp').first()
-                
-                # Count unread messages
-                unread_count = Notification.objects.filter(
-                    recipient_student_id=user_id,
-                    is_read=False,
-                    notification_type='general',
-                    message__contains=f"from {teacher.full_name}"
-                ).count()
-                
+            for conversation in inbox('student', user_id):
+                teacher = conversation.teacher
                 users_data.append({
                     'id': teacher.id,
                     'name': teacher.full_name,
                     'email': teacher.email,
-                    'unread_count': unread_count,
-                    'last_message': latest_message.message if latest_message else '',
-                    'last_message_time': latest_message.timestamp if latest_message else None,
+                    'unread_count': conversation.student_unread,
+                    'last_message': conversation.last_message,
+                    'last_message_time': conversation.last_message_at,
                     'profile_img': None  # Add profile image if available in teacher model
                 })
         else:
@@ -3359,13 +3245,6 @@ def get_chat_users(request, user_type, user_id):
                 'message': 'Invalid user type. Must be "teacher" or "student"'
             }, status=status.HTTP_400_BAD_REQUEST)
             
-        # Sort by last message time, most recent first
-        users_data = sorted(
-            users_data,
-            key=lambda x: x['last_message_time'] if x['last_message_time'] else timezone.now(),
-            reverse=True
-        )
-            
         return Response({
             'status': 'success',
             'data': users_data
@@ -3395,6 +3274,7 @@ def delete_conversation(request, teacher_id, student_id):
         
         count = messages.count()
         messages.delete()
+        Conversation.objects.filter(teacher_id=teacher_id, student_id=student_id).delete()
         
         return Response({
             'status': 'success',
@@ -3533,15 +3413,23 @@ def verify_payment(request):
         })
         
         if check:
-            payment = CoursePayment.objects.get(order_id=razorpay_order_id)
-            payment.payment_id = razorpay_payment_id
-            payment.status = True
-            payment.save()
-            
-            StudentCourseEnrollment.objects.get_or_create(
-                student=payment.student,
-                course=payment.course
-            )
+            with transaction.atomic():
+                payment = CoursePayment.objects.get(order_id=razorpay_order_id)
+                payment.payment_id = razorpay_payment_id
+                payment.status = True
+                payment.save()
+                
+                enrollment, created = StudentCourseEnrollment.objects.get_or_create(
+                    student_id=payment.student_id,
+                    course_id=payment.course_id,
+                    defaults={
+                        'completed_chapters': lambda: completed_chapters_for(payment.student_id, payment.course_id)
+                    }
+                )
+                if created:
+                    Course.objects.filter(id=payment.course_id).update(
+                        total_enrolled=F('total_enrolled') + 1, updated_at=timezone.now()
+                    )
             
             return Response({
                 'status': 'success',
@@ -3560,16 +3448,12 @@ def verify_payment(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 # Certificate Generation View
-from django.template.loader import get_template
-from xhtml2pdf import pisa
-from django.http import HttpResponse
-
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def generate_certificate(request, student_id, course_id):
     try:
         # Check enrollment
-        enrollment = StudentCourseEnrollment.objects.filter(
+        enrollment = StudentCourseEnrollment.objects.select_related('student', 'course').filter(
             student_id=student_id, 
             course_id=course_id
         ).first()
@@ -3579,23 +3463,10 @@ def generate_certificate(request, student_id, course_id):
                 'status': 'error',
                 'message': 'Student is not enrolled in this course.'
             }, status=status.HTTP_404_NOT_FOUND)
-            
-    # Native ReportLab Implementation for pixel-perfect layout
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import landscape, A4
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm, inch
-        from reportlab.lib.utils import ImageReader
-        
+
         # Verify Course Completion
-        student = Student.objects.get(id=student_id)
-        course = Course.objects.get(id=course_id)
-        
-        # Late import to avoid circular dependency
-        from .models import StudentChapterProgress, Chapter
-        
-        total_chapters = Chapter.objects.filter(course=course).count()
-        completed_chapters = StudentChapterProgress.objects.filter(student=student, course=course).count()
+        total_chapters = enrollment.course.total_chapters
+        completed_chapters = enrollment.completed_chapters
         
         is_completed = (enrollment.completed_at is not None) or (total_chapters > 0 and completed_chapters >= total_chapters)
         
@@ -3608,118 +3479,15 @@ def generate_certificate(request, student_id, course_id):
         # Update completion status
         if not enrollment.completed_at:
             enrollment.completed_at = timezone.now()
-            enrollment.save()
-
-        # Logo Path
-        logo_path = r"C:\Users\LENOVO\.gemini\antigravity\brain\39b064d9-3a21-42b0-81fb-f8efecedc2ba\uploaded_media_1_1769490860861.png"
-
-        # Create PDF Response
-        response = HttpResponse(content_type='application/pdf')
-        filename = f"Certificate_{student.fullname.replace(' ', '_')}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        # Canvas Setup
-        c = canvas.Canvas(response, pagesize=landscape(A4))
-        width, height = landscape(A4)
-        
-        # --- Design Implementation ---
-        
-        # 1. Double Border
-        c.setStrokeColor(colors.HexColor('#2c3e50')) # Navy
-        c.setLineWidth(10)
-        c.rect(1*cm, 1*cm, width - 2*cm, height - 2*cm)
-        
-        c.setStrokeColor(colors.HexColor('#deb887')) # Gold
-        c.setLineWidth(3)
-        c.rect(1.3*cm, 1.3*cm, width - 2.6*cm, height - 2.6*cm)
+            enrollment.save(update_fields=['completed_at'])
 
-        # 2. Header
-        c.setFillColor(colors.HexColor('#2c3e50'))
-        c.setFont("Times-Bold", 40)
-        c.drawCentredString(width / 2, height - 4*cm, "CERTIFICATE")
-        
-        c.setFillColor(colors.HexColor('#deb887'))
-        c.setFont("Helvetica-Bold", 14)
-        c.drawCentredString(width / 2, height - 5*cm, "OF COMPLETION")
-
-        # 3. Logo
-        try:
-            # Draw logo centered
-            logo_width = 5*cm
-            logo_height = 3*cm  # Aspect ratio will depend on image, but we constrain box
-            # Calculate x position to center
-            c.drawImage(logo_path, (width - logo_width) / 2, height - 8.5*cm, width=logo_width, height=logo_height, mask='auto', preserveAspectRatio=True)
-        except Exception as e:
-            print(f"Logo error: {e}")
-            c.setFont("Helvetica", 12)
-            c.drawCentredString(width / 2, height - 7*cm, "[Knoology Logo]")
-
-        # 4. Content Text
-        c.setFillColor(colors.HexColor('#7f8c8d')) # Grey
-        c.setFont("Times-Italic", 14)
-        c.drawCentredString(width / 2, height - 10*cm, "This is to certify that")
-
-        # Student Name
-        c.setFillColor(colors.HexColor('#d35400')) # Burnt Orange
-        c.setFont("Times-Bold", 36)
-        c.drawCentredString(width / 2, height - 12*cm, student.fullname)
-        
-        # Underline Name
-        c.setStrokeColor(colors.HexColor('#ddd'))
-        c.setLineWidth(1)
-        c.line((width/2) - 5*cm, height - 12.2*cm, (width/2) + 5*cm, height - 12.2*cm)
-
-        c.setFillColor(colors.HexColor('#7f8c8d'))
-        c.setFont("Helvetica", 12)
-        c.drawCentredString(width / 2, height - 13.5*cm, "has successfully completed the course")
-
-        # Course Title
-        c.setFillColor(colors.HexColor('#2c3e50'))
-        c.setFont("Times-Bold", 24)
-        c.drawCentredString(width / 2, height - 15*cm, course.title)
-
-        # 5. Footer / Signatures strategy
-        # Left: Date, Right: Auth
-        footer_y = 3*cm
-        
-        # Date
-        date_str = enrollment.completed_at.strftime('%B %d, %Y')
-        c.setFillColor(colors.HexColor('#2c3e50'))
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(width/4, footer_y + 0.5*cm, date_str)
-        c.setStrokeColor(colors.HexColor('#2c3e50'))
-        c.line(width/4 - 2*cm, footer_y + 0.3*cm, width/4 + 2*cm, footer_y + 0.3*cm)
-        c.drawCentredString(width/4, footer_y - 0.2*cm, "Date Issued")
-
-        # Seal (Center Bottom)
-        c.setStrokeColor(colors.HexColor('#deb887'))
-        c.setLineWidth(2)
-        c.circle(width/2, footer_y + 0.5*cm, 1.2*cm)
-        c.setFillColor(colors.HexColor('#deb887'))
-        c.setFont("Helvetica-Bold", 8)
-        c.drawCentredString(width/2, footer_y + 0.7*cm, "VERIFIED")
-        c.drawCentredString(width/2, footer_y + 0.3*cm, "SECURE")
-
-        # Signature
-        c.setFillColor(colors.HexColor('#2c3e50'))
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(3*width/4, footer_y + 0.5*cm, "Knoology LMS")
-        c.setStrokeColor(colors.HexColor('#2c3e50'))
-        c.line(3*width/4 - 2*cm, footer_y + 0.3*cm, 3*width/4 + 2*cm, footer_y + 0.3*cm)
-        c.drawCentredString(3*width/4, footer_y - 0.2*cm, "Authorized Signature")
-
-        # 6. Validation ID
-        valid_id = f"CERT-{student_id}-{course_id}-{int(enrollment.completed_at.timestamp())}"
-        verify_url = request.build_absolute_uri(f"/verify-certificate/{student_id}/{course_id}/")
-        
-        c.setFillColor(colors.HexColor('#95a5a6'))
-        c.setFont("Helvetica", 7)
-        c.drawString(2*cm, 1*cm, f"ID: {valid_id}")
-        c.drawRightString(width - 2*cm, 1*cm, f"Verify: {verify_url}")
-
-        c.showPage()
-        c.save()
-        
+        # Usually rendered already by the worker mark_chapter_complete started
+        name = certificates.ensure_certificate(
+            enrollment, certificates.verification_url(request, student_id, course_id)
+        )
+        with default_storage.open(name, 'rb') as pdf:
+            response = HttpResponse(pdf.read(), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{certificates.download_name(enrollment)}"'
         return response
 
     except Exception as e:
@@ -3727,7 +3495,7 @@ def generate_certificate(request, student_id, course_id):
         return Response({'status': 'error', 'message': str(e)}, status=500)
 
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 import json
 
 @csrf_exempt
@@ -3735,33 +3503,47 @@ def mark_chapter_complete(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            student_id = data.get('student_id')
-            course_id = data.get('course_id')
-            chapter_id = data.get('chapter_id')
-            
-            from .models import Student, Course, Chapter, StudentChapterProgress, StudentCourseEnrollment
-            
-            student = Student.objects.get(id=student_id)
-            course = Course.objects.get(id=course_id)
-            chapter = Chapter.objects.get(id=chapter_id)
-            
-            StudentChapterProgress.objects.get_or_create(
-                student=student,
-                course=course,
-                chapter=chapter
-            )
-            
-            # Check if all chapters are completed
-            total_chapters = Chapter.objects.filter(course=course).count()
-            completed_chapters = StudentChapterProgress.objects.filter(student=student, course=course).count()
-            
-            if total_chapters > 0 and completed_chapters >= total_chapters:
-                enrollment = StudentCourseEnrollment.objects.filter(student=student, course=course).first()
-                if enrollment and not enrollment.completed_at:
-                    enrollment.completed_at = timezone.now()
-                    enrollment.save()
-                    
-            return JsonResponse({'status': 'success', 'message': 'Chapter marked as complete'})
+            student_id, error = body_account(request, 'student', data.get('student_id'))
+            if error:
+                return error
+            enrollment, _, completed = complete_chapter(student_id, data.get('course_id'), data.get('chapter_id'))
+            if completed:
+                certificates.schedule_render(
+                    enrollment.id, certificates.verification_url(request, enrollment.student_id, enrollment.course_id)
+                )
+            return JsonResponse({
+                'status': 'success',
+                'message': 'Chapter marked as complete',
+                'completed_chapters': enrollment.completed_chapters,
+                'total_chapters': enrollment.course.total_chapters,
+                'progress': enrollment.progress
+            })
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
+
+@csrf_exempt
+def sync_chapter_progress(request):
+    """Batch form of mark_chapter_complete for clients replaying offline progress."""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            student_id, error = body_account(request, 'student', data.get('student_id'))
+            if error:
+                return error
+            courses, rejected, completed = sync_progress(student_id, data.get('items'))
+            for enrollment_id, course_id in completed:
+                certificates.schedule_render(
+                    enrollment_id, certificates.verification_url(request, student_id, course_id)
+                )
+            return JsonResponse({
+                'status': 'success',
+                'courses': [
+                    {'course_id': course_id, 'completed_chapters': chapter_ids}
+                    for course_id, chapter_ids in courses.items()
+                ],
+                'rejected': rejected
+            })
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
     return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)